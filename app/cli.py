@@ -0,0 +1,290 @@
+"""
+Headless command-line mode.
+
+    python main.py balance
+    python main.py quota
+    python main.py my-packages
+    python main.py family <family_code> [--enterprise | --no-enterprise] [--migration-type TYPE]
+    python main.py history
+    python main.py sentry [--interval SECONDS] [--count N]
+    python main.py profile-summary [--dir DIR] [--action NAME] [--top N]
+    python main.py daemon [--stop]
+
+Every command prints JSON on stdout (sentry prints one JSON object per line)
+and exits with a code from app.exit_codes. Progress messages from the client
+layer are sent to stderr so stdout stays machine-readable.
+
+When a daemon is running (see app.service.daemon), read commands are
+forwarded to it over its Unix socket and answered from its warm state.
+"""
+import argparse
+import json
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+
+from app.exit_codes import (
+    EXIT_OK,
+    EXIT_ERROR,
+    EXIT_NOT_LOGGED_IN,
+    EXIT_AUTH_EXPIRED,
+    EXIT_API_KEY_INVALID,
+    EXIT_API_ERROR,
+    EXIT_NETWORK,
+    EXIT_NOT_FOUND,
+    EXIT_NAMES,
+)
+
+
+class CommandError(Exception):
+    def __init__(self, code: int, message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def _auth():
+    """Import AuthInstance lazily; its construction verifies the API key and refreshes tokens."""
+    from app.util import UserRequired
+
+    try:
+        from app.service.auth import AuthInstance
+    except EOFError:
+        raise CommandError(EXIT_API_KEY_INVALID, "API key not found and no terminal to prompt for it")
+    except UserRequired as e:
+        raise CommandError(e.code, e.message)
+    except SystemExit as e:
+        raise CommandError(e.code if isinstance(e.code, int) else EXIT_ERROR, "Startup aborted")
+    return AuthInstance
+
+
+def _session(number: int | None = None) -> tuple[str, dict, int]:
+    auth = _auth()
+    if number is not None:
+        # One-off query for another account: the active account stays as it is
+        if not any(rt["number"] == number for rt in auth.refresh_tokens):
+            raise CommandError(EXIT_NOT_LOGGED_IN, f"Account {number} is not saved, log in from the interactive menu first")
+        tokens = auth.get_account_tokens(number)
+        if not tokens:
+            raise CommandError(EXIT_AUTH_EXPIRED, f"Refresh token of {number} rejected, re-add the account")
+        return auth.api_key, tokens, number
+
+    active_user = auth.get_active_user()
+    if active_user is None:
+        if auth.refresh_tokens:
+            raise CommandError(EXIT_AUTH_EXPIRED, "Refresh token rejected, re-add the account")
+        raise CommandError(EXIT_NOT_LOGGED_IN, "No saved account, log in from the interactive menu first")
+    return auth.api_key, active_user["tokens"], active_user["number"]
+
+
+def _require(data, message: str, code: int = EXIT_API_ERROR):
+    if data is None:
+        raise CommandError(code, message)
+    return data
+
+
+def cmd_balance(args) -> dict:
+    from app.client.engsel import get_balance
+
+    api_key, tokens, number = _session(args.number)
+    balance = _require(get_balance(api_key, tokens["id_token"]), "Failed to get balance")
+    return {
+        "number": number,
+        "remaining": balance.remaining,
+        "expired_at": balance.expired_at,
+    }
+
+
+def cmd_quota(args) -> dict:
+    from app.client.engsel import get_quota_details
+
+    api_key, tokens, number = _session(args.number)
+    quotas = _require(get_quota_details(api_key, tokens), "Failed to get quota details")
+    return {
+        "number": number,
+        "quotas": [q.raw for q in quotas],
+    }
+
+
+def cmd_my_packages(args) -> dict:
+    from app.client.engsel import get_quota_details, get_package
+
+    api_key, tokens, number = _session(args.number)
+    quotas = _require(get_quota_details(api_key, tokens), "Failed to get quota details")
+
+    packages = []
+    for quota in quotas:
+        family_code = None
+        if args.with_family:
+            detail = get_package(api_key, tokens, quota.quota_code)
+            if detail:
+                family_code = detail.family_code
+        packages.append({
+            "name": quota.name,
+            "quota_code": quota.quota_code,
+            "group_code": quota.group_code,
+            "group_name": quota.group_name,
+            "family_code": family_code,
+            "benefits": [b.raw for b in quota.benefits],
+        })
+    return {
+        "number": number,
+        "packages": packages,
+    }
+
+
+def cmd_family(args) -> dict:
+    from app.client.engsel import get_family
+
+    api_key, tokens, _ = _session(args.number)
+    data = _require(
+        get_family(api_key, tokens, args.family_code, args.enterprise, args.migration_type),
+        f"Family {args.family_code} not found",
+        EXIT_NOT_FOUND,
+    )
+    return data.raw
+
+
+def cmd_history(args) -> dict:
+    from app.client.engsel2 import get_transaction_history
+
+    api_key, tokens, number = _session(args.number)
+    data = _require(get_transaction_history(api_key, tokens), "Failed to get transaction history")
+    return {
+        "number": number,
+        "transactions": data.get("list", []),
+    }
+
+
+def cmd_sentry(args, emit) -> None:
+    from app.client.engsel import get_quota_details
+    from app.service.metrics import MetricsInstance
+
+    api_key, tokens, number = _session(args.number)
+    MetricsInstance.start()
+    taken = 0
+    while args.count <= 0 or taken < args.count:
+        if taken:
+            time.sleep(args.interval)
+            # Tokens are renewed by Auth when they get older than 5 minutes
+            _, tokens, _ = _session()
+        quotas = _require(get_quota_details(api_key, tokens), "Failed to get quota details")
+        emit({
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "number": number,
+            "quotas": [q.raw for q in quotas],
+        })
+        taken += 1
+
+
+def cmd_profile_summary(args) -> dict:
+    from app.service.profiler import summarize
+
+    summary = summarize(args.dir, args.action, args.top)
+    if not summary["profiles"] and not summary["snapshots"]:
+        raise CommandError(EXIT_NOT_FOUND, f"No profiles in {summary['directory']}, run the menu with PROFILE_DIR set")
+    return summary
+
+
+COMMANDS = {
+    "balance": cmd_balance,
+    "quota": cmd_quota,
+    "my-packages": cmd_my_packages,
+    "family": cmd_family,
+    "history": cmd_history,
+    "profile-summary": cmd_profile_summary,
+}
+
+# Commands the daemon can answer; sentry streams for a long time and runs locally,
+# profile-summary only reads local files
+FORWARDED = set(COMMANDS) - {"profile-summary"}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py", description="Headless mode, prints JSON.")
+    parser.add_argument("--number", type=int, default=None, help="Use this saved account instead of the active one")
+    parser.add_argument("--pretty", action="store_true", help="Indent JSON output")
+    parser.add_argument("--no-daemon", action="store_true", help="Run locally even if a daemon is listening")
+    parser.add_argument("--fresh", action="store_true", help="Bypass the daemon's response cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("balance", help="Balance and expiry")
+    sub.add_parser("quota", help="Raw quota details of active packages")
+
+    p = sub.add_parser("my-packages", help="Active packages with their benefits")
+    p.add_argument("--with-family", action="store_true", help="Also resolve each package's family code (one extra call per package)")
+
+    p = sub.add_parser("family", help="Variants and options of a package family")
+    p.add_argument("family_code")
+    p.add_argument("--enterprise", dest="enterprise", action="store_true", default=None)
+    p.add_argument("--no-enterprise", dest="enterprise", action="store_false")
+    p.add_argument("--migration-type", default=None)
+
+    sub.add_parser("history", help="Transaction history")
+
+    p = sub.add_parser("sentry", help="Sample quota details as JSON lines")
+    p.add_argument("--interval", type=float, default=1.0, help="Seconds between samples")
+    p.add_argument("--count", type=int, default=1, help="Number of samples, 0 to run until interrupted")
+
+    p = sub.add_parser("profile-summary", help="Top functions and allocation sites across profiled menu actions")
+    p.add_argument("--dir", default=None, help="Profile directory (default: PROFILE_DIR or ./profiles)")
+    p.add_argument("--action", default=None, help="Only this menu action, e.g. hot or bot")
+    p.add_argument("--top", type=int, default=20)
+
+    p = sub.add_parser("daemon", help="Keep tokens, connections and caches warm and serve commands over a Unix socket")
+    p.add_argument("--stop", action="store_true", help="Stop a running daemon")
+
+    return parser
+
+
+def run(args, emit) -> int:
+    """Execute a parsed command in this process, passing JSON payloads to emit."""
+    from app.util import UserRequired
+
+    code = EXIT_OK
+    try:
+        with redirect_stdout(sys.stderr):
+            if args.command == "sentry":
+                cmd_sentry(args, emit)
+            else:
+                emit(COMMANDS[args.command](args))
+    except (CommandError, UserRequired) as e:
+        # UserRequired: an auth path needed a human (daemon, non-interactive)
+        code = e.code
+        emit({"error": EXIT_NAMES.get(code, "error"), "message": e.message})
+    except KeyboardInterrupt:
+        code = EXIT_OK if args.command == "sentry" else EXIT_ERROR
+    except Exception as e:
+        import requests
+        from app.client.transport import HTTPStatusError, DecryptError, TransportError
+        if isinstance(e, (HTTPStatusError, DecryptError)):
+            code = EXIT_API_ERROR
+        elif isinstance(e, (TransportError, requests.RequestException)):
+            code = EXIT_NETWORK
+        else:
+            code = EXIT_ERROR
+        emit({"error": EXIT_NAMES[code], "message": str(e)})
+    return code
+
+
+def main(argv: list[str]) -> int:
+    args = build_parser().parse_args(argv)
+    out = sys.stdout
+    indent = 2 if args.pretty else None
+
+    def emit(payload):
+        out.write(json.dumps(payload, indent=indent, ensure_ascii=False) + "\n")
+        out.flush()
+
+    if args.command == "daemon":
+        from app.service import daemon
+        return daemon.stop() if args.stop else daemon.serve()
+
+    if args.command in FORWARDED and not args.no_daemon:
+        from app.service.daemon import forward
+        code = forward(argv, emit)
+        if code is not None:
+            return code
+
+    return run(args, emit)
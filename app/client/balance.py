@@ -3,11 +3,15 @@ import json
 import time
 import uuid
 
-import requests
+from app.client import transport
 from app.client.encrypt import API_KEY, build_encrypted_field, decrypt_xdata, encryptsign_xdata, get_x_signature_payment, java_like_timestamp
 from app.client.engsel import BASE_API_URL, UA, intercept_page, send_api_request
+from app.log import dump, get_logger
 from app.type_dict import PaymentItem
 
+logger = get_logger(__name__)
+
+@transport.action()
 def settlement_balance(
     api_key: str,
     tokens: dict,
@@ -52,11 +56,10 @@ def settlement_balance(
         "token_confirmation": token_confirmation
     }
     
-    print("Getting payment methods...")
+    logger.info("Getting payment methods...")
     payment_res = send_api_request(api_key, payment_path, payment_payload, tokens["id_token"], "POST")
     if payment_res["status"] != "SUCCESS":
-        print("Failed to fetch payment methods.")
-        print(f"Error: {payment_res}")
+        logger.error("Failed to fetch payment methods: %s", payment_res)
         return payment_res
     
     token_payment = payment_res["data"]["token_payment"]
@@ -168,19 +171,20 @@ def settlement_balance(
     }
     
     url = f"{BASE_API_URL}/{path}"
-    print("Sending settlement request...")
-    resp = requests.post(url, headers=headers, data=json.dumps(body), timeout=30)
+    logger.info("Sending settlement request...")
+    resp = transport.post(url, headers=headers, data=json.dumps(body), timeout=30)
     
     try:
         decrypted_body = decrypt_xdata(api_key, json.loads(resp.text))
         if decrypted_body["status"] != "SUCCESS":
-            print("Failed to initiate settlement.")
-            print(f"Error: {decrypted_body}")
+            logger.error("Failed to initiate settlement: %s", decrypted_body)
             return decrypted_body
         
-        print(f"Purchase result:\n{json.dumps(decrypted_body, indent=2)}")
+        logger.info("Purchase result: %s", decrypted_body["status"])
+        logger.debug("Settlement response:\n%s", dump(decrypted_body))
         
         return decrypted_body
+    except transport.TransportError:
+        raise
     except Exception as e:
-        print("[decrypt err]", e)
-        return resp.text
\ No newline at end of file
+        raise transport.DecryptError(f"Settlement response could not be decrypted: {e}", resp.text, path) from e
\ No newline at end of file
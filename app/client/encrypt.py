@@ -1,6 +1,5 @@
 import os
 import hashlib
-import requests
 import base64
 
 from random import randint
@@ -10,11 +9,14 @@ from Crypto.Cipher import AES
 from Crypto.Util.Padding import pad
 from dataclasses import dataclass
 
+from app.client import transport
+
 API_KEY = os.getenv("API_KEY")
 AES_KEY_ASCII = os.getenv("AES_KEY_ASCII")
 AX_FP_KEY = os.getenv("AX_FP_KEY")
 
-BASE_CRYPTO_URL = "https://crypto.mashu.lol/api/870"
+BASE_CRYPTO_HOST = os.getenv("BASE_CRYPTO_HOST", "https://crypto.mashu.lol")
+BASE_CRYPTO_URL = f"{BASE_CRYPTO_HOST}/api/870"
 
 XDATA_DECRYPT_URL = f"{BASE_CRYPTO_URL}/decrypt"
 XDATA_ENCRYPT_SIGN_URL = f"{BASE_CRYPTO_URL}/encryptsign"
@@ -125,7 +127,7 @@ def ax_api_signature(
         "contact_type": contact_type
     }
     
-    response = requests.request("POST", AX_SIGN_URL, json=request_body, headers=headers, timeout=30)
+    response = transport.request("POST", AX_SIGN_URL, json=request_body, headers=headers, timeout=30)
     if response.status_code == 200:
         return response.json().get("ax_signature")
     else:
@@ -136,7 +138,8 @@ def encryptsign_xdata(
         method: str,
         path: str,
         id_token: str,
-        payload: dict
+        payload: dict,
+        timeout: float = 30,
     ) -> str:
     headers = {
         "Content-Type": "application/json",
@@ -150,16 +153,17 @@ def encryptsign_xdata(
         "body": payload
     }
 
-    response = requests.request("POST", XDATA_ENCRYPT_SIGN_URL, json=request_body, headers=headers, timeout=30)
+    response = transport.request("POST", XDATA_ENCRYPT_SIGN_URL, json=request_body, headers=headers, timeout=timeout)
     
     if response.status_code == 200:
         return response.json()
     else:
-        raise Exception(f"Encryption failed: {response.text}")
+        raise transport.HTTPStatusError(response.status_code, response.text, XDATA_ENCRYPT_SIGN_URL)
     
 def decrypt_xdata(
     api_key: str,
-    encrypted_payload: dict
+    encrypted_payload: dict,
+    timeout: float = 30,
     ) -> dict:
     if not isinstance(encrypted_payload, dict) or "xdata" not in encrypted_payload or "xtime" not in encrypted_payload:
         raise ValueError("Invalid encrypted data format. Expected a dictionary with 'xdata' and 'xtime' keys.")
@@ -169,12 +173,12 @@ def decrypt_xdata(
         "x-api-key": api_key,
     }
     
-    response = requests.request("POST", XDATA_DECRYPT_URL, json=encrypted_payload, headers=headers, timeout=30)
+    response = transport.request("POST", XDATA_DECRYPT_URL, json=encrypted_payload, headers=headers, timeout=timeout)
     
     if response.status_code == 200:
         return response.json().get("plaintext")
     else:
-        raise Exception(f"Decryption failed: {response.text}")
+        raise transport.HTTPStatusError(response.status_code, response.text, XDATA_DECRYPT_URL)
 
 def get_x_signature_payment(
         api_key: str,
@@ -201,7 +205,7 @@ def get_x_signature_payment(
         "path": path,
     }
     
-    response = requests.request("POST", PAYMENT_SIGN_URL, json=request_body, headers=headers, timeout=30)
+    response = transport.request("POST", PAYMENT_SIGN_URL, json=request_body, headers=headers, timeout=30)
     
     if response.status_code == 200:
         return response.json().get("x_signature")
@@ -227,7 +231,7 @@ def get_x_signature_bounty(
         "token_payment": token_payment
     }
     
-    response = requests.request("POST", BOUNTY_SIGN_URL, json=request_body, headers=headers, timeout=30)
+    response = transport.request("POST", BOUNTY_SIGN_URL, json=request_body, headers=headers, timeout=30)
     if response.status_code == 200:
         return response.json().get("x_signature")
     else:
@@ -256,7 +260,7 @@ def get_x_signature_loyalty(
         "path": path
     }
     
-    response = requests.request("POST", LOYALTY_SIGN_URL, json=request_body, headers=headers, timeout=30)
+    response = transport.request("POST", LOYALTY_SIGN_URL, json=request_body, headers=headers, timeout=30)
     if response.status_code == 200:
         return response.json().get("x_signature")
     else:
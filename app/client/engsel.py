@@ -5,12 +5,19 @@ import requests
 
 from datetime import datetime, timezone, timedelta
 
+from app.client import transport
+from app.client.models import Balance, CategoryFamily, FamilyData, PackageDetail, Quota
+from app.log import dump, get_logger
+from app.service.cache import CacheInstance
+from app.service.catalogue import CatalogueInstance
+from app.service.metrics import MetricsInstance
 from app.client.encrypt import (
     encryptsign_xdata,
     java_like_timestamp,
     ts_gmt7_without_colon,
     ax_api_signature,
     decrypt_xdata,
+    BASE_CRYPTO_URL,
     API_KEY,
     load_ax_fp,
     ax_device_id
@@ -27,10 +34,17 @@ AX_DEVICE_ID = ax_device_id()
 AX_FP = load_ax_fp()
 SUBMIT_OTP_URL = BASE_CIAM_URL + "/realms/xl-ciam/protocol/openid-connect/token"
 UA = os.getenv("UA")
+FAMILY_CACHE_TTL = 300  # seconds a resolved family payload is reused
+
+logger = get_logger(__name__)
+
+def prewarm_connections(*extra_urls: str):
+    """Pre-connect to the crypto service, CIAM and the API (plus extra_urls) in the background."""
+    return transport.prewarm([BASE_CRYPTO_URL, BASE_CIAM_URL, BASE_API_URL, *extra_urls])
 
 def validate_contact(contact: str) -> bool:
     if not contact.startswith("628") or len(contact) > 14:
-        print("Invalid number")
+        logger.warning("Invalid number")
         return False
     return True
 
@@ -67,28 +81,27 @@ def get_otp(contact: str) -> str:
         "User-Agent": UA,
     }
 
-    print("Requesting OTP...")
+    logger.info("Requesting OTP...")
     try:
-        response = requests.request("GET", url, data=payload, headers=headers, params=querystring, timeout=30)
-        print("response body", response.text)
+        response = transport.request("GET", url, data=payload, headers=headers, params=querystring, timeout=30)
+        logger.debug("OTP response body: %s", response.text)
         json_body = json.loads(response.text)
     
         if "subscriber_id" not in json_body:
-            print(json_body.get("error", "No error message in response"))
+            logger.error(json_body.get("error", "No error message in response"))
             raise ValueError("Subscriber ID not found in response")
         
         return json_body["subscriber_id"]
     except Exception as e:
-        print(f"Error requesting OTP: {e}")
+        logger.error("Error requesting OTP: %s", e)
         return None
     
 def submit_otp(api_key: str, contact: str, code: str):
     if not validate_contact(contact):
-        print("Invalid number")
         return None
     
     if not code or len(code) != 6:
-        print("Invalid OTP code format")
+        logger.warning("Invalid OTP code format")
         return None
     
     url = SUBMIT_OTP_URL
@@ -116,17 +129,17 @@ def submit_otp(api_key: str, contact: str, code: str):
     }
 
     try:
-        response = requests.post(url, data=payload, headers=headers, timeout=30)
+        response = transport.post(url, data=payload, headers=headers, timeout=30)
         json_body = json.loads(response.text)
         
         if "error" in json_body:
-            print(f"[Error submit_otp]: {json_body['error_description']}")
+            logger.error("[Error submit_otp]: %s", json_body['error_description'])
             return None
         
-        print("Login successful.")
+        logger.info("Login successful.")
         return json_body
     except requests.RequestException as e:
-        print(f"[Error submit_otp]: {e}")
+        logger.error("[Error submit_otp]: %s", e)
         return None
 
 def get_new_token(refresh_token: str) -> str:
@@ -155,21 +168,27 @@ def get_new_token(refresh_token: str) -> str:
         "refresh_token": refresh_token
     }
 
-    resp = requests.post(url, headers=headers, data=data, timeout=30)
+    resp = transport.post(url, headers=headers, data=data, timeout=30)
     if resp.status_code == 400:
         if resp.json().get("error_description") == "Session not active":
-            print("Refresh token expired. Pleas remove and re-add the account.")
+            MetricsInstance.inc("engsel_token_refresh_total", {"result": "rejected"})
+            logger.warning("Refresh token expired. Please remove and re-add the account.")
             return None
         
+    if not resp.ok:
+        MetricsInstance.inc("engsel_token_refresh_total", {"result": "error"})
     resp.raise_for_status()
 
     body = resp.json()
     
     if "id_token" not in body:
+        MetricsInstance.inc("engsel_token_refresh_total", {"result": "error"})
         raise ValueError("ID token not found in response")
     if "error" in body:
+        MetricsInstance.inc("engsel_token_refresh_total", {"result": "error"})
         raise ValueError(f"Error in response: {body['error']} - {body.get('error_description', '')}")
     
+    MetricsInstance.inc("engsel_token_refresh_total", {"result": "ok"})
     return body
 
 def send_api_request(
@@ -178,52 +197,86 @@ def send_api_request(
     payload_dict: dict,
     id_token: str,
     method: str = "POST",
-):
-    encrypted_payload = encryptsign_xdata(
-        api_key=api_key,
-        method=method,
-        path=path,
-        id_token=id_token,
-        payload=payload_dict
-    )
-    
-    xtime = int(encrypted_payload["encrypted_body"]["xtime"])
-    
-    now = datetime.now(timezone.utc).astimezone()
-    sig_time_sec = (xtime // 1000)
+    deadline: float | None = None,
+) -> dict:
+    """
+    Sign, send and decrypt one API call. Returns the decrypted body (API
+    level errors keep their "status" field). Network, HTTP and decrypt
+    failures raise transport.TransportError; reads listed in
+    transport.IDEMPOTENT_PATHS are retried with backoff within `deadline`,
+    and concurrent identical reads share a single network call.
+    """
+    if not id_token:
+        # Account selected offline (tokens.get("id_token") on OfflineTokens)
+        raise transport.TransportConnectionError("No id_token yet, login server unreachable", path)
+    logger.debug("%s %s payload:\n%s", method, path, dump(payload_dict))
+
+    def attempt(timeout: float) -> dict:
+        # Signed per attempt: the signature carries the request time
+        encrypted_payload = encryptsign_xdata(
+            api_key=api_key,
+            method=method,
+            path=path,
+            id_token=id_token,
+            payload=payload_dict,
+            timeout=timeout,
+        )
+        
+        xtime = int(encrypted_payload["encrypted_body"]["xtime"])
+        
+        now = datetime.now(timezone.utc).astimezone()
+        sig_time_sec = (xtime // 1000)
 
-    body = encrypted_payload["encrypted_body"]
-    x_sig = encrypted_payload["x_signature"]
-    
-    headers = {
-        "host": BASE_API_URL.replace("https://", ""),
-        "content-type": "application/json; charset=utf-8",
-        "user-agent": UA,
-        "x-api-key": API_KEY,
-        "authorization": f"Bearer {id_token}",
-        "x-hv": "v3",
-        "x-signature-time": str(sig_time_sec),
-        "x-signature": x_sig,
-        "x-request-id": str(uuid.uuid4()),
-        "x-request-at": java_like_timestamp(now),
-        "x-version-app": "8.7.0",
-    }
-    
-    
+        body = encrypted_payload["encrypted_body"]
+        x_sig = encrypted_payload["x_signature"]
+        
+        headers = {
+            "host": BASE_API_URL.replace("https://", ""),
+            "content-type": "application/json; charset=utf-8",
+            "user-agent": UA,
+            "x-api-key": API_KEY,
+            "authorization": f"Bearer {id_token}",
+            "x-hv": "v3",
+            "x-signature-time": str(sig_time_sec),
+            "x-signature": x_sig,
+            "x-request-id": str(uuid.uuid4()),
+            "x-request-at": java_like_timestamp(now),
+            "x-version-app": "8.7.0",
+        }
+
+        url = f"{BASE_API_URL}/{path}"
+        resp = transport.post(url, headers=headers, data=json.dumps(body), timeout=timeout)
+
+
+        try:
+            encrypted_body = json.loads(resp.text)
+        except ValueError:
+            encrypted_body = None
+        if not isinstance(encrypted_body, dict) or "xdata" not in encrypted_body:
+            if resp.status_code >= 400:
+                raise transport.HTTPStatusError(resp.status_code, resp.text, path)
+            raise transport.DecryptError("Response is not an encrypted payload", resp.text, path)
+
+        decrypted_body = decrypt_xdata(api_key, encrypted_body, timeout=timeout)
+        if not isinstance(decrypted_body, dict):
+            raise transport.DecryptError("Decrypted payload is not an object", resp.text, path)
+        logger.debug("%s response:\n%s", path, dump(decrypted_body))
+        return decrypted_body
 
-    url = f"{BASE_API_URL}/{path}"
-    resp = requests.post(url, headers=headers, data=json.dumps(body), timeout=30)
-    
-    # print(f"Headers: {json.dumps(headers, indent=2)}")
-    # print(f"Response body: {resp.text}")
+    if not transport.is_idempotent(path):
+        return transport.call_with_retry(path, attempt, deadline)
+    return transport.flights.do(
+        transport.flight_key(path, payload_dict, id_token),
+        lambda: transport.call_with_retry(path, attempt, deadline),
+        path,
+    )
 
+def _record_catalogue(record, *args):
+    # The local catalogue is best-effort, never let it break a fetch
     try:
-        decrypted_body = decrypt_xdata(api_key, json.loads(resp.text))
-        # print(f"Decrypted body: {json.dumps(decrypted_body, indent=2)}")
-        return decrypted_body
+        record(*args)
     except Exception as e:
-        print("[decrypt err]", e)
-        return resp.text
+        logger.warning("[catalogue] %s", e)
 
 def get_profile(api_key: str, access_token: str, id_token: str) -> dict:
     path = "api/v8/profile"
@@ -235,12 +288,12 @@ def get_profile(api_key: str, access_token: str, id_token: str) -> dict:
         "lang": "en"
     }
 
-    print("Fetching profile...")
+    logger.info("Fetching profile...")
     res = send_api_request(api_key, path, raw_payload, id_token, "POST")
 
     return res.get("data")
 
-def get_balance(api_key: str, id_token: str) -> dict:
+def get_balance(api_key: str, id_token: str) -> Balance | None:
     path = "api/v8/packages/balance-and-credit"
     
     raw_payload = {
@@ -248,25 +301,50 @@ def get_balance(api_key: str, id_token: str) -> dict:
         "lang": "en"
     }
     
-    print("Fetching balance...")
+    logger.info("Fetching balance...")
     res = send_api_request(api_key, path, raw_payload, id_token, "POST")
-    # print(f"[GB-256]:\n{json.dumps(res, indent=2)}")
     
     if "data" in res:
         if "balance" in res["data"]:
-            return res["data"]["balance"]
+            return Balance.from_dict(res["data"]["balance"])
     else:
-        print("Error getting balance:", res.get("error", "Unknown error"))
+        logger.error("Error getting balance: %s", res.get("error", "Unknown error"))
         return None
 
+def get_quota_details(api_key: str, tokens: dict) -> list[Quota] | None:
+    path = "api/v8/packages/quota-details"
+
+    raw_payload = {
+        "is_enterprise": False,
+        "lang": "en",
+        "family_member_id": ""
+    }
+
+    logger.info("Fetching quota details...")
+    res = send_api_request(api_key, path, raw_payload, tokens["id_token"], "POST")
+
+    if res.get("status") != "SUCCESS":
+        logger.error("Error getting quota details: %s", res.get("error", "Unknown error"))
+        return None
+
+    return [Quota.from_dict(q) for q in res["data"].get("quotas", [])]
+
+@transport.action()
 def get_family(
     api_key: str,
     tokens: dict,
     family_code: str,
     is_enterprise: bool | None = None,
     migration_type: str | None = None
-) -> dict:
-    print("Fetching package family...")
+) -> FamilyData | None:
+    # Served from the shared cache when a recent fetch (or the prefetcher)
+    # resolved it for the same account: prices and eligibility differ per account
+    cache_key = ("family", tokens.get("id_token"), family_code, is_enterprise, migration_type)
+    cached = CacheInstance.get(cache_key, FAMILY_CACHE_TTL)
+    if cached is not None:
+        return cached
+
+    logger.info("Fetching package family...")
     
     is_enterprise_list = [
         False,
@@ -290,6 +368,9 @@ def get_family(
     id_token = tokens.get("id_token")
 
     family_data = None
+    # (is_enterprise, migration_type) that returned the family; the loop
+    # variables move on once more before the loops break
+    resolved = None
 
     for mt in migration_type_list:
         if family_data is not None:
@@ -299,7 +380,7 @@ def get_family(
             if family_data is not None:
                 break
         
-            print(f"Trying is_enterprise={ie}, migration_type={mt}.")
+            logger.debug("Trying is_enterprise=%s, migration_type=%s.", ie, mt)
 
             payload_dict = {
                 "is_show_tagging_tab": True,
@@ -316,24 +397,27 @@ def get_family(
             }
         
             res = send_api_request(api_key, path, payload_dict, id_token, "POST")
-            # print(f"[get fam 320]:\n{json.dumps(res, indent=2)}")
             if res.get("status") != "SUCCESS":
                 continue
             
             family_name = res["data"]["package_family"].get("name", "")
             if family_name != "":
                 family_data = res["data"]
-                print(f"Success with is_enterprise={ie}, migration_type={mt}. Family name: {family_name}")
+                resolved = (ie, mt)
+                logger.debug("Success with is_enterprise=%s, migration_type=%s. Family name: %s", ie, mt, family_name)
 
 
     if family_data is None:
-        print(f"Failed to get valid family data for {family_code}")
+        logger.warning("Failed to get valid family data for %s", family_code)
         return None
 
-    return family_data
+    family = FamilyData.from_dict(family_data, family_code)
+    CacheInstance.put(cache_key, family)
+    _record_catalogue(CatalogueInstance.record_family, family_code, family_data, resolved[0])
+    return family
 
-def get_families(api_key: str, tokens: dict, package_category_code: str) -> dict:
-    print("Fetching families...")
+def get_families(api_key: str, tokens: dict, package_category_code: str) -> list[CategoryFamily] | None:
+    logger.info("Fetching families...")
     path = "api/v8/xl-stores/families"
     payload_dict = {
         "migration_type": "",
@@ -347,12 +431,20 @@ def get_families(api_key: str, tokens: dict, package_category_code: str) -> dict
     
     res = send_api_request(api_key, path, payload_dict, tokens["id_token"], "POST")
     if res.get("status") != "SUCCESS":
-        print(f"Failed to get families for category {package_category_code}")
-        print(f"Res:{res}")
-        # print(json.dumps(res, indent=2))
-        input("Press Enter to continue...")
+        logger.error("Failed to get families for category %s", package_category_code)
         return None
-    return res["data"]
+
+    data = res.get("data")
+    if isinstance(data, dict):
+        data = next((data[k] for k in ("results", "families", "package_families") if k in data), None)
+    if not isinstance(data, list):
+        # Not stored: an empty list would hide the category until it expires
+        logger.error("Unrecognised families response for category %s", package_category_code)
+        return None
+    families = [CategoryFamily.from_dict(f) for f in data if isinstance(f, dict)]
+    families = [f for f in families if f.code]
+    _record_catalogue(CatalogueInstance.record_category, package_category_code, families)
+    return families
 
 def get_package(
     api_key: str,
@@ -360,7 +452,7 @@ def get_package(
     package_option_code: str,
     package_family_code: str = "",
     package_variant_code: str = ""
-    ) -> dict:
+    ) -> PackageDetail | None:
     path = "api/v8/xl-stores/options/detail"
     
     raw_payload = {
@@ -378,16 +470,15 @@ def get_package(
         "package_variant_code": package_variant_code
     }
     
-    print("Fetching package...")
-    # print(f"Payload: {json.dumps(raw_payload, indent=2)}")
+    logger.info("Fetching package...")
     res = send_api_request(api_key, path, raw_payload, tokens["id_token"], "POST")
     
     if "data" not in res:
-        print(json.dumps(res, indent=2))
-        print("Error getting package:", res.get("error", "Unknown error"))
+        logger.error("Error getting package: %s", res.get("error", "Unknown error"))
         return None
         
-    return res["data"]
+    _record_catalogue(CatalogueInstance.record_package, res["data"])
+    return PackageDetail.from_dict(res["data"])
 
 def get_addons(api_key: str, tokens: dict, package_option_code: str) -> dict:
     path = "api/v8/xl-stores/options/addons-pinky-box"
@@ -398,11 +489,11 @@ def get_addons(api_key: str, tokens: dict, package_option_code: str) -> dict:
         "package_option_code": package_option_code
     }
     
-    print("Fetching addons...")
+    logger.info("Fetching addons...")
     res = send_api_request(api_key, path, raw_payload, tokens["id_token"], "POST")
     
     if "data" not in res:
-        print("Error getting addons:", res.get("error", "Unknown error"))
+        logger.error("Error getting addons: %s", res.get("error", "Unknown error"))
         return None
         
     return res["data"]
@@ -421,13 +512,13 @@ def intercept_page(
         "package_option_code": option_code
     }
     
-    print("Fetching intercept page...")
+    logger.info("Fetching intercept page...")
     res = send_api_request(api_key, path, raw_payload, tokens["id_token"], "POST")
     
     if "status" in res:
-        print(f"Intercept status: {res['status']}")
+        logger.debug("Intercept status: %s", res['status'])
     else:
-        print("Intercept error")
+        logger.warning("Intercept error")
 
 def login_info(
     api_key: str,
@@ -445,12 +536,12 @@ def login_info(
     res = send_api_request(api_key, path, raw_payload, tokens["id_token"], "POST")
     
     if "data" not in res:
-        print(json.dumps(res, indent=2))
-        print("Error getting package:", res.get("error", "Unknown error"))
+        logger.error("Error getting login info: %s", res.get("error", "Unknown error"))
         return None
         
     return res["data"]
 
+@transport.action()
 def get_package_details(
     api_key: str,
     tokens: dict,
@@ -459,33 +550,20 @@ def get_package_details(
     option_order: int,
     is_enterprise: bool | None = None,
     migration_type: str | None = None
-) -> dict | None:
+) -> PackageDetail | None:
     family_data = get_family(api_key, tokens, family_code, is_enterprise, migration_type)
     if not family_data:
-        print(f"Gagal mengambil data family untuk {family_code}.")
+        logger.warning("Gagal mengambil data family untuk %s.", family_code)
         return None
     
-    package_options = []
-    
-    package_variants = family_data["package_variants"]
-    option_code = None
-    for variant in package_variants:
-        if variant["package_variant_code"] == variant_code:
-            selected_variant = variant
-            package_options = selected_variant["package_options"]
-            for option in package_options:
-                if option["order"] == option_order:
-                    selected_option = option
-                    option_code = selected_option["package_option_code"]
-                    break
-
-    if option_code is None:
-        print("Gagal menemukan opsi paket yang sesuai.")
+    found = family_data.find_option(option_order, variant_code=variant_code)
+    if found is None:
+        logger.warning("Gagal menemukan opsi paket yang sesuai.")
         return None
         
-    package_details_data = get_package(api_key, tokens, option_code)
+    package_details_data = get_package(api_key, tokens, found[1].code)
     if not package_details_data:
-        print("Gagal mengambil detail paket.")
+        logger.warning("Gagal mengambil detail paket.")
         return None
     
     return package_details_data
@@ -1,5 +1,7 @@
-import json
 from app.client.engsel import send_api_request
+from app.log import get_logger
+
+logger = get_logger(__name__)
 
 
 def get_pending_transaction(api_key: str, tokens: dict) -> dict:
@@ -11,7 +13,7 @@ def get_pending_transaction(api_key: str, tokens: dict) -> dict:
         "lang": "en"
     }
 
-    print("Fetching pending transactions...")
+    logger.info("Fetching pending transactions...")
     res = send_api_request(api_key, path, raw_payload, tokens["id_token"], "POST")
 
     # {
@@ -48,9 +50,8 @@ def get_transaction_history(api_key: str, tokens: dict) -> dict:
         "lang": "en"
     }
 
-    print("Fetching transaction history...")
+    logger.info("Fetching transaction history...")
     res = send_api_request(api_key, path, raw_payload, tokens["id_token"], "POST")
-    # print(json.dumps(res, indent=4))
 
 # {
 #   "code": "000",
@@ -100,9 +101,8 @@ def get_tiering_info(api_key: str, tokens: dict) -> dict:
     # "status": "SUCCESS"
     # }
 
-    print("Fetching tiering info...")
+    logger.info("Fetching tiering info...")
     res = send_api_request(api_key, path, raw_payload, tokens["id_token"], "POST")
-    # print(json.dumps(res, indent=4))
     
     if res:
         return res.get("data", {})
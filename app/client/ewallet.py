@@ -1,14 +1,18 @@
 import json
 import uuid
 import time
-import requests
 
 from datetime import datetime, timezone, timedelta
 
+from app.client import transport
 from app.client.engsel import BASE_API_URL, UA, intercept_page, send_api_request
 from app.client.encrypt import API_KEY, decrypt_xdata, encryptsign_xdata, java_like_timestamp, get_x_signature_payment
+from app.log import dump, get_logger
 from app.type_dict import PaymentItem
 
+logger = get_logger(__name__)
+
+@transport.action()
 def settlement_multipayment(
     api_key: str,
     tokens: dict,
@@ -23,7 +27,7 @@ def settlement_multipayment(
 ):
     # Sanity check
     if overwrite_amount == -1 and not ask_overwrite:
-        print("Either ask_overwrite must be True or overwrite_amount must be set.")
+        logger.error("Either ask_overwrite must be True or overwrite_amount must be set.")
         return None
 
     token_confirmation = items[token_confirmation_idx]["token_confirmation"]
@@ -65,11 +69,10 @@ def settlement_multipayment(
         "token_confirmation": token_confirmation
     }
     
-    print("Getting payment methods...")
+    logger.info("Getting payment methods...")
     payment_res = send_api_request(api_key, payment_path, payment_payload, tokens["id_token"], "POST")
     if payment_res["status"] != "SUCCESS":
-        print("Failed to fetch payment methods.")
-        print(f"Error: {payment_res}")
+        logger.error("Failed to fetch payment methods: %s", payment_res)
         return None
     
     token_payment = payment_res["data"]["token_payment"]
@@ -154,15 +157,17 @@ def settlement_multipayment(
     }
     
     url = f"{BASE_API_URL}/{path}"
-    print("Sending settlement request...")
-    resp = requests.post(url, headers=headers, data=json.dumps(body), timeout=30)
+    logger.info("Sending settlement request...")
+    resp = transport.post(url, headers=headers, data=json.dumps(body), timeout=30)
     
     try:
         decrypted_body = decrypt_xdata(api_key, json.loads(resp.text))
+        logger.debug("Settlement response:\n%s", dump(decrypted_body))
         return decrypted_body
+    except transport.TransportError:
+        raise
     except Exception as e:
-        print("[decrypt err]", e)
-        return resp.text
+        raise transport.DecryptError(f"Settlement response could not be decrypted: {e}", resp.text, path) from e
 
 def show_multipayment(
     api_key: str,
@@ -220,10 +225,8 @@ def show_multipayment(
         amount_idx,
     )
     
-    # print(f"Settlement response: {json.dumps(settlement_response, indent=2)}")
     if settlement_response["status"] != "SUCCESS":
-        print("Failed to initiate settlement.")
-        print(f"Error: {settlement_response}")
+        logger.error("Failed to initiate settlement: %s", settlement_response)
         return
     
     if payment_method != "OVO":
@@ -0,0 +1,293 @@
+"""
+Typed views of the API payloads, parsed once at the client boundary.
+
+Each model keeps the decoded payload in `raw` for fields that are not
+modelled and for JSON output; everything the menus read is a slot.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+
+def format_bytes(value: int) -> str:
+    if value >= 1_000_000_000:
+        return f"{value / (1024 ** 3):.2f} GB"
+    if value >= 1_000_000:
+        return f"{value / (1024 ** 2):.2f} MB"
+    if value >= 1_000:
+        return f"{value / 1024:.2f} KB"
+    return str(value)
+
+
+def _int(value) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+@dataclass(slots=True)
+class Benefit:
+    name: str
+    data_type: str
+    total: int
+    remaining: int
+    is_unlimited: bool
+    item_id: str
+    category: str
+    raw: Dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Benefit":
+        return cls(
+            name=d.get("name") or "",
+            data_type=(d.get("data_type") or d.get("dataType") or "").upper(),
+            total=_int(d.get("total")),
+            remaining=_int(d.get("remaining")),
+            is_unlimited=bool(d.get("is_unlimited", False)),
+            item_id=d.get("item_id") or d.get("id") or "",
+            category=(d.get("category") or "").upper(),
+            raw=d,
+        )
+
+    def format_amount(self, value: int) -> str:
+        """Human readable amount in the benefit's unit (bytes, seconds of voice, SMS)."""
+        if self.data_type == "DATA":
+            return format_bytes(value)
+        if self.data_type == "VOICE":
+            return f"{value / 60:.2f} menit"
+        if self.data_type == "TEXT":
+            return f"{value} SMS"
+        return f"{value} ({self.data_type})" if self.data_type else str(value)
+
+    def format_usage(self) -> str:
+        """"remaining / total" in the benefit's unit."""
+        if self.data_type == "VOICE":
+            return f"{self.remaining / 60:.2f} / {self.total / 60:.2f} menit"
+        if self.data_type == "TEXT":
+            return f"{self.remaining} / {self.total} SMS"
+        if self.data_type == "DATA":
+            return f"{format_bytes(self.remaining)} / {format_bytes(self.total)}"
+        return f"{self.remaining} / {self.total}"
+
+    def main_score(self) -> int:
+        """How likely this is the package's main quota (main/regular data, biggest first)."""
+        name = self.name.lower()
+        score = 0
+        if "utama" in name or "main" in name or "regular" in name:
+            score += 3
+        if self.data_type == "DATA":
+            score += 2
+        if "DATA_MAIN" in self.category or "MAIN" in self.category:
+            score += 2
+        return score + self.total // (1024 ** 2)
+
+
+def _benefits(items) -> Tuple[Benefit, ...]:
+    if not isinstance(items, list):
+        return ()
+    return tuple(Benefit.from_dict(b) for b in items if isinstance(b, dict))
+
+
+@dataclass(slots=True)
+class Option:
+    code: str
+    name: str
+    price: int
+    order: int
+    validity: str
+    point: int
+    tnc: str
+    benefits: Tuple[Benefit, ...]
+    raw: Dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Option":
+        return cls(
+            code=d.get("package_option_code") or "",
+            name=d.get("name") or "",
+            price=_int(d.get("price")),
+            order=_int(d.get("order")),
+            validity=d.get("validity") or "",
+            point=_int(d.get("point")),
+            tnc=d.get("tnc") or "",
+            benefits=_benefits(d.get("benefits")),
+            raw=d,
+        )
+
+
+@dataclass(slots=True)
+class Variant:
+    code: str
+    name: str
+    options: Tuple[Option, ...]
+    options_by_order: Dict[int, Option] = field(repr=False)
+    raw: Dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Variant":
+        options = tuple(Option.from_dict(o) for o in d.get("package_options", []))
+        return cls(
+            code=d.get("package_variant_code") or "",
+            name=d.get("name") or "",
+            options=options,
+            options_by_order={o.order: o for o in options},
+            raw=d,
+        )
+
+
+@dataclass(slots=True)
+class FamilyData:
+    """options/list response: a family with its variants and their options."""
+    code: str
+    name: str
+    family_type: str
+    rc_bonus_type: str
+    variants: Tuple[Variant, ...]
+    # Variant names are not unique within a family
+    variants_by_name: Dict[str, Tuple[Variant, ...]] = field(repr=False)
+    variants_by_code: Dict[str, Variant] = field(repr=False)
+    options_by_code: Dict[str, Option] = field(repr=False)
+    raw: Dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any], family_code: str = "") -> "FamilyData":
+        family = d.get("package_family", {})
+        variants = tuple(Variant.from_dict(v) for v in d.get("package_variants", []))
+        by_name: Dict[str, Tuple[Variant, ...]] = {}
+        for v in variants:
+            by_name[v.name] = by_name.get(v.name, ()) + (v,)
+        return cls(
+            code=family.get("package_family_code") or family_code,
+            name=family.get("name") or "",
+            family_type=family.get("package_family_type") or "",
+            rc_bonus_type=family.get("rc_bonus_type") or "",
+            variants=variants,
+            variants_by_name=by_name,
+            variants_by_code={v.code: v for v in variants},
+            options_by_code={o.code: o for v in variants for o in v.options},
+            raw=d,
+        )
+
+    def find_option(
+        self,
+        order: int,
+        variant_name: Optional[str] = None,
+        variant_code: Optional[str] = None,
+    ) -> Optional[Tuple[Variant, Option]]:
+        """Look up an option by its order within a variant given by name or code."""
+        if variant_code is not None:
+            variant = self.variants_by_code.get(variant_code)
+            candidates = (variant,) if variant else ()
+        else:
+            candidates = self.variants_by_name.get(variant_name, ())
+        for variant in candidates:
+            option = variant.options_by_order.get(order)
+            if option:
+                return variant, option
+        return None
+
+
+@dataclass(slots=True)
+class CategoryFamily:
+    """One family of a families (store category) response."""
+    code: str
+    name: str
+    raw: Dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "CategoryFamily":
+        return cls(
+            code=d.get("id") or d.get("package_family_code") or d.get("code") or "",
+            name=d.get("label") or d.get("name") or "",
+            raw=d,
+        )
+
+
+@dataclass(slots=True)
+class PackageDetail:
+    """options/detail response for one option."""
+    option: Option
+    family_code: str
+    family_name: str
+    payment_for: str
+    plan_type: str
+    variant_code: str
+    variant_name: str
+    token_confirmation: str
+    timestamp: int
+    raw: Dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "PackageDetail":
+        family = d.get("package_family") or {}
+        variant = d.get("package_detail_variant") or {}
+        return cls(
+            option=Option.from_dict(d.get("package_option") or {}),
+            family_code=family.get("package_family_code") or "",
+            family_name=family.get("name") or "",
+            payment_for=family.get("payment_for") or "",
+            plan_type=family.get("plan_type") or "",
+            variant_code=variant.get("package_variant_code") or "",
+            variant_name=variant.get("name") or "",
+            token_confirmation=d.get("token_confirmation") or "",
+            timestamp=_int(d.get("timestamp")),
+            raw=d,
+        )
+
+    @property
+    def title(self) -> str:
+        return f"{self.family_name} - {self.variant_name} - {self.option.name}".strip()
+
+
+@dataclass(slots=True)
+class Quota:
+    """One active package from quota-details."""
+    name: str
+    quota_code: str
+    group_code: str
+    group_name: str
+    family_code: str
+    benefits: Tuple[Benefit, ...]
+    main_benefit: Benefit
+    raw: Dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Quota":
+        benefits = _benefits(d.get("benefits") or d.get("quota_benefits"))
+        if benefits:
+            main = max(benefits, key=Benefit.main_score)
+            if not main.name:
+                main = Benefit.from_dict({**main.raw, "name": "Kuota Utama"})
+        else:
+            # Quota-level totals when the package lists no benefits
+            main = Benefit.from_dict({
+                "name": "Kuota",
+                "data_type": "DATA",
+                "total": d.get("total"),
+                "remaining": d.get("remaining"),
+            })
+        return cls(
+            name=d.get("name") or d.get("quota_name") or "",
+            quota_code=d.get("quota_code") or d.get("code") or "",
+            group_code=d.get("group_code") or "",
+            group_name=d.get("group_name") or "",
+            family_code=d.get("family_code") or "",
+            benefits=benefits,
+            main_benefit=main,
+            raw=d,
+        )
+
+
+@dataclass(slots=True)
+class Balance:
+    remaining: int
+    expired_at: int
+    raw: Dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Balance":
+        return cls(
+            remaining=_int(d.get("remaining")),
+            expired_at=_int(d.get("expired_at")),
+            raw=d,
+        )
@@ -1,11 +1,12 @@
 import os
 import json
 import uuid
-import requests
 
 from datetime import datetime, timezone
 
+from app.client import transport
 from app.client.engsel import send_api_request, BASE_API_URL, UA
+from app.log import dump, get_logger
 from app.client.encrypt import (
     API_KEY,
     build_encrypted_field,
@@ -21,6 +22,8 @@ AX_DEVICE_ID = os.getenv("AX_DEVICE_ID")
 AX_FP = os.getenv("AX_FP")
 UA = os.getenv("UA")
 
+logger = get_logger(__name__)
+
 def get_payment_methods(
     api_key: str,
     tokens: dict,
@@ -39,12 +42,12 @@ def get_payment_methods(
     
     payment_res = send_api_request(api_key, payment_path, payment_payload, tokens["id_token"], "POST")
     if payment_res["status"] != "SUCCESS":
-        print("Failed to fetch payment methods.")
-        print(f"Error: {payment_res}")
+        logger.error("Failed to fetch payment methods: %s", payment_res)
         return None
 
     return payment_res["data"]
 
+@transport.action()
 def settlement_bounty(
     api_key: str,
     tokens: dict,
@@ -165,23 +168,25 @@ def settlement_bounty(
     }
     
     url = f"{BASE_API_URL}/{path}"
-    print("Sending bounty request...")
-    resp = requests.post(url, headers=headers, data=json.dumps(body), timeout=30)
+    logger.info("Sending bounty request...")
+    resp = transport.post(url, headers=headers, data=json.dumps(body), timeout=30)
     
     try:
         decrypted_body = decrypt_xdata(api_key, json.loads(resp.text))
         if decrypted_body["status"] != "SUCCESS":
-            print("Failed to claim bounty.")
-            print(f"Error: {decrypted_body}")
+            logger.error("Failed to claim bounty: %s", decrypted_body)
             return None
         
-        print(decrypted_body)
+        logger.info("Bounty result: %s", decrypted_body["status"])
+        logger.debug("Bounty response:\n%s", dump(decrypted_body))
         
         return decrypted_body
+    except transport.TransportError:
+        raise
     except Exception as e:
-        print("[decrypt err]", e)
-        return resp.text
+        raise transport.DecryptError(f"Settlement response could not be decrypted: {e}", resp.text, path) from e
 
+@transport.action()
 def settlement_loyalty(
     api_key: str,
     tokens: dict,
@@ -242,19 +247,20 @@ def settlement_loyalty(
     }
 
     url = f"{BASE_API_URL}/{path}"
-    print("Sending loyalty request...")
-    resp = requests.post(url, headers=headers, data=json.dumps(body), timeout=30)
+    logger.info("Sending loyalty request...")
+    resp = transport.post(url, headers=headers, data=json.dumps(body), timeout=30)
     
     try:
         decrypted_body = decrypt_xdata(api_key, json.loads(resp.text))
         if decrypted_body["status"] != "SUCCESS":
-            print("Failed purchase.")
-            print(f"Error: {decrypted_body}")
+            logger.error("Failed purchase: %s", decrypted_body)
             return None
         
-        print(decrypted_body)
+        logger.info("Loyalty result: %s", decrypted_body["status"])
+        logger.debug("Loyalty response:\n%s", dump(decrypted_body))
         
         return decrypted_body
+    except transport.TransportError:
+        raise
     except Exception as e:
-        print("[decrypt err]", e)
-        return resp.text
\ No newline at end of file
+        raise transport.DecryptError(f"Settlement response could not be decrypted: {e}", resp.text, path) from e
\ No newline at end of file
@@ -1,15 +1,33 @@
 from datetime import datetime, timezone, timedelta
 import json
+import os
 import uuid
 import base64
 import qrcode
 
 import time
-import requests
+from app.client import transport
 from app.client.engsel import *
 from app.client.encrypt import API_KEY, decrypt_xdata, encryptsign_xdata, java_like_timestamp, get_x_signature_payment
+from app.log import dump, get_logger
+from app.menus.inputmux import InputInstance
 from app.type_dict import PaymentItem
 
+logger = get_logger(__name__)
+
+# Payment watcher: pending-detail is polled every QRIS_POLL_MIN seconds at
+# first, backing off to QRIS_POLL_MAX, for at most QRIS_WATCH_TIMEOUT.
+QRIS_WATCH_TIMEOUT = float(os.getenv("QRIS_WATCH_TIMEOUT", "900"))
+QRIS_POLL_MIN = float(os.getenv("QRIS_POLL_MIN", "3"))
+QRIS_POLL_MAX = float(os.getenv("QRIS_POLL_MAX", "30"))
+QRIS_POLL_FACTOR = 1.5
+
+QRIS_PENDING_STATES = {"", "PENDING", "WAITING", "WAITING_PAYMENT", "UNPAID", "IN_PROGRESS", "PROCESSING"}
+# Paid or expired transactions drop out of pending-detail with an error
+# naming one of these; any other error is treated as transient
+QRIS_GONE_MARKERS = ("NOT_FOUND", "NOT FOUND", "NO_LONGER_PENDING", "NO LONGER PENDING", "NOT_PENDING", "NOT PENDING")
+
+@transport.action()
 def settlement_qris(
     api_key: str,
     tokens: dict,
@@ -22,7 +40,7 @@ def settlement_qris(
 ):  
     # Sanity check
     if overwrite_amount == -1 and not ask_overwrite:
-        print("Either ask_overwrite must be True or overwrite_amount must be set.")
+        logger.error("Either ask_overwrite must be True or overwrite_amount must be set.")
         return None
 
     token_confirmation = items[token_confirmation_idx]["token_confirmation"]
@@ -64,11 +82,10 @@ def settlement_qris(
         "token_confirmation": token_confirmation
     }
     
-    print("Getting payment methods...")
+    logger.info("Getting payment methods...")
     payment_res = send_api_request(api_key, payment_path, payment_payload, tokens["id_token"], "POST")
     if payment_res["status"] != "SUCCESS":
-        print("Failed to fetch payment methods.")
-        print(f"Error: {payment_res}")
+        logger.error("Failed to fetch payment methods: %s", payment_res)
         return None
     
     token_payment = payment_res["data"]["token_payment"]
@@ -166,28 +183,30 @@ def settlement_qris(
     }
     
     url = f"{BASE_API_URL}/{path}"
-    print("Sending settlement request...")
-    resp = requests.post(url, headers=headers, data=json.dumps(body), timeout=30)
+    logger.info("Sending settlement request...")
+    resp = transport.post(url, headers=headers, data=json.dumps(body), timeout=30)
     
     try:
         decrypted_body = decrypt_xdata(api_key, json.loads(resp.text))
         if decrypted_body["status"] != "SUCCESS":
-            print("Failed to initiate settlement.")
-            print(f"Error: {decrypted_body}")
+            logger.error("Failed to initiate settlement: %s", decrypted_body)
             return None
         
         transaction_id = decrypted_body["data"]["transaction_code"]
+        logger.debug("Settlement response:\n%s", dump(decrypted_body))
         
         return transaction_id
+    except transport.TransportError:
+        raise
     except Exception as e:
-        print("[decrypt err]", e)
-        return resp.text
+        raise transport.DecryptError(f"Settlement response could not be decrypted: {e}", resp.text, path) from e
 
-def get_qris_code(
+def get_pending_detail(
     api_key: str,
     tokens: dict,
     transaction_id: str
-):
+) -> dict:
+    """Raw pending-detail response for one transaction (API errors keep their status)."""
     path = "payments/api/v8/pending-detail"
     payload = {
         "transaction_id": transaction_id,
@@ -196,14 +215,90 @@ def get_qris_code(
         "status": ""
     }
     
-    res = send_api_request(api_key, path, payload, tokens["id_token"], "POST")
+    return send_api_request(api_key, path, payload, tokens["id_token"], "POST")
+
+def get_qris_code(
+    api_key: str,
+    tokens: dict,
+    transaction_id: str
+):
+    res = get_pending_detail(api_key, tokens, transaction_id)
     if res["status"] != "SUCCESS":
-        print("Failed to fetch QRIS code.")
-        print(f"Error: {res}")
+        logger.error("Failed to fetch QRIS code: %s", res)
         return None
     
     return res["data"]["qr_code"]
 
+def _payment_state(data: dict) -> str:
+    for key in ("payment_status", "transaction_status", "status"):
+        value = data.get(key)
+        if isinstance(value, str) and value:
+            return value.upper()
+    return ""
+
+def _no_longer_pending(res: dict) -> bool:
+    text = " ".join(
+        str(res.get(key) or "") for key in ("status", "code", "error", "message")
+    ).upper()
+    return any(marker in text for marker in QRIS_GONE_MARKERS)
+
+def watch_qris_payment(
+    api_key: str,
+    tokens: dict,
+    transaction_id: str,
+    timeout: float = QRIS_WATCH_TIMEOUT,
+) -> str:
+    """
+    Follow one QRIS transaction on pending-detail until it leaves the
+    pending state, `timeout` seconds pass or the user types 99 (or presses
+    Ctrl+C). The interval between polls grows from QRIS_POLL_MIN to
+    QRIS_POLL_MAX; a failed poll (a transport error or an API error other
+    than "not found / no longer pending") is retried on the same schedule.
+
+    Returns the final payment state reported by the API, "NOT_PENDING" when
+    the transaction is no longer listed as pending, "TIMEOUT" or "STOPPED".
+    """
+    ends_at = InputInstance.deadline_in(timeout)
+    delay = QRIS_POLL_MIN
+
+    def on_tick(left: int):
+        print(f" Cek status berikutnya: {left} detik (ketik 99 lalu Enter untuk berhenti)   ", end="\r", flush=True)
+
+    print(f"Memantau pembayaran {transaction_id} (maks {int(timeout)} detik)...")
+    try:
+        while True:
+            next_poll = min(ends_at, InputInstance.deadline_in(delay))
+            if InputInstance.wait_for_command(next_poll, ["99"], on_tick) is not None:
+                print("\nPemantauan dihentikan.")
+                return "STOPPED"
+            delay = min(QRIS_POLL_MAX, delay * QRIS_POLL_FACTOR)
+
+            try:
+                res = get_pending_detail(api_key, tokens, transaction_id)
+            except transport.TransportError as e:
+                print(f"\nGagal cek status: {e}")
+                res = None
+
+            if res is not None and res.get("status") != "SUCCESS":
+                reason = res.get("message") or res.get("error") or res.get("status")
+                if _no_longer_pending(res):
+                    print(f"\nTransaksi tidak lagi pending: {reason}")
+                    return "NOT_PENDING"
+                # e.g. FAILED or an error envelope: nothing confirmed, poll again
+                print(f"\nGagal cek status: {reason}")
+            elif res is not None:
+                state = _payment_state(res.get("data") or {})
+                if state not in QRIS_PENDING_STATES:
+                    print(f"\nStatus pembayaran: {state}")
+                    return state
+
+            if next_poll >= ends_at:
+                print("\nBatas waktu pemantauan habis, pembayaran belum terkonfirmasi.")
+                return "TIMEOUT"
+    except KeyboardInterrupt:
+        print("\nPemantauan dihentikan.")
+        return "STOPPED"
+
 def show_qris_payment(
     api_key: str,
     tokens: dict,
@@ -213,7 +308,13 @@ def show_qris_payment(
     overwrite_amount: int = -1,
     token_confirmation_idx: int = 0,
     amount_idx: int = -1,
+    watch: bool | None = None,
 ):  
+    """
+    Create a QRIS transaction and print its QR code. With watch=True (or
+    when the user agrees, if watch is None) its payment status is then
+    followed by watch_qris_payment and returned.
+    """
     transaction_id = settlement_qris(
         api_key,
         tokens,
@@ -226,13 +327,13 @@ def show_qris_payment(
     )
     
     if not transaction_id:
-        print("Failed to create QRIS transaction.")
+        logger.error("Failed to create QRIS transaction.")
         return
     
-    print("Fetching QRIS code...")
+    logger.info("Fetching QRIS code...")
     qris_code = get_qris_code(api_key, tokens, transaction_id)
     if not qris_code:
-        print("Failed to get QRIS code.")
+        logger.error("Failed to get QRIS code.")
         return
     print(f"QRIS data:\n{qris_code}")
     
@@ -251,4 +352,8 @@ def show_qris_payment(
     
     print(f"Atau buka link berikut untuk melihat QRIS:\n{qris_url}")
     
+    if watch is None:
+        watch = input("Pantau status pembayaran? (y/n): ").strip().lower() == "y"
+    if watch:
+        return watch_qris_payment(api_key, tokens, transaction_id)
     return
@@ -0,0 +1,694 @@
+import contextvars
+import copy
+import http.cookiejar
+import json
+import os
+import random
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Connections kept alive per host; the app talks to a handful of hosts
+# (API, CIAM, crypto service, hot-list/banner host).
+POOL_CONNECTIONS = 8
+POOL_MAXSIZE = 8
+
+
+class _NoCookies(http.cookiejar.DefaultCookiePolicy):
+    """Requests were sent without a session before; keep them cookie-less."""
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+
+def _build_session() -> requests.Session:
+    s = requests.Session()
+    s.cookies.set_policy(_NoCookies())
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    s.mount("https://", adapter)
+    s.mount("http://", adapter)
+    return s
+
+
+session = _build_session()
+
+
+# -------------------------
+# Rate limiting
+# -------------------------
+
+# Defaults for every host: requests per second (0 disables), burst size and
+# in-flight cap. RATE_LIMITS overrides them per host, e.g.
+# RATE_LIMITS="crypto.mashu.lol=5/5/2,api.example.com=10/20/4"
+RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", "10"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "10"))
+HOST_CONCURRENCY = int(os.getenv("HOST_CONCURRENCY", "4"))
+
+
+class TokenBucket:
+    """Thread-safe token bucket; callers reserve a token and sleep outside the lock."""
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token, returning how long the caller must wait before using it."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            # A negative balance queues callers behind earlier reservations
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class HostLimiter:
+    def __init__(self, rate: float, burst: int, concurrency: int):
+        self.bucket = TokenBucket(rate, burst)
+        self.slots = threading.BoundedSemaphore(max(1, concurrency))
+
+    def acquire(self, timeout: float | None = None) -> float:
+        """Wait for a rate token and an in-flight slot. Returns the seconds spent waiting."""
+        started = time.monotonic()
+        delay = self.bucket.reserve()
+        if delay > 0:
+            time.sleep(delay)
+        if not self.slots.acquire(timeout=timeout):
+            raise requests.Timeout(f"No free connection slot within {timeout}s")
+        return time.monotonic() - started
+
+    def release(self):
+        self.slots.release()
+
+
+def _parse_rate_limits(spec: str) -> dict[str, tuple[float, int, int]]:
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        host, _, values = item.partition("=")
+        rate, burst, concurrency = (values.split("/") + ["", "", ""])[:3]
+        limits[host.strip()] = (
+            float(rate) if rate else RATE_LIMIT_RPS,
+            int(burst) if burst else RATE_LIMIT_BURST,
+            int(concurrency) if concurrency else HOST_CONCURRENCY,
+        )
+    return limits
+
+
+_host_limits = _parse_rate_limits(os.getenv("RATE_LIMITS", ""))
+_limiters: dict[str, HostLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter_for(host: str) -> HostLimiter:
+    with _limiters_lock:
+        limiter = _limiters.get(host)
+        if limiter is None:
+            rate, burst, concurrency = _host_limits.get(
+                host, (RATE_LIMIT_RPS, RATE_LIMIT_BURST, HOST_CONCURRENCY)
+            )
+            limiter = _limiters[host] = HostLimiter(rate, burst, concurrency)
+        return limiter
+
+
+# -------------------------
+# Circuit breaker
+# -------------------------
+
+# Consecutive connection failures after which a host counts as down. While
+# it is down, requests to it fail at once with CircuitOpen and a background
+# probe checks the host every BREAKER_PROBE_INTERVAL seconds.
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "3"))
+BREAKER_PROBE_INTERVAL = float(os.getenv("BREAKER_PROBE_INTERVAL", "5"))
+
+
+class CircuitBreaker:
+    def __init__(self, host: str, probe_url: str):
+        self.host = host
+        self.probe_url = probe_url
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def record_success(self):
+        if self.failures == 0 and self.opened_at is None:
+            return
+        with self._lock:
+            recovered = self.opened_at is not None
+            self.failures = 0
+            self.opened_at = None
+        if recovered:
+            _notify_recovery(self.host)
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.opened_at is not None or self.failures < BREAKER_THRESHOLD:
+                return
+            self.opened_at = time.monotonic()
+        threading.Thread(target=self._probe, name=f"probe-{self.host}", daemon=True).start()
+
+    def _probe(self):
+        # Any HTTP response means the host is reachable again
+        while self.is_open:
+            time.sleep(BREAKER_PROBE_INTERVAL)
+            try:
+                session.head(self.probe_url, timeout=BREAKER_PROBE_INTERVAL, allow_redirects=False)
+            except requests.RequestException:
+                continue
+            self.record_success()
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_recovery_listeners: list[Callable[[str], None]] = []
+
+
+def breaker_for(url: str) -> CircuitBreaker:
+    parts = urlsplit(url if "//" in url else f"https://{url}")
+    host = parts.hostname or ""
+    with _breakers_lock:
+        breaker = _breakers.get(host)
+        if breaker is None:
+            breaker = _breakers[host] = CircuitBreaker(host, f"{parts.scheme}://{parts.netloc}/")
+        return breaker
+
+
+def is_offline(*urls: str) -> bool:
+    """True when the host of any of the given URLs (or hosts) is marked down."""
+    return any(breaker_for(url).is_open for url in urls if url)
+
+
+def add_recovery_listener(listener: Callable[[str], None]):
+    """Call listener(host) from the probe thread when a host that was down answers again."""
+    _recovery_listeners.append(listener)
+
+
+def _notify_recovery(host: str):
+    for listener in _recovery_listeners:
+        try:
+            listener(host)
+        except Exception:
+            pass
+
+
+@dataclass
+class RequestTrace:
+    """What happened to one HTTP request, handed to trace listeners."""
+    method: str
+    host: str
+    endpoint: str
+    status: int = 0
+    duration: float = 0.0
+    # Time spent in the rate limiter before the request was sent
+    throttle_wait: float = 0.0
+    error: str = ""
+
+
+_trace_listeners: list[Callable[[RequestTrace], None]] = []
+
+
+def add_trace_listener(listener: Callable[[RequestTrace], None]):
+    """Call listener(trace) after every request; listeners must be fast and not raise."""
+    _trace_listeners.append(listener)
+
+
+def _emit(trace: RequestTrace):
+    for listener in _trace_listeners:
+        try:
+            listener(trace)
+        except Exception:
+            pass
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    """
+    Send a request over the shared pooled session so TLS connections are
+    reused, after the host's rate limiter lets it through. Fails fast with
+    CircuitOpen while the host is marked down.
+    """
+    parts = urlsplit(url)
+    host = parts.hostname or ""
+    timeout = kwargs.get("timeout")
+    if isinstance(timeout, tuple):
+        timeout = timeout[0]
+
+    trace = RequestTrace(method, host, parts.path.lstrip("/"))
+    act = _current_action.get()
+    if act is not None:
+        # The whole user action shares one budget; no call may outlive it
+        remaining = act.check(trace.endpoint)
+        if isinstance(kwargs.get("timeout"), tuple):
+            kwargs["timeout"] = tuple(min(t, remaining) for t in kwargs["timeout"])
+        else:
+            kwargs["timeout"] = min(kwargs.get("timeout") or remaining, remaining)
+        timeout = min(timeout or remaining, remaining)
+
+    breaker = breaker_for(url)
+    if breaker.is_open:
+        trace.error = "CircuitOpen"
+        _emit(trace)
+        err = CircuitOpen(f"{host} is unreachable, waiting for it to come back", trace.endpoint)
+        err.host = host
+        raise err
+
+    limiter = limiter_for(host)
+    started = time.monotonic()
+    try:
+        trace.throttle_wait = limiter.acquire(timeout)
+        try:
+            resp = session.request(method, url, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            breaker.record_failure()
+            raise
+        finally:
+            limiter.release()
+    except requests.RequestException as e:
+        trace.duration = time.monotonic() - started - trace.throttle_wait
+        trace.error = type(e).__name__
+        _emit(trace)
+        raise
+    breaker.record_success()
+    trace.duration = time.monotonic() - started - trace.throttle_wait
+    trace.status = resp.status_code
+    _emit(trace)
+    return resp
+
+
+# -------------------------
+# Pre-warming
+# -------------------------
+
+PREWARM = os.getenv("PREWARM", "1") != "0"
+PREWARM_TIMEOUT = float(os.getenv("PREWARM_TIMEOUT", "10"))
+
+
+def _warm(base_url: str, host: str, port: int):
+    try:
+        socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        # Any answer leaves a TLS connection to the host in the session pool
+        request("HEAD", base_url, timeout=PREWARM_TIMEOUT, allow_redirects=False)
+    except (OSError, requests.RequestException, TransportError):
+        pass
+
+
+def prewarm(urls) -> list[threading.Thread]:
+    """
+    Resolve and connect to the hosts of urls in parallel, in the background,
+    so the first real request to each reuses a pooled connection.
+    """
+    if not PREWARM:
+        return []
+    seen = {}
+    for url in filter(None, urls):
+        parts = urlsplit(url)
+        base_url = f"{parts.scheme}://{parts.netloc}/"
+        if parts.hostname and base_url not in seen:
+            port = parts.port or (443 if parts.scheme == "https" else 80)
+            seen[base_url] = (base_url, parts.hostname, port)
+    threads = [
+        threading.Thread(target=_warm, args=args, name=f"prewarm-{args[1]}", daemon=True)
+        for args in seen.values()
+    ]
+    for thread in threads:
+        thread.start()
+    return threads
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return request("POST", url, **kwargs)
+
+
+# -------------------------
+# Errors
+# -------------------------
+
+class TransportError(Exception):
+    """A call that failed below the API's own status handling (network, HTTP, decrypt)."""
+    retryable = False
+    # Host the failure came from, when known
+    host = ""
+
+    def __init__(self, message: str, path: str = ""):
+        super().__init__(message)
+        self.path = path
+
+
+class TransportTimeout(TransportError):
+    retryable = True
+
+
+class TransportConnectionError(TransportError):
+    retryable = True
+
+
+class CircuitOpen(TransportConnectionError):
+    """The host is marked down; retrying before the probe sees it again is pointless."""
+    retryable = False
+
+
+class HTTPStatusError(TransportError):
+    def __init__(self, status_code: int, body: str = "", path: str = ""):
+        super().__init__(f"HTTP {status_code}" + (f" from {path}" if path else ""), path)
+        self.status_code = status_code
+        self.body = body
+        # 429 and 5xx are transient, other statuses will not change on retry
+        self.retryable = status_code == 429 or status_code >= 500
+
+
+class DecryptError(TransportError):
+    """The response could not be decrypted; body holds the raw response text."""
+    def __init__(self, message: str, body: str = "", path: str = ""):
+        super().__init__(message, path)
+        self.body = body
+
+
+class DeadlineExceeded(TransportError):
+    pass
+
+
+class Cancelled(TransportError):
+    """The user action the call belonged to was cancelled (Ctrl+C)."""
+
+
+def is_network_error(exc: BaseException) -> bool:
+    """True for failures to reach a host at all (as opposed to a bad answer)."""
+    return isinstance(exc, (
+        TransportConnectionError,
+        TransportTimeout,
+        DeadlineExceeded,
+        requests.ConnectionError,
+        requests.Timeout,
+    ))
+
+
+def error_host(exc: BaseException) -> str:
+    """Host a failed call was talking to ("" when unknown, e.g. a deadline)."""
+    host = getattr(exc, "host", "")
+    if host:
+        return host
+    req = getattr(exc, "request", None)
+    if req is not None and getattr(req, "url", None):
+        return urlsplit(req.url).hostname or ""
+    if exc.__cause__ is not None:
+        return error_host(exc.__cause__)
+    return ""
+
+
+def classify(exc: Exception, path: str = "") -> Exception:
+    """Map a requests exception to its TransportError; other exceptions are returned as-is."""
+    if isinstance(exc, TransportError):
+        return exc
+    if isinstance(exc, requests.Timeout):
+        return TransportTimeout(str(exc), path)
+    if isinstance(exc, requests.ConnectionError):
+        return TransportConnectionError(str(exc), path)
+    if isinstance(exc, requests.RequestException):
+        return TransportError(str(exc), path)
+    return exc
+
+
+# -------------------------
+# User actions
+# -------------------------
+
+# Seconds one user action (a menu's fetch, a purchase) may spend on the
+# network in total, every request and retry included.
+ACTION_DEADLINE = float(os.getenv("ACTION_DEADLINE", "90"))
+
+
+class Action:
+    """
+    Deadline and cancel flag shared by every request of one user action.
+    The clock starts at the action's first request, so a prompt before the
+    network part does not eat into the budget.
+    """
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.deadline: float | None = None
+        self.cancelled = threading.Event()
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        if self.deadline is None:
+            self.deadline = time.monotonic() + self.budget
+        return self.deadline - time.monotonic()
+
+    def check(self, path: str = "") -> float:
+        """Seconds left, raising once the action is cancelled or out of time."""
+        if self.cancelled.is_set():
+            raise Cancelled("Action cancelled", path)
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"action deadline of {self.budget:.0f}s exceeded", path)
+        return remaining
+
+    def track(self, future):
+        with self._lock:
+            self._futures.append(future)
+
+    def cancel(self):
+        """Fail the action's pending and future requests at once."""
+        self.cancelled.set()
+        with self._lock:
+            futures, self._futures = self._futures, []
+        for future in futures:
+            future.cancel()
+
+
+_current_action: contextvars.ContextVar[Action | None] = contextvars.ContextVar("transport_action", default=None)
+
+
+@contextmanager
+def action(budget: float | None = None):
+    """
+    Run a user action (also usable as a decorator). Requests inside it, in
+    this thread or submitted through submit(), get their timeouts clamped
+    to the action's remaining budget. Ctrl+C cancels them all and raises
+    Cancelled. Nested actions join the outermost one.
+    """
+    outer = _current_action.get()
+    if outer is not None:
+        yield outer
+        return
+
+    act = Action(ACTION_DEADLINE if budget is None else budget)
+    token = _current_action.set(act)
+    try:
+        yield act
+    except KeyboardInterrupt:
+        act.cancel()
+        raise Cancelled("Cancelled by user") from None
+    except BaseException:
+        act.cancel()
+        raise
+    finally:
+        _current_action.reset(token)
+
+
+def submit(executor, fn, *args, **kwargs):
+    """executor.submit() that keeps the caller's action for the task."""
+    future = executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+    act = _current_action.get()
+    if act is not None:
+        act.track(future)
+    return future
+
+
+# -------------------------
+# Retry policy
+# -------------------------
+
+RETRY_ATTEMPTS = int(os.getenv("RETRY_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "4"))
+# Total time budget of one API call, all attempts included
+CALL_DEADLINE = float(os.getenv("CALL_DEADLINE", "60"))
+REQUEST_TIMEOUT = 30
+
+# Reads that can be repeated safely.
+IDEMPOTENT_PATHS = frozenset({
+    "api/v8/profile",
+    "api/v8/packages/balance-and-credit",
+    "api/v8/packages/quota-details",
+    "api/v8/xl-stores/families",
+    "api/v8/xl-stores/options/list",
+    "api/v8/xl-stores/options/detail",
+    "api/v8/xl-stores/options/addons-pinky-box",
+    "payments/api/v8/transaction-history",
+    "payments/api/v8/pending-detail",
+    "gamification/api/v8/loyalties/tiering/info",
+})
+
+# Calls that must never be sent twice: payment tokens, settlements, login.
+# Paths in neither set are not retried either; this list documents intent.
+NON_RETRYABLE_PATHS = frozenset({
+    "api/v8/auth/login",
+    "payments/api/v8/payment-methods-option",
+    "payments/api/v8/settlement-multipayment",
+    "payments/api/v8/settlement-multipayment/ewallet",
+    "payments/api/v8/settlement-multipayment/qris",
+    "api/v8/personalization/bounties-exchange",
+    "gamification/api/v8/loyalties/tiering/exchange",
+})
+
+
+def is_idempotent(path: str) -> bool:
+    return path in IDEMPOTENT_PATHS
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given (1-based) failed attempt."""
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** (attempt - 1))))
+
+
+def call_with_retry(path: str, attempt_fn, deadline: float | None = None):
+    """
+    Run attempt_fn(timeout) until it succeeds, retrying transient failures
+    of idempotent paths with jittered backoff. Every attempt gets a timeout
+    clamped to what is left of the deadline (seconds from now) and of the
+    current action.
+    """
+    budget = CALL_DEADLINE if deadline is None else deadline
+    ends_at = time.monotonic() + budget
+    act = _current_action.get()
+    if act is not None:
+        ends_at = min(ends_at, time.monotonic() + act.check(path))
+    attempts = RETRY_ATTEMPTS if is_idempotent(path) else 1
+
+    attempt = 0
+    while True:
+        attempt += 1
+        remaining = ends_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded(f"{path}: deadline of {budget:.0f}s exceeded", path)
+        try:
+            return attempt_fn(min(REQUEST_TIMEOUT, remaining))
+        except (TransportError, requests.RequestException) as e:
+            err = classify(e, path)
+            err.path = err.path or path
+            delay = backoff_delay(attempt)
+            if not err.retryable or attempt >= attempts or time.monotonic() + delay >= ends_at:
+                if err is e:
+                    raise
+                raise err from e
+            if act is not None:
+                # Woken early when the action is cancelled
+                act.cancelled.wait(delay)
+            else:
+                time.sleep(delay)
+
+
+# -------------------------
+# Single-flight
+# -------------------------
+
+# Seconds between a waiting follower's checks of its own action
+FOLLOWER_POLL = 0.1
+
+
+def _own_copy(exc: BaseException) -> BaseException:
+    """The classified exc as a new object, so each thread raises its own traceback."""
+    err = classify(exc) if isinstance(exc, Exception) else exc
+    copy_ = type(err).__new__(type(err))
+    copy_.args = err.args
+    copy_.__dict__.update(err.__dict__)
+    return copy_
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent identical calls into one. The first caller for a
+    key runs fn; callers arriving while it runs wait and get a deep copy of
+    its result (or a copy of its exception). A waiting caller still honours
+    its own action's deadline and cancel flag. Nothing is kept once the
+    call finishes.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: dict[Hashable, _Flight] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any], path: str = "") -> Any:
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                flight.followers += 1
+
+        if not leader:
+            self._follow(flight, path)
+            if flight.error is not None:
+                raise _own_copy(flight.error) from flight.error
+            return copy.deepcopy(flight.result)
+
+        try:
+            result = fn()
+        except BaseException as e:
+            # A Ctrl+C in the leader's thread is not the followers' to handle
+            shared = e if isinstance(e, Exception) else TransportError("Call interrupted")
+            self._finish(key, flight, error=shared)
+            raise
+        self._finish(key, flight, result=result)
+        return result
+
+    def _follow(self, flight: _Flight, path: str):
+        act = _current_action.get()
+        try:
+            while not flight.done.wait(FOLLOWER_POLL):
+                if act is not None:
+                    act.check(path)
+        except TransportError:
+            with self._lock:
+                flight.followers -= 1
+            raise
+
+    def _finish(self, key: Hashable, flight: _Flight, result=None, error: BaseException | None = None):
+        with self._lock:
+            # Unregistered under the same lock so no follower joins after the snapshot;
+            # followers copy the snapshot, leaving the leader free to mutate its result.
+            del self._flights[key]
+            flight.error = error
+            flight.result = copy.deepcopy(result) if flight.followers else result
+        flight.done.set()
+
+
+flights = SingleFlight()
+
+
+def flight_key(path: str, payload: dict, id_token: str) -> tuple:
+    """Identity of an API call: the path, the canonical payload and the account."""
+    return (path, json.dumps(payload, sort_keys=True, separators=(",", ":")), id_token)
@@ -0,0 +1,22 @@
+# Process exit codes shared by main.py, the headless CLI and auto.py.
+EXIT_OK = 0
+EXIT_ERROR = 1              # unexpected failure
+EXIT_USAGE = 2              # bad arguments (argparse default)
+EXIT_NOT_LOGGED_IN = 3      # no saved account / no active user
+EXIT_AUTH_EXPIRED = 4       # refresh token rejected, account must be re-added
+EXIT_API_KEY_INVALID = 5    # api.key missing or rejected by the verify endpoint
+EXIT_API_ERROR = 6          # API answered but not with status SUCCESS
+EXIT_NETWORK = 7            # request could not be completed
+EXIT_NOT_FOUND = 8          # requested family/package does not exist
+
+EXIT_NAMES = {
+    EXIT_OK: "ok",
+    EXIT_ERROR: "error",
+    EXIT_USAGE: "usage",
+    EXIT_NOT_LOGGED_IN: "not_logged_in",
+    EXIT_AUTH_EXPIRED: "auth_expired",
+    EXIT_API_KEY_INVALID: "api_key_invalid",
+    EXIT_API_ERROR: "api_error",
+    EXIT_NETWORK: "network",
+    EXIT_NOT_FOUND: "not_found",
+}
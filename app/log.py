@@ -0,0 +1,161 @@
+"""
+Leveled logging for the client and service layers.
+
+Console lines are written synchronously to whatever sys.stdout is at the
+time, so they follow the caller's redirections (LiveScreen's status row,
+stderr in CLI mode). The log file is written by a background thread from a
+queue and buffered: records reach the disk every LOG_BUFFER records, on
+any warning, on LogInstance.flush() and at exit. A relative LOG_FILE is
+resolved against the working directory at import.
+
+LOG_LEVEL=DEBUG adds the full request/response dumps on the console;
+LOG_FILE_LEVEL=DEBUG keeps them in the file only.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FILE = os.getenv("LOG_FILE", "engsel.log")  # empty disables the file
+if LOG_FILE:
+    LOG_FILE = os.path.abspath(LOG_FILE)
+LOG_FILE_LEVEL = os.getenv("LOG_FILE_LEVEL", "INFO").upper()
+LOG_BUFFER = int(os.getenv("LOG_BUFFER", "64"))
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(1024 * 1024)))
+LOG_BACKUPS = 3
+
+FILE_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(threadName)s] %(message)s"
+
+# Set by quiet(): console only shows warnings and errors in this context
+_quiet: ContextVar[bool] = ContextVar("log_quiet", default=False)
+
+
+class _ConsoleHandler(logging.Handler):
+    """Writes to the current sys.stdout, not the one at setup time."""
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            sys.stdout.write(self.format(record) + "\n")
+        except Exception:
+            self.handleError(record)
+
+
+def _console_filter(record: logging.LogRecord) -> bool:
+    return record.levelno >= logging.WARNING or not _quiet.get()
+
+
+class LogSetup:
+    """
+    Handlers of the "app" logger: the console, and the log file behind a
+    QueueHandler whose listener thread feeds a buffered file handler.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not self._initialized:
+            self.logger = logging.getLogger("app")
+            self.logger.propagate = False
+            console_level = logging.getLevelName(LOG_LEVEL)
+            file_level = logging.getLevelName(LOG_FILE_LEVEL)
+            levels = [console_level]
+
+            console = _ConsoleHandler()
+            console.setLevel(console_level)
+            console.addFilter(_console_filter)
+            self.logger.addHandler(console)
+
+            self._listener = None
+            self._buffer = None
+            self._handler = None
+            if LOG_FILE:
+                target = logging.handlers.RotatingFileHandler(
+                    LOG_FILE, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS,
+                    encoding="utf8", delay=True,
+                )
+                target.setFormatter(logging.Formatter(FILE_FORMAT))
+                self._buffer = logging.handlers.MemoryHandler(
+                    LOG_BUFFER, flushLevel=logging.WARNING, target=target,
+                )
+                records = queue.SimpleQueue()
+                self._handler = logging.handlers.QueueHandler(records)
+                self._handler.setLevel(file_level)
+                self.logger.addHandler(self._handler)
+                self._listener = logging.handlers.QueueListener(records, self._buffer)
+                self._listener.start()
+                levels.append(file_level)
+                atexit.register(self.close)
+
+            self.logger.setLevel(min(levels))
+            self._initialized = True
+
+    def flush(self):
+        """Write out everything logged so far; the file stays open for more."""
+        if self._listener is not None:
+            # stop() drains the queue, records logged meanwhile wait for start()
+            self._listener.stop()
+            self._buffer.flush()
+            self._listener.start()
+
+    def close(self):
+        """
+        Drain the queue, write out the buffered records and close the file.
+        Records logged afterwards only reach the console.
+        """
+        if self._handler is not None:
+            self.logger.removeHandler(self._handler)
+            self._handler = None
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        if self._buffer is not None:
+            target = self._buffer.target
+            self._buffer.close()
+            target.close()
+            self._buffer = None
+
+LogInstance = LogSetup()
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for a module under app/, routed through LogInstance's handlers."""
+    return logging.getLogger(name)
+
+
+@contextmanager
+def quiet():
+    """
+    Console shows only warnings and errors inside this block (and in
+    threads started from it with transport.submit); the file is unaffected.
+    Also usable as a decorator.
+    """
+    token = _quiet.set(True)
+    try:
+        yield
+    finally:
+        _quiet.reset(token)
+
+
+class dump:
+    """Pretty-printed JSON of obj, rendered only if the record is emitted."""
+    __slots__ = ("obj",)
+
+    def __init__(self, obj):
+        self.obj = obj
+
+    def __str__(self) -> str:
+        try:
+            return json.dumps(self.obj, indent=2, ensure_ascii=False)
+        except (TypeError, ValueError):
+            return repr(self.obj)
@@ -3,33 +3,142 @@ from app.service.auth import AuthInstance
 from app.menus.util import clear_screen, pause
 from app.service.bookmark import BookmarkInstance
 from app.client.engsel import get_family
+from app.client.transport import is_network_error
+from app.service.prefetch import FamilyPrefetcher
+
+def _resolve_bookmark(api_key, tokens, bookmark) -> tuple[str, str] | None:
+    """Find the bookmark's current option and variant codes through its family."""
+    try:
+        family_data = get_family(
+            api_key,
+            tokens,
+            bookmark["family_code"],
+            bookmark["is_enterprise"],
+            bookmark.get("migration_type"),
+        )
+    except Exception as e:
+        if not is_network_error(e):
+            raise
+        print("Offline: data family tidak tersedia, coba lagi setelah koneksi kembali.")
+        return None
+    if not family_data:
+        print("Gagal mengambil data family.")
+        return None
+
+    found = family_data.find_option(bookmark["order"], variant_name=bookmark["variant_name"])
+    if found:
+        variant, option = found
+        return option.code, variant.code
+
+    print("Paket bookmark tidak ditemukan di family.")
+    return None
+
+def _choose_group() -> str | None:
+    """Ask which group to show; None shows every bookmark."""
+    groups = BookmarkInstance.get_groups()
+    print("0. Semua bookmark")
+    print("1. Tanpa grup")
+    for idx, name in enumerate(groups, start=2):
+        print(f"{idx}. {name}")
+    choice = input("Pilih grup (nomor): ").strip()
+    if choice == "1":
+        return ""
+    if choice.isdigit() and 2 <= int(choice) < len(groups) + 2:
+        return groups[int(choice) - 2]
+    return None
+
+def _import_bookmarks():
+    filepath = input("Path file JSON: ").strip()
+    if not filepath:
+        return
+    group = input("Masukkan ke grup (kosongkan untuk memakai grup dari file): ").strip() or None
+    try:
+        added, skipped = BookmarkInstance.import_bookmarks(filepath, group)
+        print(f"{added} bookmark diimport, {skipped} dilewati (duplikat atau tidak valid).")
+    except (OSError, ValueError) as e:
+        print(f"Gagal import bookmark: {e}")
+    pause()
 
 def show_bookmark_menu():
+    # Cancel outstanding prefetches once the menu is left
+    with FamilyPrefetcher() as prefetcher:
+        return _show_bookmark_menu(prefetcher)
+
+def _show_bookmark_menu(prefetcher: FamilyPrefetcher):
     api_key = AuthInstance.api_key
     tokens = AuthInstance.get_active_tokens()
     
+    group = None
     in_bookmark_menu = True
     while in_bookmark_menu:
         clear_screen()
         print("-------------------------------------------------------")
-        print("Bookmark Paket")
+        print("Bookmark Paket" + (f" - Grup: {group}" if group is not None else ""))
         print("-------------------------------------------------------")
-        bookmarks = BookmarkInstance.get_bookmarks()
-        if not bookmarks or len(bookmarks) == 0:
+        if not BookmarkInstance.get_bookmarks():
             print("Tidak ada bookmark tersimpan.")
-            pause()
+            if input("Import bookmark dari file? (y/n): ").lower() == "y":
+                _import_bookmarks()
+                continue
             return None
-        
+
+        bookmarks = BookmarkInstance.get_bookmarks(group)
+        if not bookmarks:
+            print("Tidak ada bookmark di grup ini.")
+
         for idx, bm in enumerate(bookmarks):
-            print(f"{idx + 1}. {bm['family_name']} - {bm['variant_name']} - {bm['option_name']}")
+            label = f" [{bm['group']}]" if bm["group"] and group is None else ""
+            print(f"{idx + 1}. {bm['family_name']} - {bm['variant_name']} - {bm['option_name']}{label}")
+        # Bookmarks with a stored option code open without a family lookup
+        prefetcher.prefetch(
+            api_key,
+            tokens,
+            [(bm["family_code"], bm["is_enterprise"]) for bm in bookmarks if not bm.get("option_code")],
+        )
         
+        print("-------------------------------------------------------")
+        print("g. Tampilkan grup")
+        print("m. Pindahkan bookmark ke grup")
+        print("i. Import bookmark dari file JSON")
+        print("e. Export bookmark ke file JSON")
         print("00. Kembali ke menu utama")
         print("000. Hapus Bookmark")
         print("-------------------------------------------------------")
-        choice = input("Pilih bookmark (nomor): ")
+        choice = input("Pilih bookmark (nomor): ").strip()
         if choice == "00":
             in_bookmark_menu = False
             return None
+        elif choice.lower() == "g":
+            group = _choose_group()
+            continue
+        elif choice.lower() == "m":
+            numbers = input("Nomor bookmark (pisahkan dengan koma): ").split(",")
+            keys = [
+                BookmarkInstance.key_of(bookmarks[int(n) - 1])
+                for n in (n.strip() for n in numbers)
+                if n.isdigit() and 1 <= int(n) <= len(bookmarks)
+            ]
+            if not keys:
+                print("Input tidak valid. Silahkan coba lagi.")
+                pause()
+                continue
+            new_group = input("Nama grup (kosongkan untuk tanpa grup): ").strip()
+            moved = BookmarkInstance.set_group(keys, new_group)
+            print(f"{moved} bookmark dipindahkan.")
+            pause()
+            continue
+        elif choice.lower() == "i":
+            _import_bookmarks()
+            continue
+        elif choice.lower() == "e":
+            filepath = input("Simpan ke file (default: bookmark-export.json): ").strip() or "bookmark-export.json"
+            try:
+                count = BookmarkInstance.export_bookmarks(filepath, group)
+                print(f"{count} bookmark diexport ke {filepath}.")
+            except OSError as e:
+                print(f"Gagal export bookmark: {e}")
+            pause()
+            continue
         elif choice == "000":
             del_choice = input("Masukan nomor bookmark yang ingin dihapus: ")
             if del_choice.isdigit() and 1 <= int(del_choice) <= len(bookmarks):
@@ -46,32 +155,46 @@ def show_bookmark_menu():
             continue
         if choice.isdigit() and 1 <= int(choice) <= len(bookmarks):
             selected_bm = bookmarks[int(choice) - 1]
-            family_code = selected_bm["family_code"]
             is_enterprise = selected_bm["is_enterprise"]
-            
-            family_data = get_family(api_key, tokens, family_code, is_enterprise)
-            if not family_data:
-                print("Gagal mengambil data family.")
+
+            # Open the stored code directly; only a missing or stale code
+            # costs a family lookup.
+            option_code = selected_bm.get("option_code")
+            if option_code:
+                result = show_package_details(
+                    api_key,
+                    tokens,
+                    option_code,
+                    is_enterprise,
+                    migration_type=selected_bm.get("migration_type"),
+                    pause_on_error=False,
+                )
+                if result is not None:
+                    continue
+                print("Kode paket tersimpan tidak valid, mencari ulang dari family...")
+
+            resolved = _resolve_bookmark(api_key, tokens, selected_bm)
+            if not resolved:
                 pause()
                 continue
-            
-            package_variants = family_data["package_variants"]
-            option_code = None
-            for variant in package_variants:
-                if variant["name"] == selected_bm["variant_name"]:
-                    selected_variant = variant
-                    
-                    package_options = selected_variant["package_options"]
-                    for option in package_options:
-                        if option["order"] == selected_bm["order"]:
-                            selected_option = option
-                            option_code = selected_option["package_option_code"]
-                            break
-            
-            if option_code:
-                print(f"{option_code}")
-                show_package_details(api_key, tokens, option_code, is_enterprise)            
-            
+
+            option_code, variant_code = resolved
+            BookmarkInstance.update_resolution(
+                selected_bm["family_code"],
+                is_enterprise,
+                selected_bm["variant_name"],
+                selected_bm["order"],
+                option_code,
+                variant_code,
+            )
+            show_package_details(
+                api_key,
+                tokens,
+                option_code,
+                is_enterprise,
+                migration_type=selected_bm.get("migration_type"),
+            )
+
         else:
             print("Input tidak valid. Silahkan coba lagi.")
             pause()
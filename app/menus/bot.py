@@ -1,15 +1,17 @@
 import json
 import time
-import sys
-import select
 from datetime import datetime
-from typing import Optional, Dict, Any, List
+from typing import Optional, List
 
-import requests
+from app.client import transport
 
-from app.menus.util import clear_screen, pause
+from app.log import quiet
+from app.menus.inputmux import InputInstance
+from app.menus.util import LiveScreen, clear_screen, pause, fmt_quota
 from app.service.auth import AuthInstance
-from app.client.engsel import send_api_request, get_balance, get_package_details
+from app.service.metrics import MetricsInstance
+from app.client.engsel import get_balance, get_quota_details, get_package_details
+from app.client.models import Benefit, PackageDetail, Quota
 from app.client.balance import settlement_balance
 
 
@@ -29,7 +31,7 @@ def _ping_ok() -> bool:
     ]
     for u in urls:
         try:
-            r = requests.get(u, timeout=4)
+            r = transport.get(u, timeout=4)
             if r.status_code in (200, 204):
                 return True
         except Exception:
@@ -37,18 +39,27 @@ def _ping_ok() -> bool:
     return False
 
 
-def _user_typed_exit() -> bool:
+def _wait_or_exit(seconds: float, screen: Optional[LiveScreen] = None, label: str = "") -> bool:
     """
-    Non-blocking: cek apakah user mengetik '99' + Enter.
+    Tunggu `seconds` detik sambil memantau stdin lewat InputInstance.
+    Mengembalikan True jika user mengetik '99' + Enter sebelum waktu habis.
+    Input yang di-echo terminal menggeser kursor, jadi layar digambar ulang penuh.
     """
-    try:
-        dr, _, _ = select.select([sys.stdin], [], [], 0)
-        if dr:
-            s = sys.stdin.readline().strip()
-            return s == "99"
-    except Exception:
-        return False
-    return False
+    def on_tick(left: int):
+        if not label:
+            return
+        text = label.format(s=left)
+        if screen is not None:
+            screen.status(text)
+        else:
+            print(text, end="\r", flush=True)
+
+    def on_line(_line: str):
+        if screen is not None:
+            screen.invalidate()
+
+    deadline = InputInstance.deadline_in(seconds)
+    return InputInstance.wait_for_command(deadline, ["99"], on_tick, on_line) is not None
 
 
 def _await_connection(step_seconds: int = 3) -> bool:
@@ -57,16 +68,18 @@ def _await_connection(step_seconds: int = 3) -> bool:
     Mengembalikan False jika user mengetik '99' untuk keluar saat menunggu.
     """
     print("\n[!] Koneksi internet terputus. Menunggu koneksi kembali... (ketik 99 lalu Enter untuk keluar)")
-    while not _ping_ok():
-        for s in range(step_seconds, 0, -1):
-            if _user_typed_exit():
+    started = time.monotonic()
+    try:
+        while not _ping_ok():
+            if _wait_or_exit(step_seconds, label=" Menunggu koneksi : {s} detik"):
                 return False
-            print(f" Menunggu koneksi : {s} detik", end="\r")
-            time.sleep(1)
-        print(" " * 60, end="\r")  # bersihkan baris
-    return True
+            print(" " * 60, end="\r")  # bersihkan baris
+        return True
+    finally:
+        MetricsInstance.inc("engsel_connectivity_wait_seconds_total", value=time.monotonic() - started)
 
 
+@quiet()
 def _refresh_tokens(strict: bool = False) -> Optional[dict]:
     """
     Selalu panggil untuk mengambil/refresh token terbaru dari AuthInstance.
@@ -87,81 +100,26 @@ def _refresh_tokens(strict: bool = False) -> Optional[dict]:
 # Data/Display Helpers
 # -------------------------
 
-def _format_bytes_to_human(val: int) -> (float, str):
-    try:
-        v = float(val)
-    except Exception:
-        return (0.0, "B")
-    units = ["B", "KB", "MB", "GB", "TB"]
-    i = 0
-    while v >= 1024.0 and i < len(units) - 1:
-        v /= 1024.0
-        i += 1
-    return (v, units[i])
-
-
-def _fmt_quota(remaining: int, total: int) -> str:
-    rv, ru = _format_bytes_to_human(remaining)
-    tv, tu = _format_bytes_to_human(total)
-    if ru == tu:
-        return f"{rv:.2f} {ru} / {tv:.2f} {tu}"
-    if ru in ("MB", "GB") and tu in ("MB", "GB"):
-        r_in_gb = remaining / (1024 ** 3)
-        t_in_gb = total / (1024 ** 3)
-        return f"{r_in_gb:.2f} GB / {t_in_gb:.2f} GB"
-    return f"{rv:.2f} {ru} / {tv:.2f} {tu}"
-
-
-def _fetch_quota_details() -> Optional[List[Dict[str, Any]]]:
+def _fetch_quota_details() -> Optional[List[Quota]]:
     api_key = AuthInstance.api_key
     tokens = _refresh_tokens(strict=True)
     if not tokens:
         return None
-    id_token = tokens.get("id_token")
-    path = "api/v8/packages/quota-details"
-    payload = {
-        "is_enterprise": False,
-        "lang": "en",
-        "family_member_id": ""
-    }
     try:
-        res = send_api_request(api_key, path, payload, id_token, "POST")
+        quotas = get_quota_details(api_key, tokens)
     except Exception as e:
+        MetricsInstance.inc("engsel_errors_total", {"mode": "bot", "kind": "quota_details"})
         print(f"Gagal mengambil data paket saya: {e}")
         return None
-    if not isinstance(res, dict) or res.get("status") != "SUCCESS":
+    if quotas is None:
+        MetricsInstance.inc("engsel_errors_total", {"mode": "bot", "kind": "quota_details"})
         print("Gagal mengambil data paket saya (quota-details).")
         return None
-    return res["data"].get("quotas", [])
-
-
-def _extract_main_benefit(quota_item: Dict[str, Any]) -> (int, int, str):
-    benefits = quota_item.get("benefits") or quota_item.get("quota_benefits") or []
-    def score(b: Dict[str, Any]) -> int:
-        name = (b.get("name") or "").lower()
-        dtype = (b.get("data_type") or b.get("dataType") or "").upper()
-        cat = (b.get("category") or "").upper()
-        s = 0
-        if "utama" in name or "main" in name or "regular" in name:
-            s += 3
-        if dtype == "DATA":
-            s += 2
-        if "DATA_MAIN" in cat or "MAIN" in cat:
-            s += 2
-        try:
-            s += int(b.get("total", 0)) // (1024 ** 2)
-        except Exception:
-            pass
-        return s
-    if benefits:
-        sel = max(benefits, key=score)
-        remaining = int(sel.get("remaining") or 0)
-        total = int(sel.get("total") or 0)
-        bname = sel.get("name") or "Kuota Utama"
-        return remaining, total, bname
-    remaining = int(quota_item.get("remaining") or 0)
-    total = int(quota_item.get("total") or 0)
-    return remaining, total, "Kuota"
+    return quotas
+
+
+def _main_benefit(quota: Optional[Quota]) -> Benefit:
+    return quota.main_benefit if quota else Quota.from_dict({}).main_benefit
 
 
 # -------------------------
@@ -170,6 +128,7 @@ def _extract_main_benefit(quota_item: Dict[str, Any]) -> (int, int, str):
 
 HOT2_TARGET_NAME = "Masa Aktif 30 Hari + 100MB"  # target default
 
+@transport.action()
 def _build_hot2_payment_items_by_name(target_name: str = HOT2_TARGET_NAME) -> Optional[dict]:
     """
     Ambil paket di pg-hot2.json BERDASARKAN NAMA PERSIS (case-insensitive).
@@ -193,7 +152,7 @@ def _build_hot2_payment_items_by_name(target_name: str = HOT2_TARGET_NAME) -> Op
 
     url = "https://me.mashu.lol/pg-hot2.json"
     try:
-        resp = requests.get(url, timeout=30)
+        resp = transport.get(url, timeout=30)
         resp.raise_for_status()
         hot_packages = resp.json()
     except Exception as e:
@@ -223,25 +182,14 @@ def _build_hot2_payment_items_by_name(target_name: str = HOT2_TARGET_NAME) -> Op
         print("Paket target tidak memiliki items.")
         return None
 
-    def _extract_item(pd: dict) -> dict:
-        opt = pd.get("package_option") or {}
-        item_code = (
-            opt.get("code")
-            or opt.get("package_option_code")
-            or pd.get("package_option_code")
-            or pd.get("option_code")
-            or ""
-        )
-        item_name = opt.get("name") or pd.get("name") or "Unknown"
-        item_price = opt.get("price") or pd.get("price") or 0
-        token_confirmation = pd.get("token_confirmation") or opt.get("token_confirmation") or ""
+    def _extract_item(pd: PackageDetail) -> dict:
         return dict(
-            item_code=item_code,
+            item_code=pd.option.code,
             product_type="",
-            item_price=item_price,
-            item_name=item_name,
+            item_price=pd.option.price,
+            item_name=pd.option.name or "Unknown",
             tax=0,
-            token_confirmation=token_confirmation,
+            token_confirmation=pd.token_confirmation,
         )
 
     items: List[dict] = []
@@ -278,6 +226,8 @@ def _build_hot2_payment_items_by_name(target_name: str = HOT2_TARGET_NAME) -> Op
 # UI & Loop
 # -------------------------
 
+REFRESH_LABEL = " Sisa waktu refresh : {s} detik ( untuk update halaman menampilkan sisa quota)"
+
 def show_auto_payment_bot():
     """
     Bot Auto Payment:
@@ -291,6 +241,7 @@ def show_auto_payment_bot():
     tokens = _refresh_tokens(strict=True)
     if not tokens:
         return None
+    MetricsInstance.start()
 
     # Ambil list paket ringkas (cek koneksi + refresh token)
     if not _ping_ok():
@@ -307,19 +258,19 @@ def show_auto_payment_bot():
 
     brief_list = []
     for i, q in enumerate(quotas, start=1):
-        name = q.get("name") or q.get("quota_name") or f"Paket {i}"
-        rem, tot, bname = _extract_main_benefit(q)
+        name = q.name or f"Paket {i}"
+        main = q.main_benefit
         brief_list.append({
             "number": i,
             "name": name,
-            "quota_code": q.get("quota_code") or q.get("code") or "",
-            "group_code": q.get("group_code") or "",
-            "family_code": q.get("family_code") or "",
-            "remaining": rem,
-            "total": tot,
-            "benefit_name": bname
+            "quota_code": q.quota_code,
+            "group_code": q.group_code,
+            "family_code": q.family_code,
+            "remaining": main.remaining,
+            "total": main.total,
+            "benefit_name": main.name
         })
-        print(f"{i}. {name}  |  {bname}: {_fmt_quota(rem, tot)}")
+        print(f"{i}. {name}  |  {main.name}: {fmt_quota(main.remaining, main.total)}")
 
     if not brief_list:
         print("Tidak ada paket aktif yang ditemukan.")
@@ -352,61 +303,62 @@ def show_auto_payment_bot():
 
         refresh_interval = 20  # fixed
         just_paid_until = 0.0  # detik (epoch)
+        screen = LiveScreen()
 
         while True:
+            cycle_started = time.monotonic()
             # Cek koneksi + REFRESH TOKEN sebelum fetch apapun
             if not _ping_ok():
+                screen.invalidate()
                 if not _await_connection(3):
                     return None
             tokens = _refresh_tokens(strict=True)
             if not tokens:
                 return None
 
-            # Pulsa
-            try:
-                balance = get_balance(api_key, tokens.get("id_token"))
-                pulsa_sisa = balance.get("remaining", 0)
-            except Exception:
-                pulsa_sisa = 0
-
-            # Kuota terbaru (pakai token terbaru)
-            quotas = _fetch_quota_details() or []
-            curr = None
-            for q in quotas:
-                name = q.get("name") or q.get("quota_name") or ""
-                if selected["name"] == name:
-                    curr = q
-                    break
+            with screen.capture(), transport.action(), quiet():
+                # Pulsa
+                try:
+                    balance = get_balance(api_key, tokens.get("id_token"))
+                    pulsa_sisa = balance.remaining
+                except Exception:
+                    MetricsInstance.inc("engsel_errors_total", {"mode": "bot", "kind": "balance"})
+                    pulsa_sisa = 0
+
+                # Kuota terbaru (pakai token terbaru)
+                quotas = _fetch_quota_details() or []
+            curr = next((q for q in quotas if q.name == selected["name"]), None)
             if curr is None and selected.get("quota_code"):
-                for q in quotas:
-                    if (q.get("quota_code") or q.get("code") or "") == selected["quota_code"]:
-                        curr = q
-                        break
+                curr = next((q for q in quotas if q.quota_code == selected["quota_code"]), None)
             if curr is None:
                 idx = selected["number"] - 1
-                curr = quotas[idx] if idx >= 0 and idx < len(quotas) else {}
+                curr = quotas[idx] if idx >= 0 and idx < len(quotas) else None
 
-            rem, tot, bname = _extract_main_benefit(curr or {})
+            main = _main_benefit(curr)
+            rem, tot = main.remaining, main.total
+            MetricsInstance.set("engsel_quota_remaining_bytes", rem, {"mode": "bot"})
+            MetricsInstance.observe("engsel_poll_cycle_seconds", time.monotonic() - cycle_started, {"mode": "bot_quota"})
 
             # Header
-            clear_screen()
-            print('Header : "Bot Auto Payment SP 100 mb"')
-            print("=======================================================")
-            print(f" Sisa Pulsa : {pulsa_sisa:,}".replace(",", "."), end="")
-            print(" " * 37, end="")
-            print(f"Sisa Kuota : {_fmt_quota(rem, tot)}")
             now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             set_gb = (min_mb / 1024.0)
-            print(f" Waktu Update : {now}", end="")
-            print(" " * 22, end="")
-            print(f"Set Min Quota  : {set_gb:.2f} GB")
+            lines = [
+                'Header : "Bot Auto Payment SP 100 mb"',
+                "=======================================================",
+                f" Sisa Pulsa : {pulsa_sisa:,}".replace(",", ".") + " " * 37 + f"Sisa Kuota : {fmt_quota(rem, tot)}",
+                f" Waktu Update : {now}" + " " * 22 + f"Set Min Quota  : {set_gb:.2f} GB",
+            ]
 
             # Status tunggal & aksi
             threshold_bytes = int(min_mb * 1024 * 1024)
             low_quota = rem < threshold_bytes
 
             if low_quota and time.time() >= just_paid_until:
-                print("------------------------------------------------------- Kuota di bawah minimum! Menyiapkan auto payment...")
+                lines.append("------------------------------------------------------- Kuota di bawah minimum! Menyiapkan auto payment...")
+                screen.render(lines)
+                # Output pembayaran ditulis bebas, frame berikutnya digambar ulang penuh
+                screen.invalidate()
+                print()
                 # Pastikan koneksi + REFRESH TOKEN sebelum pembayaran
                 if not _ping_ok():
                     if not _await_connection(3):
@@ -415,40 +367,46 @@ def show_auto_payment_bot():
                 if not tokens:
                     return None
 
-                cfg = _build_hot2_payment_items_by_name(HOT2_TARGET_NAME)
-                if cfg and cfg.get("items"):
-                    print(f"[PREVIEW] Akan membeli: {cfg.get('selected_name')}")
-                    for it in cfg["items"]:
-                        print(f" - {it.get('item_name')} | code={it.get('item_code')} | price={it.get('item_price')}")
-                    print(f"[AUTO] Membeli paket: {cfg.get('selected_name')}")
-                    for it in cfg["items"]:
-                        print(f" - {it.get('item_name')} | code={it.get('item_code')} | price={it.get('item_price')}")
-                    settlement_balance(
-                            AuthInstance.api_key,
-                            tokens,
-                            cfg["items"],
-                            cfg.get("payment_for", "BUY_PACKAGE"),
-                            False,
-                            ""
-                        )
-                else:
-                    print("Gagal menyiapkan payment items.")
+                try:
+                    cfg = _build_hot2_payment_items_by_name(HOT2_TARGET_NAME)
+                    if cfg and cfg.get("items"):
+                        print(f"[PREVIEW] Akan membeli: {cfg.get('selected_name')}")
+                        for it in cfg["items"]:
+                            print(f" - {it.get('item_name')} | code={it.get('item_code')} | price={it.get('item_price')}")
+                        print(f"[AUTO] Membeli paket: {cfg.get('selected_name')}")
+                        for it in cfg["items"]:
+                            print(f" - {it.get('item_name')} | code={it.get('item_code')} | price={it.get('item_price')}")
+                        settlement_balance(
+                                AuthInstance.api_key,
+                                tokens,
+                                cfg["items"],
+                                cfg.get("payment_for", "BUY_PACKAGE"),
+                                False,
+                                ""
+                            )
+                    else:
+                        MetricsInstance.inc("engsel_errors_total", {"mode": "bot", "kind": "payment_items"})
+                        print("Gagal menyiapkan payment items.")
+                except transport.Cancelled:
+                    raise
+                except transport.TransportError as e:
+                    # Siklus berikutnya mencoba lagi
+                    MetricsInstance.inc("engsel_errors_total", {"mode": "bot", "kind": "purchase"})
+                    print(f"Pembelian gagal: {e}")
                 # segera refresh
                 time.sleep(0.4)
                 continue
             elif low_quota and time.time() < just_paid_until:
-                print("------------------------------------------------------- Dalam cooldown pasca payment. Menunggu update kuota dari server...")
+                lines.append("------------------------------------------------------- Dalam cooldown pasca payment. Menunggu update kuota dari server...")
             else:
-                print("------------------------------------------------------- Sisa kuota masih aman, pemantauan dilanjutkan.")
+                lines.append("------------------------------------------------------- Sisa kuota masih aman, pemantauan dilanjutkan.")
 
             # countdown selesai → pada iterasi berikutnya token akan disegarkan lagi
-            print("\nMasukkan '99' dan tekan Enter untuk keluar, atau tekan Enter untuk menunggu update berikutnya...")
-            for s in range(refresh_interval, 0, -1):
-                if _user_typed_exit():
-                    return None
-                print(f" Sisa waktu refresh : {s} detik ( untuk update halaman menampilkan sisa quota)", end="\r")
-                time.sleep(1)
-            print()
+            lines.append("")
+            lines.append("Masukkan '99' dan tekan Enter untuk keluar, atau tekan Enter untuk menunggu update berikutnya...")
+            screen.render(lines)
+            if _wait_or_exit(refresh_interval, screen, REFRESH_LABEL):
+                return None
 
     elif mode == "2":
         # Mode Timer by set — repeat forever; ignore quota and pay each interval
@@ -459,40 +417,49 @@ def show_auto_payment_bot():
             pause()
             return None
 
+        screen = LiveScreen()
+
         while True:
+            cycle_started = time.monotonic()
             # Cek koneksi + REFRESH TOKEN sebelum fetch apapun
             if not _ping_ok():
+                screen.invalidate()
                 if not _await_connection(3):
                     return None
             tokens = _refresh_tokens(strict=True)
             if not tokens:
                 return None
 
-            clear_screen()
-            print('Header : "Bot Auto Payment SP 100 mb"')
-            print("=======================================================")
-            try:
-                balance = get_balance(api_key, tokens.get("id_token"))
-                pulsa_sisa = balance.get("remaining", 0)
-            except Exception:
-                pulsa_sisa = 0
-            quotas = _fetch_quota_details() or []
+            with screen.capture(), transport.action(), quiet():
+                try:
+                    balance = get_balance(api_key, tokens.get("id_token"))
+                    pulsa_sisa = balance.remaining
+                except Exception:
+                    MetricsInstance.inc("engsel_errors_total", {"mode": "bot", "kind": "balance"})
+                    pulsa_sisa = 0
+                quotas = _fetch_quota_details() or []
             idx = selected["number"] - 1
-            curr = quotas[idx] if idx >= 0 and idx < len(quotas) else (quotas[0] if quotas else {})
-            rem, tot, bname = _extract_main_benefit(curr or {})
-            print(f" Sisa Pulsa : {pulsa_sisa:,}".replace(",", "."), end="")
-            print(" " * 37, end="")
-            print(f"Sisa Kuota : {_fmt_quota(rem, tot)}")
+            curr = quotas[idx] if idx >= 0 and idx < len(quotas) else (quotas[0] if quotas else None)
+            main = _main_benefit(curr)
+            rem, tot = main.remaining, main.total
+            MetricsInstance.set("engsel_quota_remaining_bytes", rem, {"mode": "bot"})
+            MetricsInstance.observe("engsel_poll_cycle_seconds", time.monotonic() - cycle_started, {"mode": "bot_timer"})
             now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            print(f" Waktu Update : {now}                      Set Min Quota  : -")
-            print("------------------------------------------------------- Mode timer aktif; akan melakukan auto payment saat hitung mundur selesai.")
+            screen.render([
+                'Header : "Bot Auto Payment SP 100 mb"',
+                "=======================================================",
+                f" Sisa Pulsa : {pulsa_sisa:,}".replace(",", ".") + " " * 37 + f"Sisa Kuota : {fmt_quota(rem, tot)}",
+                f" Waktu Update : {now}                      Set Min Quota  : -",
+                "------------------------------------------------------- Mode timer aktif; akan melakukan auto payment saat hitung mundur selesai.",
+                "",
+                "Masukkan '99' dan tekan Enter untuk keluar, atau tekan Enter untuk menunggu...",
+            ])
+
+            if _wait_or_exit(seconds, screen, REFRESH_LABEL):
+                return None
 
-            print("\nMasukkan '99' dan tekan Enter untuk keluar, atau tekan Enter untuk menunggu...")
-            for s in range(seconds, 0, -1):
-                if _user_typed_exit():
-                    return None
-                print(f" Sisa waktu refresh : {s} detik ( untuk update halaman menampilkan sisa quota)", end="\r")
-                time.sleep(1)
+            # Output pembayaran ditulis bebas, frame berikutnya digambar ulang penuh
+            screen.invalidate()
             print()
 
             # Pastikan koneksi + REFRESH TOKEN sebelum pembayaran
@@ -503,25 +470,33 @@ def show_auto_payment_bot():
             if not tokens:
                 return None
 
-            cfg = _build_hot2_payment_items_by_name(HOT2_TARGET_NAME)
-            if cfg and cfg.get("items"):
-                print(f"[PREVIEW] Akan membeli: {cfg.get('selected_name')}")
-                for it in cfg["items"]:
-                    print(f" - {it.get('item_name')} | code={it.get('item_code')} | price={it.get('item_price')}")
-                    print(f"[AUTO] Membeli paket: {cfg.get('selected_name')}")
+            try:
+                cfg = _build_hot2_payment_items_by_name(HOT2_TARGET_NAME)
+                if cfg and cfg.get("items"):
+                    print(f"[PREVIEW] Akan membeli: {cfg.get('selected_name')}")
                     for it in cfg["items"]:
                         print(f" - {it.get('item_name')} | code={it.get('item_code')} | price={it.get('item_price')}")
-                    settlement_balance(
-                            AuthInstance.api_key,
-                            tokens,
-                            cfg["items"],
-                            cfg.get("payment_for", "BUY_PACKAGE"),
-                            False,
-                            ""
-                        )
+                        print(f"[AUTO] Membeli paket: {cfg.get('selected_name')}")
+                        for it in cfg["items"]:
+                            print(f" - {it.get('item_name')} | code={it.get('item_code')} | price={it.get('item_price')}")
+                        settlement_balance(
+                                AuthInstance.api_key,
+                                tokens,
+                                cfg["items"],
+                                cfg.get("payment_for", "BUY_PACKAGE"),
+                                False,
+                                ""
+                            )
 
-            else:
-                print("Gagal menyiapkan payment items.")
+                else:
+                    MetricsInstance.inc("engsel_errors_total", {"mode": "bot", "kind": "payment_items"})
+                    print("Gagal menyiapkan payment items.")
+            except transport.Cancelled:
+                raise
+            except transport.TransportError as e:
+                # Siklus berikutnya mencoba lagi
+                MetricsInstance.inc("engsel_errors_total", {"mode": "bot", "kind": "purchase"})
+                print(f"Pembelian gagal: {e}")
             # lanjut ke siklus berikutnya
             time.sleep(0.4)
             continue
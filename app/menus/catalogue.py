@@ -0,0 +1,79 @@
+from datetime import datetime
+
+from app.menus.package import show_package_details
+from app.menus.util import clear_screen, pause
+from app.service.auth import AuthInstance
+from app.service.catalogue import CatalogueInstance
+
+def _ask_int(prompt: str) -> int | None:
+    text = input(prompt).strip()
+    if not text:
+        return None
+    try:
+        return int(float(text))
+    except ValueError:
+        print("Input tidak valid, filter diabaikan.")
+        return None
+
+def _format_data(data_bytes) -> str:
+    if not data_bytes:
+        return "-"
+    if data_bytes >= 1024 ** 3:
+        return f"{data_bytes / (1024 ** 3):.2f} GB"
+    return f"{data_bytes / (1024 ** 2):.2f} MB"
+
+def show_catalogue_menu():
+    families, options = CatalogueInstance.count()
+
+    in_catalogue_menu = True
+    while in_catalogue_menu:
+        clear_screen()
+        print("-------------------------------------------------------")
+        print("Cari Paket di Katalog Lokal (offline)")
+        print(f"Tersimpan: {families} family, {options} opsi paket")
+        print("-------------------------------------------------------")
+        print("Kosongkan untuk melewati filter. Ketik 00 untuk kembali.")
+        text = input("Nama family/varian/paket/benefit: ").strip()
+        if text == "00":
+            return None
+        min_price = _ask_int("Harga minimum (Rp): ")
+        max_price = _ask_int("Harga maksimum (Rp): ")
+        min_gb = input("Kuota data minimum (GB): ").strip()
+        min_data_bytes = None
+        if min_gb:
+            try:
+                min_data_bytes = int(float(min_gb) * 1024 ** 3)
+            except ValueError:
+                print("Input tidak valid, filter diabaikan.")
+
+        results = CatalogueInstance.search(text, min_price, max_price, min_data_bytes)
+
+        print("-------------------------------------------------------")
+        if not results:
+            print("Tidak ada paket yang cocok.")
+            pause()
+            continue
+
+        for idx, r in enumerate(results, start=1):
+            last_seen = datetime.fromtimestamp(r["last_seen"]).strftime("%Y-%m-%d %H:%M")
+            price = "-" if r["price"] is None else f"Rp {r['price']}"
+            print(f"{idx}. {r['family_name']} - {r['variant_name']} - {r['option_name']}")
+            print(f"   Harga: {price} | Masa Aktif: {r['validity'] or '-'} | Data: {_format_data(r['data_bytes'])}")
+            print(f"   Family Code: {r['family_code']} | Terakhir dilihat: {last_seen}")
+            print("-------------------------------------------------------")
+
+        print("00. Cari lagi")
+        choice = input("Pilih paket untuk membuka detail (nomor): ").strip()
+        if choice.isdigit() and 1 <= int(choice) <= len(results):
+            selected = results[int(choice) - 1]
+            api_key = AuthInstance.api_key
+            tokens = AuthInstance.get_active_tokens()
+            option_order = selected["option_order"] if selected["option_order"] is not None else -1
+            show_package_details(
+                api_key,
+                tokens,
+                selected["option_code"],
+                bool(selected["is_enterprise"]),
+                option_order=option_order,
+            )
+            families, options = CatalogueInstance.count()
@@ -0,0 +1,86 @@
+from app.client import transport
+from app.client.transport import is_network_error
+from app.menus.package import get_packages_by_family
+from app.menus.util import clear_screen, pause
+from app.service.auth import AuthInstance
+from app.service.category import CategoryIndexInstance
+from app.service.snapshot import format_age
+
+@transport.action()
+def _load_category(api_key: str, tokens: dict, category_code: str, refresh: bool = False):
+    if refresh:
+        return CategoryIndexInstance.refresh(api_key, tokens, category_code)
+    return CategoryIndexInstance.get(api_key, tokens, category_code)
+
+def show_category_menu():
+    in_category_menu = True
+    while in_category_menu:
+        categories = CategoryIndexInstance.categories()
+        clear_screen()
+        print("-------------------------------------------------------")
+        print("Jelajahi Paket per Kategori")
+        print("-------------------------------------------------------")
+        for idx, c in enumerate(categories, start=1):
+            print(f"{idx}. {c['category_code']} ({c['family_count']} family, diperbarui {format_age(c['fetched_at'])})")
+        if categories:
+            print("-------------------------------------------------------")
+        print("Masukkan nomor kategori di atas atau kode kategori baru.")
+        print("00. Kembali ke menu utama")
+        choice = input("Pilih kategori: ").strip()
+        if choice == "00":
+            in_category_menu = False
+            return None
+        if not choice:
+            continue
+        if choice.isdigit() and 1 <= int(choice) <= len(categories):
+            category_code = categories[int(choice) - 1]["category_code"]
+        else:
+            category_code = choice
+        show_category_families(category_code)
+
+def show_category_families(category_code: str):
+    api_key = AuthInstance.api_key
+    refresh = False
+
+    in_family_list = True
+    while in_family_list:
+        tokens = AuthInstance.get_active_tokens()
+        try:
+            # Known categories come from the index; only new ones wait for the API
+            families, fetched_at = _load_category(api_key, tokens, category_code, refresh)
+        except Exception as e:
+            if not is_network_error(e):
+                raise
+            print("Offline: kategori ini belum pernah dibuka, coba lagi setelah koneksi kembali.")
+            pause()
+            return None
+        refresh = False
+        if families is None:
+            print(f"Gagal mengambil daftar family untuk kategori {category_code}.")
+            pause()
+            return None
+
+        clear_screen()
+        print("-------------------------------------------------------")
+        print(f"Kategori: {category_code}")
+        print(f"{len(families)} family, diperbarui {format_age(fetched_at)}")
+        print("-------------------------------------------------------")
+        for idx, f in enumerate(families, start=1):
+            print(f"{idx}. {f.name or '-'}")
+            print(f"   Family Code: {f.code}")
+        print("-------------------------------------------------------")
+        print("r. Muat ulang kategori")
+        print("00. Kembali")
+        choice = input("Pilih family (nomor): ").strip()
+        if choice == "00":
+            in_family_list = False
+            return None
+        if choice.lower() == "r":
+            refresh = True
+            continue
+        if choice.isdigit() and 1 <= int(choice) <= len(families):
+            # Variants and options are only fetched for the family that is opened
+            get_packages_by_family(families[int(choice) - 1].code, None)
+        else:
+            print("Input tidak valid. Silahkan coba lagi.")
+            pause()
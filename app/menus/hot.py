@@ -1,15 +1,30 @@
-import requests
+from app.client import transport
+from app.client.transport import is_network_error
 
-from app.client.engsel import get_family, get_package_details
+from app.client.engsel import BASE_API_URL, get_family, get_package_details
 from app.menus.package import show_package_details
 from app.service.auth import AuthInstance
-from app.menus.util import clear_screen, pause
+from app.service.catalogue import CatalogueInstance
+from app.service.prefetch import FamilyPrefetcher
+from app.menus.util import clear_screen, pause, offline_notice
+from app.service.snapshot import SnapshotInstance
 from app.client.ewallet import show_multipayment
 from app.client.qris import show_qris_payment
 from app.client.balance import settlement_balance
 from app.type_dict import PaymentItem
 
+def _load_hot_list(url: str) -> list | None:
+    response = transport.get(url, timeout=30)
+    if response.status_code != 200:
+        return None
+    return response.json()
+
 def show_hot_menu():
+    # Cancel outstanding prefetches once the menu is left
+    with FamilyPrefetcher() as prefetcher:
+        return _show_hot_menu(prefetcher)
+
+def _show_hot_menu(prefetcher: FamilyPrefetcher):
     api_key = AuthInstance.api_key
     tokens = AuthInstance.get_active_tokens()
     
@@ -20,14 +35,19 @@ def show_hot_menu():
         print("====================🔥 Paket  Hot 🔥===================")
         print("=======================================================")
         
-        url = "https://me.mashu.lol/pg-hot.json"
-        response = requests.get(url, timeout=30)
-        if response.status_code != 200:
+        hot_packages, saved_at = SnapshotInstance.fetch(
+            "hot", lambda: _load_hot_list("https://me.mashu.lol/pg-hot.json")
+        )
+        if hot_packages is None:
             print("Gagal mengambil data hot package.")
             pause()
             return None
+        if saved_at is not None:
+            print(offline_notice(saved_at))
 
-        hot_packages = response.json()
+        for p in hot_packages:
+            CatalogueInstance.record_family_name(p["family_code"], p["family_name"], p["is_enterprise"])
+        prefetcher.prefetch(api_key, tokens, [(p["family_code"], p["is_enterprise"]) for p in hot_packages])
 
         for idx, p in enumerate(hot_packages):
             print(f"{idx + 1}. {p['family_name']} - {p['variant_name']} - {p['option_name']}")
@@ -44,26 +64,22 @@ def show_hot_menu():
             family_code = selected_bm["family_code"]
             is_enterprise = selected_bm["is_enterprise"]
             
-            family_data = get_family(api_key, tokens, family_code, is_enterprise)
+            try:
+                family_data = get_family(api_key, tokens, family_code, is_enterprise)
+            except Exception as e:
+                if not is_network_error(e):
+                    raise
+                print("Offline: data family tidak tersedia, coba lagi setelah koneksi kembali.")
+                pause()
+                continue
             if not family_data:
                 print("Gagal mengambil data family.")
                 pause()
                 continue
             
-            package_variants = family_data["package_variants"]
-            option_code = None
-            for variant in package_variants:
-                if variant["name"] == selected_bm["variant_name"]:
-                    selected_variant = variant
-                    
-                    package_options = selected_variant["package_options"]
-                    for option in package_options:
-                        if option["order"] == selected_bm["order"]:
-                            selected_option = option
-                            option_code = selected_option["package_option_code"]
-                            break
-            
-            if option_code:
+            found = family_data.find_option(selected_bm["order"], variant_name=selected_bm["variant_name"])
+            if found:
+                option_code = found[1].code
                 print(f"{option_code}")
                 show_package_details(api_key, tokens, option_code, is_enterprise)            
             
@@ -72,6 +88,37 @@ def show_hot_menu():
             pause()
             continue
 
+@transport.action()
+def _load_bundle_items(api_key: str, tokens: dict, packages: list) -> list[PaymentItem] | None:
+    """Payment items for every package of a HOT-2 bundle, under one deadline."""
+    payment_items = []
+    for package in packages:
+        package_detail = get_package_details(
+            api_key,
+            tokens,
+            package["family_code"],
+            package["variant_code"],
+            package["order"],
+            package["is_enterprise"],
+        )
+        
+        # Force failed when one of the package detail is None
+        if not package_detail:
+            print(f"Gagal mengambil detail paket untuk {package['family_code']}.")
+            return None
+        
+        payment_items.append(
+            PaymentItem(
+                item_code=package_detail.option.code,
+                product_type="",
+                item_price=package_detail.option.price,
+                item_name=package_detail.option.name,
+                tax=0,
+                token_confirmation=package_detail.token_confirmation,
+            )
+        )
+    return payment_items
+
 def show_hot_menu2():
     api_key = AuthInstance.api_key
     tokens = AuthInstance.get_active_tokens()
@@ -83,14 +130,15 @@ def show_hot_menu2():
         print("===================🔥 Paket  Hot 2 🔥==================")
         print("=======================================================")
         
-        url = "https://me.mashu.lol/pg-hot2.json"
-        response = requests.get(url, timeout=30)
-        if response.status_code != 200:
+        hot_packages, saved_at = SnapshotInstance.fetch(
+            "hot2", lambda: _load_hot_list("https://me.mashu.lol/pg-hot2.json")
+        )
+        if hot_packages is None:
             print("Gagal mengambil data hot package.")
             pause()
             return None
-
-        hot_packages = response.json()
+        if saved_at is not None:
+            print(offline_notice(saved_at))
 
         for idx, p in enumerate(hot_packages):
             print(f"{idx + 1}. {p['name']}\n   Harga: {p['price']}")
@@ -110,32 +158,14 @@ def show_hot_menu2():
                 pause()
                 continue
             
-            payment_items = []
-            for package in packages:
-                package_detail = get_package_details(
-                    api_key,
-                    tokens,
-                    package["family_code"],
-                    package["variant_code"],
-                    package["order"],
-                    package["is_enterprise"],
-                )
-                
-                # Force failed when one of the package detail is None
-                if not package_detail:
-                    print(f"Gagal mengambil detail paket untuk {package['family_code']}.")
-                    return None
-                
-                payment_items.append(
-                    PaymentItem(
-                        item_code=package_detail["package_option"]["package_option_code"],
-                        product_type="",
-                        item_price=package_detail["package_option"]["price"],
-                        item_name=package_detail["package_option"]["name"],
-                        tax=0,
-                        token_confirmation=package_detail["token_confirmation"],
-                    )
-                )
+            if transport.is_offline(BASE_API_URL):
+                print("Pembelian tidak tersedia saat offline.")
+                pause()
+                continue
+            
+            payment_items = _load_bundle_items(api_key, tokens, packages)
+            if payment_items is None:
+                return None
             
             clear_screen()
             print("=======================================================")
@@ -0,0 +1,101 @@
+import math
+import select
+import sys
+import time
+from typing import Callable, Iterable, Optional
+
+
+class InputMux:
+    """
+    Waits on stdin and the next timer deadline with a single select call.
+    Lines typed by the user are returned as soon as they arrive; when nothing
+    is typed the caller is woken exactly at the deadline (or at each whole
+    second if a countdown callback is given), never by polling.
+    Deadlines are expressed on `clock` (time.monotonic by default).
+    """
+    def __init__(self, stream=None, clock: Callable[[], float] = time.monotonic):
+        self.stream = stream
+        self.clock = clock
+        self._eof = False
+
+    def _stdin(self):
+        return self.stream or sys.stdin
+
+    def _select(self, timeout: float) -> bool:
+        """Block up to `timeout` seconds; True if stdin has a line to read."""
+        timeout = max(0.0, timeout)
+        if self._eof:
+            time.sleep(timeout)
+            return False
+        try:
+            ready, _, _ = select.select([self._stdin()], [], [], timeout)
+        except (OSError, ValueError):
+            # stdin is not selectable (closed or not a real file)
+            self._eof = True
+            time.sleep(timeout)
+            return False
+        return bool(ready)
+
+    def _readline(self) -> Optional[str]:
+        line = self._stdin().readline()
+        if line == "":
+            # EOF: stop watching stdin, otherwise select would spin
+            self._eof = True
+            return None
+        return line.strip()
+
+    def deadline_in(self, seconds: float) -> float:
+        return self.clock() + seconds
+
+    def wait(
+        self,
+        deadline: float,
+        on_tick: Optional[Callable[[int], None]] = None,
+    ) -> Optional[str]:
+        """
+        Block until a line is typed or `deadline` passes.
+        Returns the stripped line, or None when the deadline is reached.
+        on_tick(seconds_left) is called once per whole second of the countdown.
+        """
+        last_tick = None
+        while True:
+            now = self.clock()
+            if now >= deadline:
+                return None
+
+            wake_at = deadline
+            if on_tick is not None:
+                left = math.ceil(deadline - now)
+                if left != last_tick:
+                    on_tick(left)
+                    last_tick = left
+                wake_at = min(deadline, deadline - (left - 1))
+
+            if self._select(wake_at - now):
+                line = self._readline()
+                if line is not None:
+                    return line
+
+    def wait_for_command(
+        self,
+        deadline: float,
+        commands: Iterable[str],
+        on_tick: Optional[Callable[[int], None]] = None,
+        on_line: Optional[Callable[[str], None]] = None,
+    ) -> Optional[str]:
+        """
+        Like wait(), but keeps waiting until one of `commands` is typed
+        (case-insensitive) or the deadline passes. Other lines are passed to
+        on_line and otherwise ignored. Returns the matched command or None.
+        """
+        wanted = {c.lower() for c in commands}
+        while True:
+            line = self.wait(deadline, on_tick)
+            if line is None:
+                return None
+            if on_line is not None:
+                on_line(line)
+            if line.lower() in wanted:
+                return line.lower()
+
+InputInstance = InputMux()
@@ -0,0 +1,103 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app.client import transport
+from app.client.engsel import get_balance, get_quota_details
+from app.client.models import Quota
+from app.menus.util import clear_screen, pause, fmt_quota
+from app.service.auth import AuthInstance
+
+OVERVIEW_CONCURRENCY = int(os.getenv("OVERVIEW_CONCURRENCY", "3"))
+
+def _main_quota(quotas: list[Quota]) -> str:
+    """Largest main benefit across the account's active packages."""
+    if not quotas:
+        return "-"
+    best = max((q.main_benefit for q in quotas), key=lambda b: b.total)
+    return f"{best.name}: {fmt_quota(best.remaining, best.total)}"
+
+def _fetch_account(api_key: str, number: int, tokens: dict | None) -> dict:
+    """Balance, expiry and main quota for one account. Never raises."""
+    row = {"number": number, "balance": "-", "expired_at": "-", "quota": "-", "error": ""}
+    try:
+        if tokens is None:
+            tokens = AuthInstance.get_account_tokens(number)
+        if not tokens:
+            row["error"] = "token tidak valid, login ulang"
+            return row
+
+        balance = get_balance(api_key, tokens["id_token"])
+        if balance:
+            row["balance"] = f"Rp {balance.remaining}"
+            if balance.expired_at:
+                row["expired_at"] = datetime.fromtimestamp(balance.expired_at).strftime("%Y-%m-%d")
+
+        quota = get_quota_details(api_key, tokens)
+        if quota is not None:
+            row["quota"] = _main_quota(quota)
+
+        if not balance and quota is None:
+            row["error"] = "gagal mengambil data"
+    except Exception as e:
+        row["error"] = str(e)
+    return row
+
+@transport.action()
+def fetch_account_overview() -> list[dict]:
+    """
+    Fetch every saved account at once, at most OVERVIEW_CONCURRENCY at a
+    time. The active account keeps its current tokens; the others get fresh
+    tokens without switching the active account.
+    """
+    api_key = AuthInstance.api_key
+    active_user = AuthInstance.get_active_user()
+    active_number = active_user["number"] if active_user else None
+
+    jobs = []
+    for rt in AuthInstance.refresh_tokens:
+        number = int(rt["number"])
+        tokens = active_user["tokens"] if number == active_number else None
+        jobs.append((number, tokens))
+
+    executor = ThreadPoolExecutor(max_workers=max(1, OVERVIEW_CONCURRENCY))
+    try:
+        futures = [transport.submit(executor, _fetch_account, api_key, number, tokens) for number, tokens in jobs]
+        return [f.result() for f in futures]
+    finally:
+        # On Ctrl+C the action is cancelled; queued accounts are dropped, not waited for
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def show_account_overview():
+    in_overview_menu = True
+    while in_overview_menu:
+        clear_screen()
+        print(f"Memuat {len(AuthInstance.refresh_tokens)} akun...")
+        rows = fetch_account_overview()
+        active_user = AuthInstance.active_user
+
+        clear_screen()
+        print("-------------------------------------------------------")
+        print("Ringkasan Semua Akun")
+        print("-------------------------------------------------------")
+        if not rows:
+            print("Tidak ada akun tersimpan.")
+        else:
+            print(f"{'Nomor':<16}{'Pulsa':<12}{'Masa Aktif':<12}Kuota Utama")
+            for row in rows:
+                active_marker = "*" if active_user and active_user["number"] == row["number"] else " "
+                quota = row["error"] or row["quota"]
+                print(f"{active_marker}{row['number']:<15}{row['balance']:<12}{row['expired_at']:<12}{quota}")
+            print("-------------------------------------------------------")
+            print("* akun aktif")
+
+        print("0. Refresh")
+        print("00. Kembali ke menu utama")
+        choice = input("Pilih opsi: ")
+        if choice == "0":
+            continue
+        elif choice == "00":
+            in_overview_menu = False
+        else:
+            print("Opsi tidak valid. Silakan coba lagi.")
+            pause()
@@ -1,42 +1,87 @@
 import json
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from app.service.auth import AuthInstance
-from app.client.engsel import get_family, get_package, get_addons, get_package_details, send_api_request
+from app.client.engsel import get_family, get_package, get_addons, get_package_details, get_quota_details
 from app.service.bookmark import BookmarkInstance
+from app.service.snapshot import SnapshotInstance
+from app.client.models import PackageDetail, Quota
+from app.client import transport
+from app.log import quiet
+from app.client.transport import is_network_error
 from app.client.purchase import settlement_bounty, settlement_loyalty
-from app.menus.util import clear_screen, pause, display_html
+from app.menus.util import clear_screen, pause, display_html_cached, offline_notice
 from app.client.qris import show_qris_payment
 from app.client.ewallet import show_multipayment
 from app.client.balance import settlement_balance
 from app.type_dict import PaymentItem
 
+# Addons are fetched while the detail call is in flight
+_detail_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="package-detail")
 
-def show_package_details(api_key, tokens, package_option_code, is_enterprise, option_order = -1):
+def _fetch_addons(api_key, tokens, package_option_code):
+    # Addons are informational, a failure must not take the page down
+    try:
+        return get_addons(api_key, tokens, package_option_code)
+    except Exception as e:
+        print(f"Failed to load addons: {e}")
+        return None
+
+@transport.action()
+def _load_package(api_key, tokens, package_option_code):
+    """Package detail (or its snapshot) and addons, fetched concurrently as one action."""
+    addons_future = transport.submit(_detail_executor, _fetch_addons, api_key, tokens, package_option_code)
+    package, saved_at = SnapshotInstance.fetch(
+        f"package:{package_option_code}",
+        lambda: get_package(api_key, tokens, package_option_code),
+        encode=lambda package: package.raw,
+        decode=PackageDetail.from_dict,
+    )
+    return package, saved_at, addons_future.result()
+
+def show_package_details(
+    api_key,
+    tokens,
+    package_option_code,
+    is_enterprise,
+    option_order = -1,
+    migration_type = None,
+    pause_on_error = True,
+):
+    """
+    Show a package and its purchase options. Returns True when a purchase
+    finished, False when the user went back, and None when the option code
+    could not be loaded (e.g. a stale code).
+    """
     clear_screen()
     print("-------------------------------------------------------")
     print("Detail Paket")
     print("-------------------------------------------------------")
-    package = get_package(api_key, tokens, package_option_code)
+    try:
+        package, saved_at, addons = _load_package(api_key, tokens, package_option_code)
+    except Exception as e:
+        if not is_network_error(e):
+            raise
+        print("Offline: detail paket ini belum pernah dimuat.")
+        pause()
+        return False
     # print(f"[SPD-202]:\n{json.dumps(package, indent=1)}")
     if not package:
         print("Failed to load package details.")
-        pause()
-        return False
-
-    price = package["package_option"]["price"]
-    detail = display_html(package["package_option"]["tnc"])
-    validity = package["package_option"]["validity"]
+        if pause_on_error:
+            pause()
+        return None
 
-    option_name = package.get("package_option", {}).get("name","") #Vidio
-    family_name = package.get("package_family", {}).get("name","") #Unlimited Turbo
-    variant_name = package.get("package_detail_variant", "").get("name","") #For Xtra Combo
-    option_name = package.get("package_option", {}).get("name","") #Vidio
-    
-    title = f"{family_name} - {variant_name} - {option_name}".strip()
+    option = package.option
+    price = option.price
+    detail = display_html_cached(option.tnc)
+    variant_name = package.variant_name #For Xtra Combo
+    option_name = option.name #Vidio
+    title = package.title
     
-    token_confirmation = package["token_confirmation"]
-    ts_to_sign = package["timestamp"]
-    payment_for = package["package_family"]["payment_for"]
+    token_confirmation = package.token_confirmation
+    ts_to_sign = package.timestamp
+    payment_for = package.payment_for
     
     payment_items = [
         PaymentItem(
@@ -50,50 +95,30 @@ def show_package_details(api_key, tokens, package_option_code, is_enterprise, op
     ]
     
     print("-------------------------------------------------------")
+    if saved_at is not None:
+        print(offline_notice(saved_at))
     print(f"Nama: {title}")
     print(f"Harga: Rp {price}")
     print(f"Payment For: {payment_for}")
-    print(f"Masa Aktif: {validity}")
-    print(f"Point: {package['package_option']['point']}")
-    print(f"Plan Type: {package['package_family']['plan_type']}")
+    print(f"Masa Aktif: {option.validity}")
+    print(f"Point: {option.point}")
+    print(f"Plan Type: {package.plan_type}")
     print("-------------------------------------------------------")
-    benefits = package["package_option"]["benefits"]
-    if benefits and isinstance(benefits, list):
+    if option.benefits:
         print("Benefits:")
-        for benefit in benefits:
+        for benefit in option.benefits:
             print("-------------------------------------------------------")
-            print(f" Name: {benefit['name']}")
-            print(f"  Item id: {benefit['item_id']}")
-            data_type = benefit['data_type']
-            if data_type == "VOICE" and benefit['total'] > 0:
-                print(f"  Total: {benefit['total']/60} menit")
-            elif data_type == "TEXT" and benefit['total'] > 0:
-                print(f"  Total: {benefit['total']} SMS")
-            elif data_type == "DATA" and benefit['total'] > 0:
-                if benefit['total'] > 0:
-                    quota = int(benefit['total'])
-                    # It is in byte, make it in GB
-                    if quota >= 1_000_000_000:
-                        quota_gb = quota / (1024 ** 3)
-                        print(f"  Quota: {quota_gb:.2f} GB")
-                    elif quota >= 1_000_000:
-                        quota_mb = quota / (1024 ** 2)
-                        print(f"  Quota: {quota_mb:.2f} MB")
-                    elif quota >= 1_000:
-                        quota_kb = quota / 1024
-                        print(f"  Quota: {quota_kb:.2f} KB")
-                    else:
-                        print(f"  Total: {quota}")
-            elif data_type not in ["DATA", "VOICE", "TEXT"]:
-                print(f"  Total: {benefit['total']} ({data_type})")
+            print(f" Name: {benefit.name}")
+            print(f"  Item id: {benefit.item_id}")
+            if benefit.total > 0:
+                label = "Quota" if benefit.data_type == "DATA" else "Total"
+                print(f"  {label}: {benefit.format_amount(benefit.total)}")
             
-            if benefit["is_unlimited"]:
+            if benefit.is_unlimited:
                 print("  Unlimited: Yes")
     print("-------------------------------------------------------")
-    addons = get_addons(api_key, tokens, package_option_code)
-    
 
-    bonuses = addons.get("bonuses", [])
+    bonuses = (addons or {}).get("bonuses", [])
     
     # Pick 1st bonus if available, need more testing
     # if len(bonuses) > 0:
@@ -121,7 +146,10 @@ def show_package_details(api_key, tokens, package_option_code, is_enterprise, op
     #         )
     #     )
 
-    print(f"Addons:\n{json.dumps(addons, indent=2)}")
+    if addons is None:
+        print("Addons: tidak tersedia")
+    else:
+        print(f"Addons:\n{json.dumps(addons, indent=2)}")
     print("-------------------------------------------------------")
     print(f"SnK MyXL:\n{detail}")
     print("-------------------------------------------------------")
@@ -129,15 +157,19 @@ def show_package_details(api_key, tokens, package_option_code, is_enterprise, op
     in_package_detail_menu = True
     while in_package_detail_menu:
         print("Options:")
-        print("1. Beli dengan Pulsa")
-        print("2. Beli dengan E-Wallet")
-        print("3. Bayar dengan QRIS")
+        if saved_at is not None:
+            # Snapshot tokens are stale, buying needs a fresh detail call
+            print("Pembelian tidak tersedia saat offline.")
+        else:
+            print("1. Beli dengan Pulsa")
+            print("2. Beli dengan E-Wallet")
+            print("3. Bayar dengan QRIS")
         
         # Sometimes payment_for is empty, so we set default to BUY_PACKAGE
         if payment_for == "":
             payment_for = "BUY_PACKAGE"
         
-        if payment_for == "REDEEM_VOUCHER":
+        if payment_for == "REDEEM_VOUCHER" and saved_at is None:
             print("4. Ambil sebagai bonus (jika tersedia)")
             print("5. Beli dengan Poin (jika tersedia)")
         
@@ -151,12 +183,15 @@ def show_package_details(api_key, tokens, package_option_code, is_enterprise, op
         if choice == "0" and option_order != -1:
             # Add to bookmark
             success = BookmarkInstance.add_bookmark(
-                family_code=package.get("package_family", {}).get("package_family_code",""),
-                family_name=package.get("package_family", {}).get("name",""),
+                family_code=package.family_code,
+                family_name=package.family_name,
                 is_enterprise=is_enterprise,
                 variant_name=variant_name,
                 option_name=option_name,
                 order=option_order,
+                option_code=package_option_code,
+                variant_code=package.variant_code,
+                migration_type=migration_type,
             )
             if success:
                 print("Paket berhasil ditambahkan ke bookmark.")
@@ -164,6 +199,8 @@ def show_package_details(api_key, tokens, package_option_code, is_enterprise, op
                 print("Paket sudah ada di bookmark.")
             pause()
             continue
+        if saved_at is not None:
+            return False
         
         if choice == '1':
             settlement_balance(
@@ -234,12 +271,12 @@ def show_package_details(api_key, tokens, package_option_code, is_enterprise, op
             
             payment_items.insert(
                 0,PaymentItem(
-                    item_code=pd["package_option"]["package_option_code"],
+                    item_code=pd.option.code,
                     product_type="",
-                    item_price=pd["package_option"]["price"],
-                    item_name=pd["package_option"]["name"],
+                    item_price=pd.option.price,
+                    item_name=pd.option.name,
                     tax=0,
-                    token_confirmation=pd["token_confirmation"],
+                    token_confirmation=pd.token_confirmation,
                 )
             )
 
@@ -285,8 +322,7 @@ def get_packages_by_family(
         pause()
         return None
     price_currency = "Rp"
-    rc_bonus_type = data["package_family"].get("rc_bonus_type", "")
-    if rc_bonus_type == "MYREWARDS":
+    if data.rc_bonus_type == "MYREWARDS":
         price_currency = "Poin"
     
     in_package_menu = True
@@ -294,38 +330,34 @@ def get_packages_by_family(
         clear_screen()
         # print(f"[GPBF-283]:\n{json.dumps(data, indent=2)}")
         print("-------------------------------------------------------")        
-        print(f"Family Name: {data['package_family']['name']}")
+        print(f"Family Name: {data.name}")
         print(f"Family Code: {family_code}")
-        print(f"Family Type: {data['package_family']['package_family_type']}")
+        print(f"Family Type: {data.family_type}")
         # print(f"Enterprise: {'Yes' if is_enterprise else 'No'}")
-        print(f"Variant Count: {len(data['package_variants'])}")
+        print(f"Variant Count: {len(data.variants)}")
         print("-------------------------------------------------------")
         print("Paket Tersedia")
         print("-------------------------------------------------------")
         
-        package_variants = data["package_variants"]
+        package_variants = data.variants
         
         option_number = 1
         variant_number = 1
         
         for variant in package_variants:
-            variant_name = variant["name"]
-            variant_code = variant["package_variant_code"]
-            print(f" Variant {variant_number}: {variant_name}")
-            print(f" Code: {variant_code}")
-            for option in variant["package_options"]:
-                option_name = option["name"]
-                
+            print(f" Variant {variant_number}: {variant.name}")
+            print(f" Code: {variant.code}")
+            for option in variant.options:
                 packages.append({
                     "number": option_number,
-                    "variant_name": variant_name,
-                    "option_name": option_name,
-                    "price": option["price"],
-                    "code": option["package_option_code"],
-                    "option_order": option["order"]
+                    "variant_name": variant.name,
+                    "option_name": option.name,
+                    "price": option.price,
+                    "code": option.code,
+                    "option_order": option.order
                 })
                                 
-                print(f"   {option_number}. {option_name} - {price_currency} {option['price']}")
+                print(f"   {option_number}. {option.name} - {price_currency} {option.price}")
                 
                 option_number += 1
             
@@ -346,7 +378,14 @@ def get_packages_by_family(
             print("Paket tidak ditemukan. Silakan masukan nomor yang benar.")
             continue
         
-        is_done = show_package_details(api_key, tokens, selected_pkg["code"], is_enterprise, option_order=selected_pkg["option_order"])
+        is_done = show_package_details(
+            api_key,
+            tokens,
+            selected_pkg["code"],
+            is_enterprise,
+            option_order=selected_pkg["option_order"],
+            migration_type=migration_type,
+        )
         if is_done:
             in_package_menu = False
             return None
@@ -355,6 +394,24 @@ def get_packages_by_family(
         
     return packages
 
+@transport.action()
+def _load_my_packages(api_key, tokens) -> list[tuple[Quota, str]] | None:
+    """Active packages with the family code of each (N/A when unknown)."""
+    with quiet():
+        quotas = get_quota_details(api_key, tokens)
+    if quotas is None:
+        return None
+    
+    packages = []
+    for num, quota in enumerate(quotas, start=1):
+        family_code = "N/A"
+        print(f"fetching package no. {num} details...")
+        package_details = get_package(api_key, tokens, quota.quota_code)
+        if package_details:
+            family_code = package_details.family_code
+        packages.append((quota, family_code))
+    return packages
+
 def fetch_my_packages():
     api_key = AuthInstance.api_key
     tokens = AuthInstance.get_active_tokens()
@@ -363,108 +420,50 @@ def fetch_my_packages():
         pause()
         return None
     
-    id_token = tokens.get("id_token")
-    
-    path = "api/v8/packages/quota-details"
-    
-    payload = {
-        "is_enterprise": False,
-        "lang": "en",
-        "family_member_id": ""
-    }
-    
     print("Fetching my packages...")
-    res = send_api_request(api_key, path, payload, id_token, "POST")
-    if res.get("status") != "SUCCESS":
+    packages, saved_at = SnapshotInstance.fetch(
+        f"my-packages:{AuthInstance.active_user['number']}",
+        lambda: _load_my_packages(api_key, tokens),
+        encode=lambda packages: [{"quota": q.raw, "family_code": fc} for q, fc in packages],
+        decode=lambda data: [(Quota.from_dict(p["quota"]), p["family_code"]) for p in data],
+    )
+    if packages is None:
         print("Failed to fetch packages")
-        print("Response:", res)
         pause()
         return None
     
-    quotas = res["data"]["quotas"]
-    
     clear_screen()
     print("=======================================================")
     print("======================My Packages======================")
     print("=======================================================")
+    if saved_at is not None:
+        print(offline_notice(saved_at))
     my_packages =[]
     num = 1
-    for quota in quotas:
-        quota_code = quota["quota_code"] # Can be used as option_code
-        group_code = quota["group_code"]
-        group_name = quota["group_name"]
-        quota_name = quota["name"]
-        family_code = "N/A"
+    for quota, family_code in packages:
+        quota_code = quota.quota_code # Can be used as option_code
         
         benefit_infos = []
-        benefits = quota.get("benefits", [])
-        if len(benefits) > 0:
-            for benefit in benefits:
-                benefit_id = benefit.get("id", "")
-                name = benefit.get("name", "")
-                data_type = benefit.get("data_type", "N/A")
-                benefit_info = "  -----------------------------------------------------\n"
-                benefit_info += f"  ID    : {benefit_id}\n"
-                benefit_info += f"  Name  : {name}\n"
-                benefit_info += f"  Type  : {data_type}\n"
-                
-
-                remaining = benefit.get("remaining", 0)
-                total = benefit.get("total", 0)
-
-                if data_type == "DATA":
-                    if remaining >= 1_000_000_000:
-                        remaining_gb = remaining / (1024 ** 3)
-                        remaining_str = f"{remaining_gb:.2f} GB"
-                    elif remaining >= 1_000_000:
-                        remaining_mb = remaining / (1024 ** 2)
-                        remaining_str = f"{remaining_mb:.2f} MB"
-                    elif remaining >= 1_000:
-                        remaining_kb = remaining / 1024
-                        remaining_str = f"{remaining_kb:.2f} KB"
-                    else:
-                        remaining_str = str(remaining)
-                    
-                    if total >= 1_000_000_000:
-                        total_gb = total / (1024 ** 3)
-                        total_str = f"{total_gb:.2f} GB"
-                    elif total >= 1_000_000:
-                        total_mb = total / (1024 ** 2)
-                        total_str = f"{total_mb:.2f} MB"
-                    elif total >= 1_000:
-                        total_kb = total / 1024
-                        total_str = f"{total_kb:.2f} KB"
-                    else:
-                        total_str = str(total)
-                    
-                    benefit_info += f"  Kuota : {remaining_str} / {total_str}"
-                elif data_type == "VOICE":
-                    benefit_info += f"  Kuota : {remaining/60:.2f} / {total/60:.2f} menit"
-                elif data_type == "TEXT":
-                    benefit_info += f"  Kuota : {remaining} / {total} SMS"
-                else:
-                    benefit_info += f"  Kuota : {remaining} / {total}"
-
-                benefit_infos.append(benefit_info)
-            
-        
-        print(f"fetching package no. {num} details...")
-        package_details = get_package(api_key, tokens, quota_code)
-        if package_details:
-            family_code = package_details["package_family"]["package_family_code"]
+        for benefit in quota.benefits:
+            benefit_info = "  -----------------------------------------------------\n"
+            benefit_info += f"  ID    : {benefit.item_id}\n"
+            benefit_info += f"  Name  : {benefit.name}\n"
+            benefit_info += f"  Type  : {benefit.data_type or 'N/A'}\n"
+            benefit_info += f"  Kuota : {benefit.format_usage()}"
+            benefit_infos.append(benefit_info)
         
         print("=======================================================")
         print(f"Package {num}")
-        print(f"Name: {quota_name}")
+        print(f"Name: {quota.name}")
         print("Benefits:")
         if len(benefit_infos) > 0:
             for bi in benefit_infos:
                 print(bi)
             print("  -----------------------------------------------------")
-        print(f"Group Name: {group_name}")
+        print(f"Group Name: {quota.group_name}")
         print(f"Quota Code: {quota_code}")
         print(f"Family Code: {family_code}")
-        print(f"Group Code: {group_code}")
+        print(f"Group Code: {quota.group_code}")
         print("=======================================================")
         
         my_packages.append({
@@ -1,10 +1,42 @@
 from datetime import datetime, timedelta
 
-from app.client.engsel2 import get_pending_transaction, get_transaction_history
-from app.menus.util import clear_screen
+from app.client.engsel2 import get_pending_transaction
+from app.menus.util import clear_screen, offline_notice
+from app.service.ledger import LedgerInstance
 
-def show_transaction_history(api_key, tokens):
+def _parse_date(text: str) -> int | None:
+    try:
+        return int(datetime.strptime(text.strip(), "%Y-%m-%d").timestamp())
+    except ValueError:
+        return None
+
+def _ask_filters() -> dict:
+    print("Kosongkan untuk melewati filter.")
+    filters = {}
+    status = input("Status transaksi (mis. SUCCESS/FAILED): ").strip()
+    if status:
+        filters["status"] = status
+    method = input("Metode pembayaran (mis. BALANCE/QRIS): ").strip()
+    if method:
+        filters["method"] = method
+    since = input("Dari tanggal (YYYY-MM-DD): ").strip()
+    if since and _parse_date(since) is not None:
+        filters["since"] = _parse_date(since)
+    until = input("Sampai tanggal (YYYY-MM-DD): ").strip()
+    if until and _parse_date(until) is not None:
+        # inclusive end date
+        filters["until"] = _parse_date(until) + 24 * 3600
+    title = input("Judul mengandung: ").strip()
+    if title:
+        filters["title"] = title
+    return filters
+
+def show_transaction_history(api_key, tokens, number):
     in_transaction_menu = True
+    filters = {}
+
+    # Render from the local ledger right away; new rows arrive in the background
+    LedgerInstance.start_sync(api_key, tokens, number)
 
     while in_transaction_menu:
         clear_screen()
@@ -12,18 +44,20 @@ def show_transaction_history(api_key, tokens):
         print("Riwayat Transaksi")
         print("-------------------------------------------------------")
 
-        data = None
-        history = []
-        try:
-            data = get_transaction_history(api_key, tokens)
-            history = data.get("list", [])
-        except Exception as e:
-            print(f"Gagal mengambil riwayat transaksi: {e}")
-            history = []
-        
+        history = LedgerInstance.query(number, **filters)
+
+        if LedgerInstance.is_syncing(number):
+            print("Sinkronisasi riwayat berjalan... pilih 0 untuk memuat data terbaru.")
+        elif LedgerInstance.offline:
+            print(offline_notice(LedgerInstance.last_synced_at(number)))
+        elif LedgerInstance.last_error:
+            print(f"Gagal mengambil riwayat transaksi: {LedgerInstance.last_error}")
+        if filters:
+            print(f"Filter aktif: {', '.join(f'{k}={v}' for k, v in filters.items())}")
+
         if len(history) == 0:
             print("Tidak ada riwayat transaksi.")
-        
+
         for idx, transaction in enumerate(history, start=1):
             transaction_timestamp = transaction.get("timestamp", 0)
             dt = datetime.fromtimestamp(transaction_timestamp)
@@ -40,11 +74,19 @@ def show_transaction_history(api_key, tokens):
 
         # Option
         print("0. Refresh")
+        print("1. Filter")
+        if filters:
+            print("2. Hapus filter")
         print("00. Kembali ke Menu Utama")
         choice = input("Pilih opsi: ")
         if choice == "0":
+            LedgerInstance.start_sync(api_key, tokens, number)
             continue
+        elif choice == "1":
+            filters = _ask_filters()
+        elif choice == "2" and filters:
+            filters = {}
         elif choice == "00":
             in_transaction_menu = False
         else:
-            print("Opsi tidak valid. Silakan coba lagi.")
\ No newline at end of file
+            print("Opsi tidak valid. Silakan coba lagi.")
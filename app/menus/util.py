@@ -1,20 +1,145 @@
 import app.menus.banner as banner
-ascii_art = banner.load("https://me.mashu.lol/mebanner870.png", globals())
+from app.service.snapshot import format_age
 
+from contextlib import contextmanager, redirect_stdout
 from html.parser import HTMLParser
+import hashlib
+import io
 import os
 import re
+import shutil
+import sys
 import textwrap
 
+BANNER_URL = "https://me.mashu.lol/mebanner870.png"
+BANNER_COLUMNS = 55
+
+# ANSI: cursor home + clear screen + clear scrollback
+CLEAR_SEQ = "\033[H\033[2J\033[3J"
+
+ascii_art = None
+_header_cache = None
+
+if os.name == "nt":
+    # Enable VT100 escape processing on Windows consoles
+    os.system("")
+
+def get_header() -> str:
+    """Render the banner once and reuse the text for every frame."""
+    global ascii_art, _header_cache
+    if _header_cache is None:
+        ascii_art = banner.load(BANNER_URL, globals())
+        _header_cache = ""
+        if ascii_art:
+            try:
+                _header_cache = ascii_art.to_ascii(columns=BANNER_COLUMNS) + "\n"
+            except Exception:
+                _header_cache = ""
+    return _header_cache
+
 def clear_screen():
-    print("Clearing screen...")
-    os.system('cls' if os.name == 'nt' else 'clear')
-    if ascii_art:
-        ascii_art.to_terminal(columns=55)
+    sys.stdout.write(CLEAR_SEQ + get_header())
+    sys.stdout.flush()
 
 def pause():
     input("\nPress enter to continue...")
 
+class LiveScreen:
+    """
+    Redraw a fixed-layout screen for long-running loops.
+    The first render (or any layout change) draws the whole frame in one write;
+    later renders only rewrite the rows whose text changed. A frame taller
+    than the terminal is always redrawn whole, since its top rows have
+    scrolled out of reach of the cursor.
+    """
+    def __init__(self, with_header: bool = True):
+        self.with_header = with_header
+        self._lines = None
+        self._heights = None
+        self._width = None
+        self._status = ""
+        self._out = None
+
+    def _stream(self):
+        return self._out or sys.stdout
+
+    def invalidate(self):
+        """Force a full redraw, e.g. after free-form prints or echoed input."""
+        self._lines = None
+        self._status = ""
+
+    @contextmanager
+    def capture(self):
+        """Show progress prints from the wrapped block on the status row instead of scrolling the frame."""
+        self._out = sys.stdout
+        try:
+            with redirect_stdout(_StatusWriter(self)):
+                yield
+        finally:
+            self._out = None
+
+    def _height(self, line: str, width: int) -> int:
+        return max(1, -(-len(line) // width))
+
+    def render(self, lines: list[str]):
+        size = shutil.get_terminal_size()
+        width = size.columns or 80
+        heights = [self._height(line, width) for line in lines]
+
+        if (
+            self._lines is None
+            or width != self._width
+            or heights != self._heights
+            # Frame plus the status row no longer fits on screen
+            or sum(heights) + 1 >= size.lines
+        ):
+            frame = CLEAR_SEQ
+            if self.with_header:
+                frame += get_header()
+            frame += "\n".join(lines) + "\n"
+        else:
+            # Cursor sits on the row below the frame; walk up to each changed row.
+            frame = "\r\033[2K"
+            below = sum(heights)
+            for line, old, height in zip(lines, self._lines, heights):
+                if line != old:
+                    if height > 1:
+                        line = line.ljust(height * width - 1)
+                    frame += f"\033[{below}F\033[2K{line}\033[{below - height + 1}E"
+                below -= height
+
+        self._lines = list(lines)
+        self._heights = heights
+        self._width = width
+        self._status = ""
+        out = self._stream()
+        out.write(frame)
+        out.flush()
+
+    def status(self, text: str):
+        """Overwrite the single status row under the frame."""
+        width = shutil.get_terminal_size().columns or 80
+        text = text[:width - 1]
+        if text == self._status:
+            return
+        self._status = text
+        out = self._stream()
+        out.write("\r\033[2K" + text)
+        out.flush()
+
+class _StatusWriter(io.TextIOBase):
+    def __init__(self, screen: LiveScreen):
+        self.screen = screen
+        self._pending = ""
+
+    def write(self, s: str) -> int:
+        self._pending += s
+        *done, self._pending = re.split(r"[\r\n]", self._pending)
+        last = next((line for line in reversed(done) if line.strip()), None)
+        if last is not None:
+            self.screen.status(last.strip())
+        return len(s)
+
 class HTMLToText(HTMLParser):
     def __init__(self, width=80):
         super().__init__()
@@ -51,4 +176,47 @@ class HTMLToText(HTMLParser):
 def display_html(html_text, width=80):
     parser = HTMLToText(width=width)
     parser.feed(html_text)
-    return parser.get_text()
\ No newline at end of file
+    return parser.get_text()
+
+# Rendered HTML by content hash; T&C texts repeat across options and visits
+_html_cache: dict[tuple[str, int], str] = {}
+HTML_CACHE_SIZE = 128
+
+def display_html_cached(html_text, width=80):
+    key = (hashlib.sha256(html_text.encode("utf-8")).hexdigest(), width)
+    text = _html_cache.get(key)
+    if text is None:
+        text = display_html(html_text, width)
+        if len(_html_cache) >= HTML_CACHE_SIZE:
+            _html_cache.pop(next(iter(_html_cache)))
+        _html_cache[key] = text
+    return text
+
+def format_bytes_to_human(val: int) -> (float, str):
+    try:
+        v = float(val)
+    except Exception:
+        return (0.0, "B")
+    units = ["B", "KB", "MB", "GB", "TB"]
+    i = 0
+    while v >= 1024.0 and i < len(units) - 1:
+        v /= 1024.0
+        i += 1
+    return (v, units[i])
+
+def fmt_quota(remaining: int, total: int) -> str:
+    rv, ru = format_bytes_to_human(remaining)
+    tv, tu = format_bytes_to_human(total)
+    if ru == tu:
+        return f"{rv:.2f} {ru} / {tv:.2f} {tu}"
+    if ru in ("MB", "GB") and tu in ("MB", "GB"):
+        r_in_gb = remaining / (1024 ** 3)
+        t_in_gb = total / (1024 ** 3)
+        return f"{r_in_gb:.2f} GB / {t_in_gb:.2f} GB"
+    return f"{rv:.2f} {ru} / {tv:.2f} {tu}"
+
+def offline_notice(saved_at: float) -> str:
+    """Marker for screens rendered from a snapshot while offline."""
+    if not saved_at:
+        return "[OFFLINE] Belum ada data tersimpan"
+    return f"[OFFLINE] Data terakhir diperbarui {format_age(saved_at)}"
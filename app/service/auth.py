@@ -1,8 +1,44 @@
 import os
 import json
+import threading
 import time
+from app.client import transport
 from app.client.engsel import get_new_token
-from app.util import ensure_api_key
+from app.service.cache import CacheInstance
+from app.exit_codes import EXIT_AUTH_EXPIRED, EXIT_NOT_LOGGED_IN
+from app.log import get_logger
+from app.util import ensure_api_key, require_user
+
+logger = get_logger(__name__)
+
+class OfflineTokens(dict):
+    """
+    Tokens of an account selected while the login server was unreachable:
+    only the refresh token is known. The first read of another token
+    (also through get()) renews them; while the server is still down that
+    raises its network error, so callers fall back to their snapshots like
+    any offline call, and screens refreshed after recovery get real tokens.
+    """
+    def __init__(self, number: int, refresh_token: str):
+        super().__init__(refresh_token=refresh_token)
+        self.number = number
+        self._lock = threading.Lock()
+
+    def __missing__(self, key):
+        with self._lock:
+            if "id_token" not in self:
+                tokens = get_new_token(dict.__getitem__(self, "refresh_token"))
+                if not tokens:
+                    raise transport.TransportError("Refresh token rejected, login again")
+                self.update(tokens)
+                AuthInstance.save_refresh_token(self.number, tokens.get("refresh_token"))
+        return dict.__getitem__(self, key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
 
 class Auth:
     _instance_ = None
@@ -17,6 +53,9 @@ class Auth:
     # Format of active_user: {"number": int, "tokens": {"refresh_token": str, "access_token": str, "id_token": str}}
     
     last_refresh_time = None
+
+    # Guards refresh-tokens.json when accounts are refreshed from worker threads
+    _tokens_lock = threading.Lock()
     
     def __new__(cls, *args, **kwargs):
         if not cls._instance_:
@@ -52,7 +91,7 @@ class Auth:
                 if "number" in rt and "refresh_token" in rt:
                     self.refresh_tokens.append(rt)
                 else:
-                    print(f"Invalid token entry: {rt}")
+                    logger.warning("Invalid token entry: %s", rt)
 
     def add_refresh_token(self, number: int, refresh_token: str):
         # Check if number already exist, if yes, replace it, if not append
@@ -87,27 +126,39 @@ class Auth:
                 if tokens:
                     self.set_active_user(first_rt["number"])
             else:
-                input("No users left. Press Enter to continue...")
                 self.active_user = None
+                require_user(EXIT_NOT_LOGGED_IN, "No users left.")
 
     def set_active_user(self, number: int):
         # Get refresh token for the number from refresh_tokens
         rt_entry = next((rt for rt in self.refresh_tokens if rt["number"] == number), None)
         if not rt_entry:
-            print(f"No refresh token found for number: {number}")
-            input("Press Enter to continue...")
+            require_user(EXIT_NOT_LOGGED_IN, f"No refresh token found for number: {number}")
             return False
 
-        tokens = get_new_token(rt_entry["refresh_token"])
+        try:
+            tokens = get_new_token(rt_entry["refresh_token"])
+        except Exception as e:
+            if not transport.is_network_error(e):
+                raise
+            # Offline: select the account anyway, get_active_user() fetches
+            # its tokens once the login server is reachable again
+            logger.warning("Offline, token untuk %s diperbarui saat koneksi kembali.", number)
+            tokens = OfflineTokens(int(number), rt_entry["refresh_token"])
         if not tokens:
-            print(f"Failed to get tokens for number: {number}. The refresh token might be invalid or expired.")
-            input("Press Enter to continue...")
+            require_user(
+                EXIT_AUTH_EXPIRED,
+                f"Failed to get tokens for number: {number}. The refresh token might be invalid or expired.",
+            )
             return False
 
         self.active_user = {
             "number": int(number),
             "tokens": tokens
         }
+
+        # Cached responses belong to the previous account
+        CacheInstance.clear()
         
         # Save active number to file
         self.write_active_number()
@@ -118,23 +169,52 @@ class Auth:
         # self.write_tokens_to_file()
 
     def renew_active_user_token(self):
+        """Returns True when renewed, False when rejected and None when offline."""
         if self.active_user:
-            tokens = get_new_token(self.active_user["tokens"]["refresh_token"])
+            try:
+                tokens = get_new_token(self.active_user["tokens"]["refresh_token"])
+            except Exception as e:
+                if not transport.is_network_error(e):
+                    raise
+                # Current tokens stay in use until the login server answers again
+                return None
             if tokens:
                 self.active_user["tokens"] = tokens
                 self.last_refresh_time = int(time.time())
                 self.add_refresh_token(self.active_user["number"], self.active_user["tokens"]["refresh_token"])
                 
-                print("Active user token renewed successfully.")
+                logger.info("Active user token renewed successfully.")
                 return True
             else:
-                print("Failed to renew active user token.")
-                input("Press Enter to continue...")
+                require_user(EXIT_AUTH_EXPIRED, "Failed to renew active user token.")
         else:
-            print("No active user set or missing refresh token.")
-            input("Press Enter to continue...")
+            require_user(EXIT_NOT_LOGGED_IN, "No active user set or missing refresh token.")
         return False
     
+    def get_account_tokens(self, number: int) -> dict | None:
+        """
+        Get fresh tokens for a saved account without making it active.
+        A rotated refresh token is written back to refresh-tokens.json.
+        Safe to call from several threads for different accounts.
+        """
+        rt_entry = next((rt for rt in self.refresh_tokens if rt["number"] == number), None)
+        if not rt_entry:
+            return None
+
+        tokens = get_new_token(rt_entry["refresh_token"])
+        if tokens:
+            self.save_refresh_token(number, tokens.get("refresh_token"))
+        return tokens
+
+    def save_refresh_token(self, number: int, refresh_token: str | None):
+        """Write a rotated refresh token of a saved account back to refresh-tokens.json."""
+        rt_entry = next((rt for rt in self.refresh_tokens if rt["number"] == number), None)
+        if not rt_entry or not refresh_token or refresh_token == rt_entry["refresh_token"]:
+            return
+        with self._tokens_lock:
+            rt_entry["refresh_token"] = refresh_token
+            self.write_tokens_to_file()
+
     def get_active_user(self):
         if not self.active_user:
             # Choose the first user if available
@@ -146,11 +226,15 @@ class Auth:
                         "number": int(first_rt["number"]),
                         "tokens": tokens
                     }
-            return None
+                    self.last_refresh_time = int(time.time())
+                    self.save_refresh_token(self.active_user["number"], tokens.get("refresh_token"))
+            return self.active_user
         
-        if self.last_refresh_time is None or (int(time.time()) - self.last_refresh_time) > 300:
-            self.renew_active_user_token()
-            self.last_refresh_time = time.time()
+        stale = self.last_refresh_time is None or (int(time.time()) - self.last_refresh_time) > 300
+        if stale or "id_token" not in self.active_user["tokens"]:
+            # Offline renewals are retried on the next call instead of in 5 minutes
+            if self.renew_active_user_token() is not None:
+                self.last_refresh_time = time.time()
         
         return self.active_user
     
@@ -1,8 +1,19 @@
 import os
 import json
-from typing import List, Dict
+from typing import List, Dict, Tuple, Optional
+
+from app.log import get_logger
+
+logger = get_logger(__name__)
+
+BookmarkKey = Tuple[str, bool, str, int]
 
 class Bookmark:
+    """
+    Bookmarks indexed by (family_code, is_enterprise, variant_name, order).
+    The index is an insertion-ordered dict, so lookups, adds and removals are
+    O(1) and the list keeps the order bookmarks were added in.
+    """
     _instance = None
     _initialized = False
 
@@ -13,7 +24,8 @@ class Bookmark:
 
     def __init__(self):
         if not self._initialized:
-            self.packages: List[Dict] = []
+            self.packages: Dict[BookmarkKey, Dict] = {}
+            self._view: Optional[Tuple[Dict, ...]] = None
             self.filepath = "bookmark.json"
 
             if os.path.exists(self.filepath):
@@ -23,33 +35,65 @@ class Bookmark:
 
             self._initialized = True
 
-    def _save(self, data: List[Dict]):
-        """Helper to write JSON safely."""
-        with open(self.filepath, "w", encoding="utf-8") as f:
+    @staticmethod
+    def key_of(p: Dict) -> BookmarkKey:
+        return (p["family_code"], p["is_enterprise"], p["variant_name"], p["order"])
+
+    def _save(self, data: List[Dict], filepath: str | None = None):
+        """Helper to write JSON atomically (temp file, then rename)."""
+        filepath = filepath or self.filepath
+        tmp_path = filepath + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=4)
+        os.replace(tmp_path, filepath)
 
-    def _ensure_schema(self):
-        """Ensure all bookmarks have the latest schema fields."""
+    @staticmethod
+    def _ensure_fields(p: Dict) -> bool:
+        """Fill in fields missing from older entries. Returns True if p changed."""
         updated = False
-        for p in self.packages:
-            if "family_name" not in p:  # add missing field
-                p["family_name"] = ""
-                updated = True
-            if "order" not in p:
-                p["order"] = 0
+        if "family_name" not in p:  # add missing field
+            p["family_name"] = ""
+            updated = True
+        if "order" not in p:
+            p["order"] = 0
+            updated = True
+        # Resolved codes let a bookmark open without a family lookup;
+        # empty until the bookmark is opened (or re-added) once.
+        for field, default in (
+            ("option_code", ""),
+            ("variant_code", ""),
+            ("migration_type", None),
+            ("group", ""),
+        ):
+            if field not in p:
+                p[field] = default
                 updated = True
+        return updated
+
+    def _ensure_schema(self, entries: List[Dict]):
+        """Ensure all bookmarks have the latest schema fields and build the index."""
+        updated = False
+        self.packages = {}
+        for p in entries:
+            updated |= self._ensure_fields(p)
+            key = self.key_of(p)
+            if key in self.packages:
+                updated = True  # drop duplicates left by older versions
+                continue
+            self.packages[key] = p
+        self._view = None
         if updated:
             self.save_bookmark()  # persist schema upgrade
 
     def load_bookmark(self):
         """Load bookmarks from JSON file and ensure schema consistency."""
         with open(self.filepath, "r", encoding="utf-8") as f:
-            self.packages = json.load(f)
-        self._ensure_schema()
+            self._ensure_schema(json.load(f))
 
     def save_bookmark(self):
         """Save current bookmarks to JSON file."""
-        self._save(self.packages)
+        self._view = None
+        self._save(list(self.packages.values()))
 
     def add_bookmark(
         self,
@@ -59,29 +103,32 @@ class Bookmark:
         variant_name: str,
         option_name: str,
         order: int,
+        option_code: str = "",
+        variant_code: str = "",
+        migration_type: str | None = None,
+        group: str = "",
     ) -> bool:
         """Add a bookmark if it does not already exist."""
-        key = (family_code, variant_name, order)
+        key = (family_code, is_enterprise, variant_name, order)
 
-        if any(
-            (p["family_code"], p["variant_name"], p["order"]) == key
-            for p in self.packages
-        ):
-            print("Bookmark already exists.")
+        if key in self.packages:
+            logger.info("Bookmark already exists.")
             return False
 
-        self.packages.append(
-            {
-                "family_name": family_name,  # required field
-                "family_code": family_code,
-                "is_enterprise": is_enterprise,
-                "variant_name": variant_name,
-                "option_name": option_name,
-                "order": order,
-            }
-        )
+        self.packages[key] = {
+            "family_name": family_name,  # required field
+            "family_code": family_code,
+            "is_enterprise": is_enterprise,
+            "variant_name": variant_name,
+            "option_name": option_name,
+            "order": order,
+            "option_code": option_code,
+            "variant_code": variant_code,
+            "migration_type": migration_type,
+            "group": group,
+        }
         self.save_bookmark()
-        print("Bookmark added.")
+        logger.info("Bookmark added.")
         return True
 
     def remove_bookmark(
@@ -92,22 +139,102 @@ class Bookmark:
         order: int,
     ) -> bool:
         """Remove a bookmark if it exists. Returns True if removed."""
-        for i, p in enumerate(self.packages):
-            if (
-                p["family_code"] == family_code
-                and p["is_enterprise"] == is_enterprise
-                and p["variant_name"] == variant_name
-                and p["order"] == order
-            ):
-                del self.packages[i]
-                self.save_bookmark()
-                print("Bookmark removed.")
-                return True
-        print("Bookmark not found.")
-        return False
-
-    def get_bookmarks(self) -> List[Dict]:
-        """Return all bookmarks."""
-        return self.packages.copy()
+        if self.packages.pop((family_code, is_enterprise, variant_name, order), None) is None:
+            logger.info("Bookmark not found.")
+            return False
+        self.save_bookmark()
+        logger.info("Bookmark removed.")
+        return True
+
+    def get_bookmark(
+        self,
+        family_code: str,
+        is_enterprise: bool,
+        variant_name: str,
+        order: int,
+    ) -> Dict | None:
+        return self.packages.get((family_code, is_enterprise, variant_name, order))
+
+    def update_resolution(
+        self,
+        family_code: str,
+        is_enterprise: bool,
+        variant_name: str,
+        order: int,
+        option_code: str,
+        variant_code: str,
+    ) -> bool:
+        """Store freshly resolved codes for a bookmark. Returns True if it was found."""
+        p = self.get_bookmark(family_code, is_enterprise, variant_name, order)
+        if p is None:
+            return False
+        if (p["option_code"], p["variant_code"]) != (option_code, variant_code):
+            p["option_code"] = option_code
+            p["variant_code"] = variant_code
+            self.save_bookmark()
+        return True
+
+    def set_group(self, keys: List[BookmarkKey], group: str) -> int:
+        """Move bookmarks to a group ("" for none). Returns how many changed."""
+        changed = 0
+        for key in keys:
+            p = self.packages.get(key)
+            if p is not None and p["group"] != group:
+                p["group"] = group
+                changed += 1
+        if changed:
+            self.save_bookmark()
+        return changed
+
+    def get_groups(self) -> List[str]:
+        """Named groups in order of first appearance."""
+        return list(dict.fromkeys(p["group"] for p in self.packages.values() if p["group"]))
+
+    def get_bookmarks(self, group: str | None = None) -> Tuple[Dict, ...]:
+        """
+        Return bookmarks in insertion order, optionally only one group.
+        The full view is cached until the next change; treat it as read-only.
+        """
+        if self._view is None:
+            self._view = tuple(self.packages.values())
+        if group is None:
+            return self._view
+        return tuple(p for p in self._view if p["group"] == group)
+
+    def import_bookmarks(self, filepath: str, group: str | None = None) -> Tuple[int, int]:
+        """
+        Merge bookmarks from a JSON file exported by export_bookmarks (or a
+        bookmark.json). Existing keys are kept. Returns (added, skipped).
+        """
+        with open(filepath, "r", encoding="utf-8") as f:
+            entries = json.load(f)
+        if not isinstance(entries, list):
+            raise ValueError("Bookmark file must contain a JSON list")
+
+        added = skipped = 0
+        for p in entries:
+            if not isinstance(p, dict) or not {"family_code", "is_enterprise", "variant_name"} <= p.keys():
+                skipped += 1
+                continue
+            p = dict(p)
+            self._ensure_fields(p)
+            if group is not None:
+                p["group"] = group
+            key = self.key_of(p)
+            if key in self.packages:
+                skipped += 1
+                continue
+            self.packages[key] = p
+            added += 1
+
+        if added:
+            self.save_bookmark()
+        return added, skipped
+
+    def export_bookmarks(self, filepath: str, group: str | None = None) -> int:
+        """Write bookmarks (optionally one group) to a JSON file. Returns the count."""
+        entries = list(self.get_bookmarks(group))
+        self._save(entries, filepath)
+        return len(entries)
 
 BookmarkInstance = Bookmark()
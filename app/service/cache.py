@@ -0,0 +1,55 @@
+import threading
+import time
+from typing import Any, Callable, Hashable
+
+
+class ResponseCache:
+    """In-memory TTL cache for decoded API responses, shared across threads."""
+    _instance = None
+    _initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not self._initialized:
+            self._entries: dict[Hashable, tuple[float, Any]] = {}
+            self._lock = threading.Lock()
+            self._initialized = True
+
+    def get(self, key: Hashable, max_age: float) -> Any | None:
+        """Return the cached value if it is younger than max_age seconds."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value = entry
+        if time.monotonic() - stored_at > max_age:
+            return None
+        return value
+
+    def put(self, key: Hashable, value: Any):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+
+    def get_or_fetch(self, key: Hashable, max_age: float, fetch: Callable[[], Any]) -> Any:
+        """Return a fresh cached value or call fetch() and cache a non-None result."""
+        value = self.get(key, max_age)
+        if value is not None:
+            return value
+        value = fetch()
+        if value is not None:
+            self.put(key, value)
+        return value
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+CacheInstance = ResponseCache()
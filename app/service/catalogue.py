@@ -0,0 +1,320 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.client.models import CategoryFamily
+
+
+class Catalogue:
+    """
+    Local catalogue of package families and options seen while browsing.
+    Filled as a side effect of get_family/get_package and the hot lists,
+    searchable offline by name (FTS5 when available), price and data size.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not self._initialized:
+            self.filepath = "catalogue.db"
+            self._lock = threading.Lock()
+            self._conn = sqlite3.connect(self.filepath, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self.has_fts = self._ensure_schema()
+            self._initialized = True
+
+    def _ensure_schema(self) -> bool:
+        with self._lock, self._conn:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS families (
+                    family_code TEXT PRIMARY KEY,
+                    name TEXT NOT NULL DEFAULT '',
+                    family_type TEXT NOT NULL DEFAULT '',
+                    is_enterprise INTEGER,
+                    last_seen INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS options (
+                    option_code TEXT PRIMARY KEY,
+                    family_code TEXT NOT NULL,
+                    variant_code TEXT NOT NULL DEFAULT '',
+                    variant_name TEXT NOT NULL DEFAULT '',
+                    option_name TEXT NOT NULL DEFAULT '',
+                    option_order INTEGER,
+                    price INTEGER,
+                    validity TEXT NOT NULL DEFAULT '',
+                    data_bytes INTEGER,
+                    benefits TEXT,
+                    last_seen INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_options_family ON options (family_code);
+                CREATE INDEX IF NOT EXISTS idx_options_price ON options (price);
+                CREATE INDEX IF NOT EXISTS idx_options_data ON options (data_bytes);
+                CREATE TABLE IF NOT EXISTS categories (
+                    category_code TEXT PRIMARY KEY,
+                    fetched_at INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS category_families (
+                    category_code TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    family_code TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (category_code, position)
+                );
+                """
+            )
+            try:
+                self._conn.execute(
+                    """
+                    CREATE VIRTUAL TABLE IF NOT EXISTS options_fts USING fts5(
+                        option_code UNINDEXED, family_name, variant_name, option_name, benefit_names
+                    )
+                    """
+                )
+                return True
+            except sqlite3.OperationalError:
+                # SQLite built without FTS5, fall back to LIKE matching
+                return False
+
+    def _upsert_family(self, family_code: str, name: str, family_type: str, is_enterprise, now: int):
+        old_name = self._family_name(family_code)
+        self._conn.execute(
+            """
+            INSERT INTO families (family_code, name, family_type, is_enterprise, last_seen)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(family_code) DO UPDATE SET
+                name = CASE WHEN excluded.name != '' THEN excluded.name ELSE families.name END,
+                family_type = CASE WHEN excluded.family_type != '' THEN excluded.family_type ELSE families.family_type END,
+                is_enterprise = COALESCE(excluded.is_enterprise, families.is_enterprise),
+                last_seen = excluded.last_seen
+            """,
+            (family_code, name or "", family_type or "", is_enterprise, now),
+        )
+        if self.has_fts and name and name != old_name:
+            # Options indexed under the old name must be found by the new one
+            self._conn.execute(
+                """
+                UPDATE options_fts SET family_name = ?
+                WHERE option_code IN (SELECT option_code FROM options WHERE family_code = ?)
+                """,
+                (name, family_code),
+            )
+
+    def _upsert_option(self, family_code: str, family_name: str, variant_code: str, variant_name: str, option: dict, now: int):
+        option_code = option.get("package_option_code")
+        if not option_code:
+            return
+        benefits = option.get("benefits")
+        data_bytes = None
+        benefits_json = None
+        if isinstance(benefits, list):
+            data_bytes = sum(
+                int(b.get("total") or 0) for b in benefits if b.get("data_type") == "DATA"
+            )
+            benefits_json = json.dumps([
+                {
+                    "name": b.get("name", ""),
+                    "data_type": b.get("data_type", ""),
+                    "total": b.get("total", 0),
+                    "is_unlimited": b.get("is_unlimited", False),
+                }
+                for b in benefits
+            ])
+
+        self._conn.execute(
+            """
+            INSERT INTO options (
+                option_code, family_code, variant_code, variant_name, option_name,
+                option_order, price, validity, data_bytes, benefits, last_seen
+            )
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(option_code) DO UPDATE SET
+                family_code = excluded.family_code,
+                variant_code = CASE WHEN excluded.variant_code != '' THEN excluded.variant_code ELSE options.variant_code END,
+                variant_name = CASE WHEN excluded.variant_name != '' THEN excluded.variant_name ELSE options.variant_name END,
+                option_name = excluded.option_name,
+                option_order = COALESCE(excluded.option_order, options.option_order),
+                price = COALESCE(excluded.price, options.price),
+                validity = CASE WHEN excluded.validity != '' THEN excluded.validity ELSE options.validity END,
+                data_bytes = COALESCE(excluded.data_bytes, options.data_bytes),
+                benefits = COALESCE(excluded.benefits, options.benefits),
+                last_seen = excluded.last_seen
+            """,
+            (
+                option_code,
+                family_code,
+                variant_code or "",
+                variant_name or "",
+                option.get("name", ""),
+                option.get("order"),
+                option.get("price"),
+                option.get("validity") or "",
+                data_bytes,
+                benefits_json,
+                now,
+            ),
+        )
+
+        if self.has_fts:
+            row = self._conn.execute(
+                "SELECT variant_name, option_name, benefits FROM options WHERE option_code = ?",
+                (option_code,),
+            ).fetchone()
+            benefit_names = " ".join(b["name"] for b in json.loads(row["benefits"] or "[]"))
+            self._conn.execute("DELETE FROM options_fts WHERE option_code = ?", (option_code,))
+            self._conn.execute(
+                "INSERT INTO options_fts VALUES (?, ?, ?, ?, ?)",
+                (option_code, family_name or "", row["variant_name"], row["option_name"], benefit_names),
+            )
+
+    def record_family(self, family_code: str, family_data: dict, is_enterprise: Optional[bool] = None):
+        """Store the family, its variants and options from an options/list response."""
+        family = family_data.get("package_family", {})
+        if not family_code:
+            return
+        now = int(time.time())
+        with self._lock, self._conn:
+            self._upsert_family(family_code, family.get("name", ""), family.get("package_family_type", ""), is_enterprise, now)
+            family_name = self._family_name(family_code)
+            for variant in family_data.get("package_variants", []):
+                for option in variant.get("package_options", []):
+                    self._upsert_option(
+                        family_code,
+                        family_name,
+                        variant.get("package_variant_code", ""),
+                        variant.get("name", ""),
+                        option,
+                        now,
+                    )
+
+    def record_package(self, package: dict):
+        """Store one option (with benefits and validity) from an options/detail response."""
+        family = package.get("package_family", {})
+        family_code = family.get("package_family_code")
+        option = package.get("package_option", {})
+        if not family_code or not option.get("package_option_code"):
+            return
+        variant = package.get("package_detail_variant") or {}
+        now = int(time.time())
+        with self._lock, self._conn:
+            self._upsert_family(family_code, family.get("name", ""), family.get("package_family_type", ""), None, now)
+            self._upsert_option(
+                family_code,
+                self._family_name(family_code),
+                variant.get("package_variant_code", ""),
+                variant.get("name", ""),
+                option,
+                now,
+            )
+
+    def record_family_name(self, family_code: str, family_name: str, is_enterprise: Optional[bool] = None):
+        """Remember a family seen in a list (hot menu, bookmarks) before it is opened."""
+        if not family_code:
+            return
+        with self._lock, self._conn:
+            self._upsert_family(family_code, family_name, "", is_enterprise, int(time.time()))
+
+    def record_category(self, category_code: str, families: List[CategoryFamily]):
+        """Replace the stored family list of a store category (families response)."""
+        now = int(time.time())
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM category_families WHERE category_code = ?", (category_code,))
+            self._conn.executemany(
+                "INSERT INTO category_families VALUES (?, ?, ?, ?)",
+                [(category_code, i, f.code, json.dumps(f.raw)) for i, f in enumerate(families)],
+            )
+            self._conn.execute("INSERT OR REPLACE INTO categories VALUES (?, ?)", (category_code, now))
+            for f in families:
+                self._upsert_family(f.code, f.name, "", None, now)
+
+    def load_category(self, category_code: str) -> Optional[Tuple[List[CategoryFamily], int]]:
+        """(families, fetched_at) of a category stored by record_category, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT fetched_at FROM categories WHERE category_code = ?", (category_code,)
+            ).fetchone()
+            if row is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT data FROM category_families WHERE category_code = ? ORDER BY position",
+                (category_code,),
+            ).fetchall()
+        return [CategoryFamily.from_dict(json.loads(r["data"])) for r in rows], row["fetched_at"]
+
+    def categories(self) -> List[Dict]:
+        """Categories browsed so far with their family count."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT c.category_code, c.fetched_at, COUNT(cf.family_code) AS family_count
+                FROM categories c
+                LEFT JOIN category_families cf ON cf.category_code = c.category_code
+                GROUP BY c.category_code
+                ORDER BY c.category_code
+                """
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def _family_name(self, family_code: str) -> str:
+        row = self._conn.execute("SELECT name FROM families WHERE family_code = ?", (family_code,)).fetchone()
+        return row["name"] if row else ""
+
+    def _fts_query(self, text: str) -> str:
+        words = re.findall(r"\w+", text)
+        return " ".join(f'"{w}"*' for w in words)
+
+    def search(
+        self,
+        text: str = "",
+        min_price: Optional[int] = None,
+        max_price: Optional[int] = None,
+        min_data_bytes: Optional[int] = None,
+        limit: int = 50,
+    ) -> List[Dict]:
+        """Search stored options; all criteria are optional and combined with AND."""
+        sql = """
+            SELECT o.*, f.name AS family_name, f.is_enterprise
+            FROM options o JOIN families f ON f.family_code = o.family_code
+            WHERE 1 = 1
+        """
+        params: list = []
+        text = (text or "").strip()
+        if text:
+            if self.has_fts and self._fts_query(text):
+                sql += " AND o.option_code IN (SELECT option_code FROM options_fts WHERE options_fts MATCH ?)"
+                params.append(self._fts_query(text))
+            else:
+                like = f"%{text}%"
+                sql += " AND (f.name LIKE ? OR o.variant_name LIKE ? OR o.option_name LIKE ? OR o.benefits LIKE ?)"
+                params += [like, like, like, like]
+        if min_price is not None:
+            sql += " AND o.price >= ?"
+            params.append(min_price)
+        if max_price is not None:
+            sql += " AND o.price <= ?"
+            params.append(max_price)
+        if min_data_bytes is not None:
+            sql += " AND o.data_bytes >= ?"
+            params.append(min_data_bytes)
+        sql += " ORDER BY o.price IS NULL, o.price, o.last_seen DESC LIMIT ?"
+        params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(r) for r in rows]
+
+    def count(self) -> tuple[int, int]:
+        with self._lock:
+            families = self._conn.execute("SELECT COUNT(*) FROM families").fetchone()[0]
+            options = self._conn.execute("SELECT COUNT(*) FROM options").fetchone()[0]
+        return families, options
+
+CatalogueInstance = Catalogue()
@@ -0,0 +1,101 @@
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.client.engsel import get_families
+from app.client.models import CategoryFamily
+from app.log import get_logger, quiet
+from app.service.catalogue import CatalogueInstance
+
+# Seconds a category's family list is served without revalidation
+CATEGORY_TTL = float(os.getenv("CATEGORY_TTL", "3600"))
+
+logger = get_logger(__name__)
+
+
+class CategoryIndex:
+    """
+    Store category code -> its families. A category is fetched in the
+    foreground only the first time it is opened; afterwards it is served
+    from memory or the local catalogue, and once older than CATEGORY_TTL
+    it is still served while a background fetch refreshes it.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not self._initialized:
+            self._entries: Dict[str, Tuple[float, List[CategoryFamily]]] = {}
+            self._refreshing: set = set()
+            self._lock = threading.Lock()
+            self._initialized = True
+
+    def get(self, api_key: str, tokens: dict, category_code: str) -> Tuple[Optional[List[CategoryFamily]], Optional[float]]:
+        """
+        Return (families, fetched_at) of a category, fetching it when it
+        was never seen. families is None when the API rejects the category.
+        """
+        entry = self._entry(category_code)
+        if entry is None:
+            return self.refresh(api_key, tokens, category_code)
+        fetched_at, families = entry
+        if time.time() - fetched_at > CATEGORY_TTL:
+            self._revalidate(api_key, tokens, category_code)
+        return families, fetched_at
+
+    def refresh(self, api_key: str, tokens: dict, category_code: str) -> Tuple[Optional[List[CategoryFamily]], Optional[float]]:
+        """Fetch a category now, replacing the stored list."""
+        families = get_families(api_key, tokens, category_code)
+        if families is None:
+            return None, None
+        fetched_at = time.time()
+        with self._lock:
+            self._entries[category_code] = (fetched_at, families)
+        return families, fetched_at
+
+    def categories(self) -> List[Dict]:
+        """Categories opened before, see Catalogue.categories."""
+        return CatalogueInstance.categories()
+
+    def _entry(self, category_code: str) -> Optional[Tuple[float, List[CategoryFamily]]]:
+        with self._lock:
+            entry = self._entries.get(category_code)
+        if entry is not None:
+            return entry
+        stored = CatalogueInstance.load_category(category_code)
+        if stored is None:
+            return None
+        families, fetched_at = stored
+        with self._lock:
+            # A refresh may have finished while the catalogue was read
+            return self._entries.setdefault(category_code, (fetched_at, families))
+
+    def _revalidate(self, api_key: str, tokens: dict, category_code: str):
+        with self._lock:
+            if category_code in self._refreshing:
+                return
+            self._refreshing.add(category_code)
+        threading.Thread(
+            target=self._refresh_worker,
+            args=(api_key, tokens, category_code),
+            daemon=True,
+        ).start()
+
+    @quiet()
+    def _refresh_worker(self, api_key: str, tokens: dict, category_code: str):
+        try:
+            self.refresh(api_key, tokens, category_code)
+        except Exception as e:
+            # The stored list stays in use; the next get() tries again
+            logger.debug("Category %s revalidation failed: %s", category_code, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(category_code)
+
+CategoryIndexInstance = CategoryIndex()
@@ -0,0 +1,203 @@
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+from app.exit_codes import EXIT_OK, EXIT_ERROR, EXIT_USAGE
+from app.log import get_logger
+
+SOCKET_PATH = os.getenv("DAEMON_SOCKET", "engsel.sock")
+KEEP_WARM_INTERVAL = 60  # seconds between token freshness checks
+CONNECT_TIMEOUT = 0.5
+
+logger = get_logger(__name__)
+
+# Seconds a command result stays valid in the daemon's response cache
+CACHE_TTL = {
+    "balance": 30,
+    "quota": 30,
+    "my-packages": 60,
+    "family": 600,
+    "history": 60,
+}
+
+# Options that only affect the client side, not the result
+_CLIENT_OPTIONS = {"pretty", "fresh", "no_daemon"}
+
+_lock = threading.Lock()
+
+
+def _cache_key(args) -> tuple:
+    return tuple(sorted(
+        (k, v) for k, v in vars(args).items() if k not in _CLIENT_OPTIONS
+    ))
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _send(self, message: dict):
+        self.wfile.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def handle(self):
+        from app.cli import build_parser, run
+        from app.service.cache import CacheInstance
+
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError:
+            self._send({"exit": EXIT_USAGE})
+            return
+
+        if request.get("stop"):
+            self._send({"exit": EXIT_OK})
+            threading.Thread(target=self.server.shutdown, daemon=True).start()
+            return
+
+        try:
+            args = build_parser().parse_args(request.get("argv", []))
+        except SystemExit:
+            self._send({"exit": EXIT_USAGE})
+            return
+
+        key = ("cli",) + _cache_key(args)
+        ttl = CACHE_TTL.get(args.command, 0)
+        if ttl and not args.fresh:
+            cached = CacheInstance.get(key, ttl)
+            if cached is not None:
+                for payload in cached:
+                    self._send({"out": payload})
+                self._send({"exit": EXIT_OK})
+                return
+
+        emitted = []
+
+        def emit(payload):
+            emitted.append(payload)
+            self._send({"out": payload})
+
+        with _lock:
+            code = run(args, emit)
+        if code == EXIT_OK and ttl:
+            CacheInstance.put(key, emitted)
+        self._send({"exit": code})
+
+
+def _keep_warm(stop: threading.Event):
+    """Renew tokens in the background so requests never wait for CIAM."""
+    from app.service.auth import AuthInstance
+    from app.util import UserRequired
+
+    while not stop.wait(KEEP_WARM_INTERVAL):
+        with _lock:
+            try:
+                AuthInstance.get_active_user()
+            except UserRequired as e:
+                logger.warning("[daemon] token refresh failed: %s", e.message)
+            except Exception as e:
+                logger.warning("[daemon] token refresh failed: %s", e)
+
+
+def _connect(path: str) -> socket.socket | None:
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(path):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(path)
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(None)
+    return sock
+
+
+def forward(argv: list[str], emit, path: str = SOCKET_PATH) -> int | None:
+    """
+    Run a CLI command inside the daemon. Returns its exit code, or None if
+    no daemon is listening (the caller then runs the command locally).
+    """
+    sock = _connect(path)
+    if sock is None:
+        return None
+    with sock, sock.makefile("rwb") as f:
+        f.write((json.dumps({"argv": argv}) + "\n").encode("utf-8"))
+        f.flush()
+        for line in f:
+            message = json.loads(line)
+            if "out" in message:
+                emit(message["out"])
+            elif "exit" in message:
+                return message["exit"]
+    return EXIT_ERROR
+
+
+def stop(path: str = SOCKET_PATH) -> int:
+    sock = _connect(path)
+    if sock is None:
+        print("Daemon is not running.", file=sys.stderr)
+        return EXIT_ERROR
+    with sock:
+        sock.sendall(b'{"stop": true}\n')
+        sock.recv(64)
+    print("Daemon stopped.", file=sys.stderr)
+    return EXIT_OK
+
+
+def serve(path: str = SOCKET_PATH) -> int:
+    if not hasattr(socketserver, "ThreadingUnixStreamServer"):
+        print("Unix sockets are not supported on this platform.", file=sys.stderr)
+        return EXIT_ERROR
+
+    sock = _connect(path)
+    if sock is not None:
+        sock.close()
+        print(f"Daemon already running on {path}.", file=sys.stderr)
+        return EXIT_ERROR
+    if os.path.exists(path):
+        os.remove(path)  # stale socket from a crashed daemon
+
+    # Nobody answers prompts here: auth paths that need a human raise
+    # UserRequired, which commands report as errors instead of blocking _lock
+    from app.util import UserRequired, set_supervised
+    set_supervised()
+
+    # Warm up once: connections, API key verification, token refresh, fingerprint
+    from app.client.engsel import prewarm_connections
+    prewarm_connections()
+    try:
+        from app.service.auth import AuthInstance
+        AuthInstance.get_active_user()
+    except UserRequired as e:
+        print(f"Daemon not started: {e.message}", file=sys.stderr)
+        return e.code
+
+    # The socket hands out account data, keep it private to this user
+    old_umask = os.umask(0o177)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(path, _Handler)
+    finally:
+        os.umask(old_umask)
+    server.daemon_threads = True
+
+    stop_event = threading.Event()
+    threading.Thread(target=_keep_warm, args=(stop_event,), daemon=True).start()
+
+    print(f"Daemon listening on {path} (pid {os.getpid()}).", file=sys.stderr)
+    started = time.time()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
+        print(f"Daemon exited after {int(time.time() - started)}s.", file=sys.stderr)
+    return EXIT_OK
@@ -0,0 +1,183 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+from app.client import transport
+from app.client.engsel2 import get_transaction_history
+from app.log import quiet
+
+
+class TransactionLedger:
+    """
+    Local SQLite copy of the transaction history, one ledger per account.
+    Rows are keyed by (number, timestamp, code); each sync upserts every row
+    the server returns (so status changes, e.g. a QRIS payment that was
+    pending, are picked up) and keeps history the server no longer returns.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not self._initialized:
+            self.filepath = "ledger.db"
+            self._lock = threading.Lock()
+            self._sync_threads: Dict[int, threading.Thread] = {}
+            self.last_error: Optional[str] = None
+            # Set when the last sync failed because the network was down
+            self.offline = False
+            self._synced_at: Dict[int, float] = {}
+            # number -> (api_key, tokens) of syncs to retry once back online
+            self._offline_syncs: Dict[int, tuple] = {}
+            transport.add_recovery_listener(self._on_recovery)
+            self._conn = sqlite3.connect(self.filepath, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._ensure_schema()
+            self._initialized = True
+
+    def _ensure_schema(self):
+        with self._lock, self._conn:
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS transactions (
+                    number INTEGER NOT NULL,
+                    timestamp INTEGER NOT NULL,
+                    code TEXT NOT NULL,
+                    title TEXT NOT NULL DEFAULT '',
+                    price TEXT NOT NULL DEFAULT '',
+                    raw_price INTEGER NOT NULL DEFAULT 0,
+                    payment_method TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+                    payment_method_label TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+                    status TEXT NOT NULL DEFAULT '' COLLATE NOCASE,
+                    payment_status TEXT NOT NULL DEFAULT '',
+                    raw TEXT NOT NULL,
+                    synced_at INTEGER NOT NULL,
+                    PRIMARY KEY (number, timestamp, code)
+                );
+                CREATE INDEX IF NOT EXISTS idx_trx_status ON transactions (number, status, timestamp);
+                CREATE INDEX IF NOT EXISTS idx_trx_method ON transactions (number, payment_method, timestamp);
+                """
+            )
+
+    def store(self, number: int, transactions: List[Dict]) -> int:
+        """Upsert the given rows. Returns rows written."""
+        now = int(time.time())
+        rows = [
+            (
+                number,
+                int(t.get("timestamp", 0)),
+                t.get("code", ""),
+                t.get("title", ""),
+                t.get("price", ""),
+                int(t.get("raw_price") or 0),
+                t.get("payment_method", ""),
+                t.get("payment_method_label", ""),
+                t.get("status", ""),
+                t.get("payment_status", ""),
+                json.dumps(t),
+                now,
+            )
+            for t in transactions
+        ]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        return len(rows)
+
+    def sync(self, api_key: str, tokens: dict, number: int) -> int:
+        with quiet():
+            data = get_transaction_history(api_key, tokens)
+        if data is None:
+            raise ValueError("transaction history unavailable")
+        return self.store(number, data.get("list", []))
+
+    def last_synced_at(self, number: int) -> float:
+        """When the account's ledger was last synced (0 if never)."""
+        if number in self._synced_at:
+            return self._synced_at[number]
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(synced_at) FROM transactions WHERE number = ?", (number,)
+            ).fetchone()
+        return row[0] or 0
+
+    def _sync_worker(self, api_key: str, tokens: dict, number: int):
+        try:
+            self.sync(api_key, tokens, number)
+            self._synced_at[number] = time.time()
+            self.last_error = None
+            self.offline = False
+        except Exception as e:
+            self.last_error = str(e)
+            self.offline = transport.is_network_error(e)
+            if self.offline:
+                self._offline_syncs[number] = (api_key, tokens)
+
+    def _on_recovery(self, host: str):
+        pending, self._offline_syncs = self._offline_syncs, {}
+        for number, (api_key, tokens) in pending.items():
+            self.start_sync(api_key, tokens, number)
+
+    def start_sync(self, api_key: str, tokens: dict, number: int) -> threading.Thread:
+        """Sync in the background; reuses a sync already running for the account."""
+        thread = self._sync_threads.get(number)
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(
+                target=self._sync_worker, args=(api_key, tokens, number), daemon=True
+            )
+            self._sync_threads[number] = thread
+            thread.start()
+        return thread
+
+    def is_syncing(self, number: int) -> bool:
+        thread = self._sync_threads.get(number)
+        return thread is not None and thread.is_alive()
+
+    def query(
+        self,
+        number: int,
+        status: Optional[str] = None,
+        method: Optional[str] = None,
+        since: Optional[int] = None,
+        until: Optional[int] = None,
+        title: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[Dict]:
+        """Return stored transactions (newest first) in the server's dict format."""
+        sql = "SELECT raw FROM transactions WHERE number = ?"
+        params: list = [number]
+        if status:
+            sql += " AND status = ?"
+            params.append(status)
+        if method:
+            sql += " AND (payment_method = ? OR payment_method_label = ?)"
+            params += [method, method]
+        if since is not None:
+            sql += " AND timestamp >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND timestamp < ?"
+            params.append(until)
+        if title:
+            sql += " AND title LIKE ?"
+            params.append(f"%{title}%")
+        sql += " ORDER BY timestamp DESC"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [json.loads(r["raw"]) for r in rows]
+
+LedgerInstance = TransactionLedger()
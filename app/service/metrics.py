@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+from app.log import get_logger
+
+# Set one (or both) to export; without them values are only kept in memory.
+METRICS_FILE = os.getenv("METRICS_FILE")
+METRICS_PORT = os.getenv("METRICS_PORT")
+METRICS_INTERVAL = float(os.getenv("METRICS_INTERVAL", "5"))
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+CYCLE_BUCKETS = (0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+logger = get_logger(__name__)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    "engsel_http_requests_total": ("counter", "HTTP requests by host, endpoint and status.", None),
+    "engsel_http_request_duration_seconds": ("histogram", "HTTP request latency by endpoint.", LATENCY_BUCKETS),
+    "engsel_http_errors_total": ("counter", "HTTP requests that failed without a response.", None),
+    "engsel_throttle_wait_seconds_total": ("counter", "Time requests waited in the per-host rate limiter.", None),
+    "engsel_token_refresh_total": ("counter", "Token refreshes by result.", None),
+    "engsel_connectivity_wait_seconds_total": ("counter", "Time spent waiting for the connection to come back.", None),
+    "engsel_poll_cycle_seconds": ("histogram", "Duration of one poll cycle of the bot or sentry loop.", CYCLE_BUCKETS),
+    "engsel_quota_remaining_bytes": ("gauge", "Last sampled remaining main quota.", None),
+    "engsel_errors_total": ("counter", "Errors seen by the long-running loops.", None),
+}
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in (labels or {}).items()))
+
+
+def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    items = labels + extra
+    if not items:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n"))
+        for k, v in items
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+class Metrics:
+    """
+    Counters, gauges and histograms for the long-running modes, rendered in
+    the Prometheus text format to METRICS_FILE and/or served on
+    127.0.0.1:METRICS_PORT/metrics.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not self._initialized:
+            self._lock = threading.Lock()
+            self._values: Dict[str, Dict[Labels, float]] = {}
+            # histogram: labels -> [bucket counts..., sum, count]
+            self._histograms: Dict[str, Dict[Labels, list]] = {}
+            self._started = False
+            self._server: Optional[ThreadingHTTPServer] = None
+            self._initialized = True
+
+    @property
+    def enabled(self) -> bool:
+        return bool(METRICS_FILE or METRICS_PORT)
+
+    def inc(self, name: str, labels: Optional[Dict[str, str]] = None, value: float = 1):
+        key = _labels(labels)
+        with self._lock:
+            series = self._values.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        with self._lock:
+            self._values.setdefault(name, {})[_labels(labels)] = value
+
+    def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None):
+        buckets = METRICS[name][2]
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            h = series.get(key)
+            if h is None:
+                h = series[key] = [0] * len(buckets) + [0.0, 0]
+            for i, bound in enumerate(buckets):
+                if value <= bound:
+                    h[i] += 1
+            h[-2] += value
+            h[-1] += 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            for name, (kind, help_text, buckets) in METRICS.items():
+                if kind == "histogram":
+                    series = self._histograms.get(name, {})
+                else:
+                    series = self._values.get(name, {})
+                if not series:
+                    continue
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in series.items():
+                    if kind != "histogram":
+                        lines.append(f"{name}{_format_labels(labels)} {value:g}")
+                        continue
+                    for bound, count in zip(buckets, value):
+                        lines.append(f"{name}_bucket{_format_labels(labels, (('le', f'{bound:g}'),))} {count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {value[-1]}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {value[-2]:g}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {value[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def record_trace(self, trace):
+        """Transport trace listener: one call per HTTP request."""
+        labels = {"host": trace.host, "endpoint": trace.endpoint}
+        if trace.error:
+            self.inc("engsel_http_errors_total", {**labels, "error": trace.error})
+        else:
+            self.inc("engsel_http_requests_total", {**labels, "status": trace.status})
+        self.observe("engsel_http_request_duration_seconds", trace.duration, {"endpoint": trace.endpoint})
+        if trace.throttle_wait > 0:
+            self.inc("engsel_throttle_wait_seconds_total", {"host": trace.host}, trace.throttle_wait)
+
+    def write_file(self, filepath: str):
+        tmp_path = filepath + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp_path, filepath)
+
+    def _file_writer(self):
+        while True:
+            try:
+                self.write_file(METRICS_FILE)
+            except OSError:
+                pass
+            time.sleep(METRICS_INTERVAL)
+
+    def _serve(self, port: int):
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # keep scrape logs off the terminal
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def start(self):
+        """Start exporting if configured. Safe to call from every long-running mode."""
+        if self._started or not self.enabled:
+            return
+        self._started = True
+
+        from app.client import transport
+        transport.add_trace_listener(self.record_trace)
+
+        if METRICS_FILE:
+            threading.Thread(target=self._file_writer, daemon=True).start()
+        if METRICS_PORT:
+            try:
+                self._serve(int(METRICS_PORT))
+            except (OSError, ValueError) as e:
+                logger.warning("[metrics] cannot listen on 127.0.0.1:%s: %s", METRICS_PORT, e)
+
+MetricsInstance = Metrics()
@@ -0,0 +1,94 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Optional
+
+from app.client.engsel import get_family
+from app.log import quiet
+
+PREFETCH_ENABLED = os.getenv("PREFETCH_FAMILIES", "0").lower() in ("1", "true", "yes")
+PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "2"))
+PREFETCH_RATE = float(os.getenv("PREFETCH_RATE", "1"))  # families started per second
+
+
+class FamilyPrefetcher:
+    """
+    Resolves family payloads for menu entries in the background so that
+    picking one is served from the response cache. At most
+    PREFETCH_CONCURRENCY families are resolved at once and at most
+    PREFETCH_RATE are started per second. Use as a context manager around a
+    menu so the work is cancelled when the menu closes.
+    """
+    def __init__(
+        self,
+        concurrency: int = PREFETCH_CONCURRENCY,
+        rate: float = PREFETCH_RATE,
+        enabled: bool = PREFETCH_ENABLED,
+    ):
+        self.concurrency = max(1, concurrency)
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.enabled = enabled
+        self._cancel: Optional[threading.Event] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._seen: set = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cancel()
+        return False
+
+    def prefetch(self, api_key: str, tokens: dict, entries: Iterable[tuple[str, Optional[bool]]]):
+        """Queue (family_code, is_enterprise) pairs not prefetched yet."""
+        if not self.enabled or not tokens:
+            return
+        pending = []
+        for entry in entries:
+            if entry not in self._seen:
+                self._seen.add(entry)
+                pending.append(entry)
+        if not pending:
+            return
+
+        if self._executor is None:
+            self._cancel = threading.Event()
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.concurrency, thread_name_prefix="prefetch"
+            )
+        threading.Thread(
+            target=self._dispatch,
+            args=(api_key, tokens, pending, self._cancel, self._executor),
+            daemon=True,
+        ).start()
+
+    def _dispatch(self, api_key, tokens, entries, cancel: threading.Event, executor: ThreadPoolExecutor):
+        for i, (family_code, is_enterprise) in enumerate(entries):
+            if i and cancel.wait(self.interval):
+                return
+            if cancel.is_set():
+                return
+            try:
+                executor.submit(self._fetch, api_key, tokens, family_code, is_enterprise, cancel)
+            except RuntimeError:
+                return  # executor shut down by cancel()
+
+    def _fetch(self, api_key, tokens, family_code, is_enterprise, cancel: threading.Event):
+        if cancel.is_set():
+            return
+        try:
+            # Result lands in the shared response cache used by get_family
+            with quiet():
+                get_family(api_key, tokens, family_code, is_enterprise)
+        except Exception:
+            pass
+
+    def cancel(self):
+        """Stop dispatching; queued fetches are dropped, running ones finish in the background."""
+        if self._cancel is not None:
+            self._cancel.set()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self._cancel = None
+        self._executor = None
+        self._seen.clear()
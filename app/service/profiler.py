@@ -0,0 +1,114 @@
+import cProfile
+import glob
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from app.log import get_logger
+
+# Directory for per-action profiles; profiling is off when unset.
+PROFILE_DIR = os.getenv("PROFILE_DIR")
+TRACEMALLOC_FRAMES = int(os.getenv("PROFILE_TRACEMALLOC_FRAMES", "1"))
+
+logger = get_logger(__name__)
+
+
+def _slug(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_-]+", "-", name).strip("-") or "action"
+
+
+@contextmanager
+def profile_action(name: str):
+    """
+    Profile one menu action when PROFILE_DIR is set. CPU time (not wall
+    time) is measured so time spent waiting on input() or the network does
+    not drown out local work. Writes <stamp>_<name>.prof (pstats) and
+    <stamp>_<name>.snap (tracemalloc snapshot). Only the calling thread is
+    profiled.
+    """
+    if not PROFILE_DIR:
+        yield
+        return
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = f"{time.strftime('%Y%m%d_%H%M%S')}{int(time.time() * 1000) % 1000:03d}"
+    base = os.path.join(PROFILE_DIR, f"{stamp}_{_slug(name)}")
+
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    profiler = cProfile.Profile(time.process_time)
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        snapshot = tracemalloc.take_snapshot()
+        if started_tracing:
+            tracemalloc.stop()
+        try:
+            profiler.dump_stats(base + ".prof")
+            snapshot.filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            )).dump(base + ".snap")
+        except OSError as e:
+            logger.warning("[profile] cannot write %s: %s", base, e)
+
+
+def run_action(name: str, fn, *args, **kwargs):
+    """Call fn(*args, **kwargs) inside profile_action(name)."""
+    with profile_action(name):
+        return fn(*args, **kwargs)
+
+
+def _files(directory: str, action: Optional[str], ext: str) -> List[str]:
+    pattern = f"*_{_slug(action)}{ext}" if action else f"*{ext}"
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+
+def summarize(directory: Optional[str] = None, action: Optional[str] = None, top: int = 20) -> Dict:
+    """
+    Merge every profile (optionally of one action) in directory and return
+    the top functions by own CPU time and the top allocation sites by size.
+    """
+    directory = directory or PROFILE_DIR or "profiles"
+    prof_files = _files(directory, action, ".prof")
+    snap_files = _files(directory, action, ".snap")
+
+    functions = []
+    if prof_files:
+        stats = pstats.Stats(*prof_files)
+        entries = sorted(stats.stats.items(), key=lambda kv: kv[1][2], reverse=True)[:top]
+        for (filename, line, func), (_, ncalls, tottime, cumtime, _) in entries:
+            functions.append({
+                "function": f"{filename}:{line}({func})",
+                "calls": ncalls,
+                "tottime": round(tottime, 6),
+                "cumtime": round(cumtime, 6),
+            })
+
+    sites: Dict[str, List[int]] = {}
+    for snap_file in snap_files:
+        for stat in tracemalloc.Snapshot.load(snap_file).statistics("lineno"):
+            frame = stat.traceback[0]
+            site = sites.setdefault(f"{frame.filename}:{frame.lineno}", [0, 0])
+            site[0] += stat.size
+            site[1] += stat.count
+    allocations = [
+        {"site": site, "size_kib": round(size / 1024, 1), "blocks": count}
+        for site, (size, count) in sorted(sites.items(), key=lambda kv: kv[1][0], reverse=True)[:top]
+    ]
+
+    return {
+        "directory": directory,
+        "action": action,
+        "profiles": len(prof_files),
+        "snapshots": len(snap_files),
+        "functions": functions,
+        "allocations": allocations,
+    }
@@ -1,11 +1,12 @@
-from app.client.engsel import get_package, send_api_request
-from app.menus.util import clear_screen, pause
+from app.client.engsel import get_package, get_quota_details
+from app.menus.inputmux import InputInstance
+from app.log import quiet
+from app.menus.util import LiveScreen, pause
 import json
+import time
 from datetime import datetime
 from app.service.auth import AuthInstance
-from time import sleep
-import threading
-import sys
+from app.service.metrics import MetricsInstance
 import os
 
 
@@ -18,11 +19,8 @@ def enter_sentry_mode():
         return
     
     tokens = active_user["tokens"]
+    MetricsInstance.start()
 
-    clear_screen()
-    print("Entering Sentry Mode...")
-    print("Press Ctrl+C or type 'q' + Enter to exit.")
-    
     if not os.path.exists("sentry"):
         os.makedirs("sentry")
 
@@ -31,58 +29,60 @@ def enter_sentry_mode():
         f"sentry_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
     )
 
-    stop_flag = {"stop": False}
-
-    # Background listener for "q"
-    def listen_for_quit():
-        while True:
-            user_input = sys.stdin.readline()
-            if not user_input:  # Ignore empty input (prevents instant exit)
-                continue
-            if user_input.strip().lower() == "q":
-                stop_flag["stop"] = True
-                break
-
-    listener_thread = threading.Thread(target=listen_for_quit, daemon=True)
-    listener_thread.start()
+    screen = LiveScreen()
+    header = [
+        "Entering Sentry Mode...",
+        "Press Ctrl+C or type 'q' + Enter to exit.",
+        f"Log file: {file_name}",
+    ]
+    samples = 0
+    last_sample = "-"
+    screen.render(header + [f"Samples: {samples}", f"Last sample: {last_sample}"])
 
-    id_token = tokens.get("id_token")
-    
-    path = "api/v8/packages/quota-details"
-    
-    payload = {
-        "is_enterprise": False,
-        "lang": "en",
-        "family_member_id": ""
-    }
-    
     try:
         with open(file_name, 'a') as f:
-            while not stop_flag["stop"]:
-                sleep(1)
+            while True:
+                # Wait for the next sample while watching stdin for "q"
+                next_sample = InputInstance.deadline_in(1)
+                if InputInstance.wait_for_command(next_sample, ["q"], on_line=lambda _: screen.invalidate()):
+                    break
                 timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                cycle_started = time.monotonic()
 
                 try:
-                    print(f"Fetching data at {timestamp}...", end="\r")
+                    screen.status(f"Fetching data at {timestamp}...")
                     
-                    res = send_api_request(api_key, path, payload, id_token, "POST")
-                    if res.get("status") != "SUCCESS":
+                    with screen.capture(), quiet():
+                        quotas = get_quota_details(api_key, tokens)
+                    if quotas is None:
+                        MetricsInstance.inc("engsel_errors_total", {"mode": "sentry", "kind": "quota_details"})
+                        print()
                         print("Failed to fetch packages")
-                        print("Response:", res)
                         pause()
                         return None
-                    
-                    quotas = res["data"]["quotas"]
 
                     data_point = {
                         "time": timestamp,
-                        "quotas": quotas
+                        "quotas": [q.raw for q in quotas]
                     }
 
                     f.write(json.dumps(data_point) + "\n")
                     f.flush()
+
+                    for q in quotas:
+                        MetricsInstance.set(
+                            "engsel_quota_remaining_bytes",
+                            q.main_benefit.remaining,
+                            {"mode": "sentry", "quota": q.name},
+                        )
+                    MetricsInstance.observe("engsel_poll_cycle_seconds", time.monotonic() - cycle_started, {"mode": "sentry"})
+
+                    samples += 1
+                    last_sample = timestamp
+                    screen.render(header + [f"Samples: {samples}", f"Last sample: {last_sample}"])
                 except Exception as e:
-                    print(f"Error during fetch at {timestamp}: {e}")
+                    MetricsInstance.inc("engsel_errors_total", {"mode": "sentry", "kind": type(e).__name__})
+                    screen.status(f"Error during fetch at {timestamp}: {e}")
                     continue
 
     except KeyboardInterrupt:
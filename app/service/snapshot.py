@@ -0,0 +1,139 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.client import transport
+
+
+def format_age(saved_at: float) -> str:
+    age = max(0, int(time.time() - saved_at))
+    if age < 60:
+        return "baru saja"
+    if age < 3600:
+        return f"{age // 60} menit lalu"
+    if age < 86400:
+        return f"{age // 3600} jam lalu"
+    return f"{age // 86400} hari lalu"
+
+
+class SnapshotStore:
+    """
+    Last successful result of each screen's reads (dashboard, my packages,
+    package details, hot lists), kept in SQLite so the menus can still
+    render while the network is down. Screens that fell back to a snapshot
+    are re-fetched in the background once the host they failed on answers
+    again, and queued again if that refresh fails too.
+    """
+    _instance = None
+    _initialized = False
+
+    def __new__(cls, *args, **kwargs):
+        if not cls._instance:
+            cls._instance = super().__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not self._initialized:
+            self.filepath = "snapshots.db"
+            self._lock = threading.Lock()
+            self._conn = sqlite3.connect(self.filepath, check_same_thread=False)
+            self._ensure_schema()
+            # key -> (host the fetch failed on, refresh function) for
+            # snapshots that were served stale; "" when the host is unknown
+            self._pending: Dict[str, Tuple[str, Callable[[], None]]] = {}
+            transport.add_recovery_listener(self._on_recovery)
+            self._initialized = True
+
+    def _ensure_schema(self):
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS snapshots (
+                    key TEXT PRIMARY KEY,
+                    saved_at INTEGER NOT NULL,
+                    data TEXT NOT NULL
+                )
+                """
+            )
+
+    def save(self, key: str, data: Any):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?)",
+                (key, int(time.time()), json.dumps(data)),
+            )
+
+    def load(self, key: str) -> Optional[Tuple[Any, int]]:
+        """Return (data, saved_at) of the last snapshot for key, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, saved_at FROM snapshots WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def fetch(
+        self,
+        key: str,
+        fetch: Callable[[], Any],
+        encode: Callable[[Any], Any] = lambda value: value,
+        decode: Callable[[Any], Any] = lambda data: data,
+    ) -> Tuple[Any, Optional[int]]:
+        """
+        Call fetch() and snapshot a non-None result under key. When the
+        network is down, return the last snapshot instead and queue a
+        background refresh. Returns (value, saved_at), saved_at being None
+        for fresh data. Network errors are raised when no snapshot exists.
+        """
+        try:
+            value = fetch()
+        except Exception as e:
+            if not transport.is_network_error(e):
+                raise
+            snapshot = self.load(key)
+            if snapshot is None:
+                raise
+            self._queue(key, transport.error_host(e), fetch, encode)
+            data, saved_at = snapshot
+            return decode(data), saved_at
+
+        with self._lock:
+            self._pending.pop(key, None)
+        if value is not None:
+            self.save(key, encode(value))
+        return value, None
+
+    def _queue(self, key: str, host: str, fetch: Callable[[], Any], encode: Callable[[Any], Any]):
+        with self._lock:
+            self._pending[key] = (host, lambda: self._refresh(key, fetch, encode))
+
+    def _refresh(self, key: str, fetch: Callable[[], Any], encode: Callable[[Any], Any]):
+        try:
+            value = fetch()
+        except Exception as e:
+            # Another host may still be down (API back, crypto not), or the
+            # tokens went stale: retry when the failing host next recovers,
+            # unknown failures on the next recovery of any host
+            host = transport.error_host(e) if transport.is_network_error(e) else ""
+            with self._lock:
+                # Unless a foreground fetch queued a newer refresh meanwhile
+                self._pending.setdefault(key, (host, lambda: self._refresh(key, fetch, encode)))
+            return
+        if value is not None:
+            self.save(key, encode(value))
+
+    def _on_recovery(self, host: str):
+        with self._lock:
+            keys = [key for key, (needs, _) in self._pending.items() if needs in (host, "")]
+            pending = [self._pending.pop(key)[1] for key in keys]
+        if pending:
+            threading.Thread(target=self._run_refreshes, args=(pending,), daemon=True).start()
+
+    def _run_refreshes(self, pending):
+        for refresh in pending:
+            refresh()
+
+SnapshotInstance = SnapshotStore()
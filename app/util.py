@@ -2,6 +2,31 @@ import os
 import sys
 import requests
 
+from app.client import transport
+from app.client.encrypt import BASE_CRYPTO_HOST
+from app.exit_codes import EXIT_API_KEY_INVALID
+
+# Set by auto.py (and set_supervised() in the daemon): nobody is at the
+# terminal, so prompts that need a human exit with a status code instead of waiting.
+SUPERVISED = os.getenv("ENGSEL_SUPERVISED") == "1"
+
+class UserRequired(SystemExit):
+    """Exit with code because a human is needed; message says why."""
+    def __init__(self, code: int, message: str):
+        super().__init__(code)
+        self.message = message
+
+def set_supervised(value: bool = True):
+    global SUPERVISED
+    SUPERVISED = value
+
+def require_user(code: int, message: str, prompt: str = "Press Enter to continue..."):
+    """Print message and wait for Enter; when supervised, raise UserRequired instead."""
+    print(message)
+    if SUPERVISED:
+        raise UserRequired(code, message)
+    input(prompt)
+
 # Load API key from text file named api.key
 def load_api_key() -> str:
     if os.path.exists("api.key"):
@@ -31,12 +56,12 @@ def delete_api_key():
 
 def verify_api_key(api_key: str, *, timeout: float = 10.0) -> bool:
     """
-    Returns True iff the verification endpoint responds with HTTP 200.
-    Any network error or non-200 is treated as invalid.
+    Returns True iff the verification endpoint responds with HTTP 200,
+    False for any other status and None when the server cannot be reached.
     """
     try:
-        url = f"https://crypto.mashu.lol/api/verify?key={api_key}"
-        resp = requests.get(url, timeout=timeout)
+        url = f"{BASE_CRYPTO_HOST}/api/verify?key={api_key}"
+        resp = transport.get(url, timeout=timeout)
         if resp.status_code == 200:
             json_resp = resp.json()
             print(f"API key is valid.\nId: {json_resp.get('user_id')}\nOwner: @{json_resp.get('username')}")
@@ -44,9 +69,9 @@ def verify_api_key(api_key: str, *, timeout: float = 10.0) -> bool:
         else:
             print(f"API key is invalid. Server responded with status code {resp.status_code}.")
             return False
-    except requests.RequestException as e:
+    except (requests.RequestException, transport.TransportError) as e:
         print(f"Failed to verify API key: {e}")
-        return False
+        return None if transport.is_network_error(e) else False
 
 def ensure_api_key() -> str:
     """
@@ -57,22 +82,33 @@ def ensure_api_key() -> str:
     # Try to load an existing key
     current = load_api_key()
     if current:
-        if verify_api_key(current):
+        if SUPERVISED and os.getenv("ENGSEL_KEY_VERIFIED") == "1":
+            # auto.py restart after a run that got past verification with this key
             return current
-        else:
-            print("Existing API key is invalid. Please enter a new one.")
+        valid = verify_api_key(current)
+        if valid:
+            return current
+        if valid is None:
+            # Offline: trust the saved key, it was verified when it was saved
+            print("Server verifikasi tidak terjangkau, memakai API key tersimpan.")
+            return current
+        print("Existing API key is invalid. Please enter a new one.")
+
+    if SUPERVISED:
+        print("API key tidak ada atau tidak valid. Menutup aplikasi.")
+        raise UserRequired(EXIT_API_KEY_INVALID, "API key not found or invalid")
 
     # Prompt user if missing or invalid
     print("Dapatkan API key di Bot Telegram @fyxt_bot")
     api_key = input("Masukkan API key: ").strip()
     if not api_key:
         print("API key tidak boleh kosong. Menutup aplikasi.")
-        sys.exit(1)
+        sys.exit(EXIT_API_KEY_INVALID)
 
     if not verify_api_key(api_key):
         print("API key tidak valid. Menutup aplikasi.")
         delete_api_key()
-        sys.exit(1)
+        sys.exit(EXIT_API_KEY_INVALID)
 
     save_api_key(api_key)
     return api_key
@@ -1,35 +1,82 @@
 #!/usr/bin/env python3
+"""
+Supervisor untuk main.py: mengetik input otomatis dan me-restart bila keluar.
+
+- Input dikirim begitu main.py menunggu di prompt (baris terakhir diakhiri
+  ":" dan output diam sebentar), bukan setelah jeda tetap.
+- main.py berjalan dengan ENGSEL_SUPERVISED=1 sehingga kegagalan yang butuh
+  manusia (API key, refresh token) keluar dengan exit code dari
+  app/exit_codes.py, bukan menunggu Enter.
+- Kegagalan yang sama berturut-turut ditunda eksponensial (BACKOFF_BASE,
+  dua kali lipat, maks BACKOFF_MAX); run yang bertahan STABLE_AFTER detik
+  dianggap sehat dan hitungan di-reset.
+- Warm restart: bila main.py kembali ke menu utama, skrip input diulang di
+  proses yang sama (token & koneksi tetap hangat). Saat proses harus
+  di-restart, verifikasi API key dilewati bila run sebelumnya sudah lolos.
+"""
 import argparse
+import codecs
 import os
 import subprocess
 import sys
+import threading
 import time
 from datetime import datetime
-from typing import List
+from typing import List, Optional
+
+from app.exit_codes import (
+    EXIT_API_KEY_INVALID,
+    EXIT_AUTH_EXPIRED,
+    EXIT_NAMES,
+    EXIT_NOT_LOGGED_IN,
+    EXIT_OK,
+)
 
-# ====== POLA DELAY (DETIK) TETAP ======
-FIRST_DELAY = 20   # delay sebelum input pertama
-NEXT_DELAY  = 10   # delay antar input berikutnya
+DEFAULT_INPUTS = ["7", "1", "2", "2"]
 
 PYTHON = sys.executable
 CMD = [PYTHON, "main.py"]
-RESTART_DELAY = 2  # jeda sebelum restart main.py setelah exit/error
+
+# ====== SUPERVISOR (DETIK) ======
+READY_TIMEOUT = float(os.getenv("AUTO_READY_TIMEOUT", "120"))   # maks menunggu prompt berikutnya
+STALL_TIMEOUT = float(os.getenv("AUTO_STALL_TIMEOUT", "300"))   # loop tanpa output selama ini dianggap macet
+PROMPT_IDLE = 0.5       # output diam selama ini di baris prompt = menunggu input
+RESTART_DELAY = 2       # jeda restart setelah run sehat / kegagalan pertama
+BACKOFF_BASE = 5
+BACKOFF_MAX = float(os.getenv("AUTO_BACKOFF_MAX", "900"))
+STABLE_AFTER = float(os.getenv("AUTO_STABLE_AFTER", "600"))
+
+MAIN_MENU_PROMPT = "Pilih menu:"
+
+# Exit yang tidak akan sembuh sendiri; restart tetap dicoba dengan backoff
+# supaya perbaikan manual (api.key, login ulang) langsung terpakai.
+NEEDS_USER = {
+    EXIT_API_KEY_INVALID: "API key tidak valid / tidak ada. Jalankan main.py manual untuk memasukkan key.",
+    EXIT_AUTH_EXPIRED: "Refresh token ditolak. Login ulang akun lewat main.py manual.",
+    EXIT_NOT_LOGGED_IN: "Belum ada akun tersimpan. Login lewat main.py manual.",
+}
 
 
-def parse_inputs() -> List[str]:
+def parse_args(argv=None):
     """
     Ambil daftar input dari:
     1) argumen --inputs (dipisah spasi atau koma), atau
     2) env var AUTO_INPUTS, atau
     3) default ['7','1','2','2'].
     """
-    p = argparse.ArgumentParser(description="Auto-typer untuk main.py (delay tetap).")
+    p = argparse.ArgumentParser(description="Supervisor + auto-typer untuk main.py.")
     p.add_argument(
         "--inputs",
         nargs="*",
         help="Daftar input, mis. --inputs 7 1 2 2  (bisa juga '7,1,2,2')",
     )
-    args, _unknown = p.parse_known_args()
+    p.add_argument(
+        "--max-failures",
+        type=int,
+        default=int(os.getenv("AUTO_MAX_FAILURES", "0")),
+        help="Berhenti setelah N kegagalan sama berturut-turut (0 = tidak pernah)",
+    )
+    args, _unknown = p.parse_known_args(argv)
 
     raw = None
     if args.inputs:
@@ -41,102 +88,226 @@ def parse_inputs() -> List[str]:
             raw = " ".join(args.inputs)
     elif os.getenv("AUTO_INPUTS"):
         raw = os.getenv("AUTO_INPUTS")
-    else:
-        return ["7", "1", "2", "2"]  # default
 
     # Normalisasi: split by koma & spasi, buang kosong
     parts = []
-    for chunk in raw.replace(",", " ").split():
+    for chunk in (raw or "").replace(",", " ").split():
         t = chunk.strip()
         if t:
             parts.append(t)
-    return parts or ["7", "1", "2", "2"]
+    args.inputs = parts or list(DEFAULT_INPUTS)
+    return args
+
 
+def log(message: str):
+    print(f"[{datetime.now():%Y-%m-%d %H:%M:%S}] {message}", flush=True)
 
-def build_steps(inputs: List[str]):
+
+class Child:
     """
-    Bentuk (teks, delay) dengan pola delay tetap:
-    - langkah ke-1: FIRST_DELAY
-    - langkah ke-2 dst: NEXT_DELAY
+    main.py sebagai child process. Output-nya diteruskan ke terminal sambil
+    dipantau: baris terakhir yang belum selesai dipakai untuk mengenali
+    prompt input.
     """
-    steps = []
-    for i, val in enumerate(inputs):
-        delay = FIRST_DELAY if i == 0 else NEXT_DELAY
-        steps.append((val, delay))
-    return steps
-
-
-def run_once(steps) -> int:
-    print(f"[{datetime.now()}] Menjalankan: {' '.join(CMD)}")
-    proc = subprocess.Popen(
-        CMD,
-        stdin=subprocess.PIPE,
-        stdout=None,
-        stderr=None,
-        text=True,
-        bufsize=1,
-    )
+    def __init__(self, key_verified: bool):
+        env = dict(os.environ)
+        env["ENGSEL_SUPERVISED"] = "1"
+        env["PYTHONUNBUFFERED"] = "1"
+        if key_verified:
+            env["ENGSEL_KEY_VERIFIED"] = "1"
+        else:
+            env.pop("ENGSEL_KEY_VERIFIED", None)
 
-    try:
-        for txt, delay in steps:
-            if proc.poll() is not None:
-                print(f"[INFO] main.py berhenti (code={proc.returncode}) sebelum semua input terkirim.")
-                break
-            if delay > 0:
-                time.sleep(delay)
-            line = f"{txt}\n"
-            try:
-                proc.stdin.write(line)
-                proc.stdin.flush()
-                print(f"[SEND] {txt!r}")
-            except BrokenPipeError:
-                print("[WARN] stdin tertutup (BrokenPipe) — kemungkinan main.py sudah exit lebih awal.")
-                break
-            except Exception as e:
-                print(f"[ERROR] Gagal mengirim input: {e}")
+        self.proc = subprocess.Popen(CMD, stdin=subprocess.PIPE, stdout=subprocess.PIPE, env=env)
+        self.ready = False
+        self._cond = threading.Condition()
+        self._line = ""
+        self._last_output = time.monotonic()
+        self._eof = False
+        threading.Thread(target=self._pump, daemon=True).start()
+
+    def _pump(self):
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+        fd = self.proc.stdout.fileno()
+        while True:
+            chunk = os.read(fd, 4096)
+            if not chunk:
                 break
+            sys.stdout.buffer.write(chunk)
+            sys.stdout.flush()
+            text = decoder.decode(chunk)
+            with self._cond:
+                line = self._line + text
+                self._line = line.rsplit("\n", 1)[-1].rsplit("\r", 1)[-1][-200:]
+                self._last_output = time.monotonic()
+                self._cond.notify_all()
+        with self._cond:
+            self._eof = True
+            self._cond.notify_all()
 
+    def _at_prompt(self, main_menu: bool) -> bool:
+        line = self._line.strip()
+        if main_menu:
+            return line.startswith(MAIN_MENU_PROMPT)
+        return line.endswith(":")
+
+    def wait_for_prompt(self, timeout: float, main_menu: bool = False, since_output: bool = False) -> str:
+        """
+        Tunggu sampai main.py diam di prompt input (atau di menu utama bila
+        main_menu). Mengembalikan "prompt", "exit" atau "timeout". Dengan
+        since_output, timeout dihitung dari output terakhir (deteksi macet).
+        """
+        started = time.monotonic()
+        with self._cond:
+            while True:
+                if self._eof:
+                    return "exit"
+                now = time.monotonic()
+                idle = now - self._last_output
+                if self._at_prompt(main_menu) and idle >= PROMPT_IDLE:
+                    return "prompt"
+                ends = (self._last_output if since_output else started) + timeout
+                if now >= ends:
+                    return "timeout"
+                wake = ends - now
+                if self._at_prompt(main_menu):
+                    wake = min(wake, PROMPT_IDLE - idle)
+                self._cond.wait(max(0.05, wake))
+
+    def send(self, text: str) -> bool:
+        with self._cond:
+            self._line = ""
         try:
-            returncode = proc.wait()
-        except KeyboardInterrupt:
-            print("\n[CTRL+C] Diterima. Menghentikan main.py…")
-            try:
-                proc.terminate()
-            except Exception:
-                pass
-            try:
-                returncode = proc.wait(timeout=3)
-            except Exception:
-                returncode = -1
-        return returncode
-    finally:
+            self.proc.stdin.write(f"{text}\n".encode("utf-8"))
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError):
+            return False
+        log(f"[SEND] {text!r}")
+        return True
+
+    def stop(self) -> int:
+        try:
+            self.proc.terminate()
+            return self.proc.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.proc.kill()
+            return self.proc.wait()
+
+    def close(self):
         try:
-            if proc.stdin:
-                proc.stdin.close()
-        except Exception:
+            if self.proc.stdin:
+                self.proc.stdin.close()
+        except OSError:
             pass
 
 
+def run_script(child: Child, inputs: List[str]) -> str:
+    """
+    Kirim skrip input satu per satu saat main.py siap, lalu pantau loop-nya.
+    Mengembalikan hasil run: "exit", "menu" (kembali ke menu utama, proses
+    masih hidup), "not-ready" atau "stalled" (proses sudah dihentikan).
+    """
+    for txt in inputs:
+        state = child.wait_for_prompt(READY_TIMEOUT)
+        if state == "exit":
+            return "exit"
+        if state == "timeout":
+            log(f"[WARN] main.py tidak menampilkan prompt dalam {READY_TIMEOUT:.0f} detik, dihentikan.")
+            child.stop()
+            return "not-ready"
+        child.ready = True
+        if not child.send(txt):
+            return "exit"
+
+    state = child.wait_for_prompt(STALL_TIMEOUT, main_menu=True, since_output=True)
+    if state == "timeout":
+        log(f"[WARN] Tidak ada output selama {STALL_TIMEOUT:.0f} detik, main.py dihentikan.")
+        child.stop()
+        return "stalled"
+    return "menu" if state == "prompt" else "exit"
+
+
+def backoff_delay(streak: int) -> float:
+    if streak <= 1:
+        return RESTART_DELAY
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (streak - 2))
+
+
+def _key_mtime() -> Optional[float]:
+    try:
+        return os.path.getmtime("api.key")
+    except OSError:
+        return None
+
+
+def supervise(inputs: List[str], max_failures: int) -> int:
+    child: Optional[Child] = None
+    key_verified_mtime = None
+    last_outcome = None
+    streak = 0
+
+    try:
+        while True:
+            warm = child is not None and child.proc.poll() is None
+            if warm:
+                log("[AUTO] Warm restart: main.py kembali ke menu utama, skrip diulang.")
+            else:
+                key_verified = key_verified_mtime is not None and key_verified_mtime == _key_mtime()
+                log(f"[AUTO] Menjalankan: {' '.join(CMD)}" + (" (API key sudah terverifikasi)" if key_verified else ""))
+                child = Child(key_verified)
+
+            started = time.monotonic()
+            result = run_script(child, inputs)
+            ran = time.monotonic() - started
+
+            if result in ("exit", "not-ready", "stalled"):
+                rc = child.proc.wait()
+                child.close()
+                if child.ready:
+                    # Got to a prompt, so this api.key passed verification
+                    key_verified_mtime = _key_mtime()
+                elif rc == EXIT_API_KEY_INVALID:
+                    key_verified_mtime = None
+                outcome = f"exit {rc} ({EXIT_NAMES.get(rc, 'signal' if rc < 0 else 'unknown')})" if result == "exit" else result
+                log(f"[AUTO] main.py selesai: {outcome}, berjalan {ran:.0f} detik.")
+                if result == "exit" and rc in NEEDS_USER:
+                    log(f"[AUTO] {NEEDS_USER[rc]}")
+            else:
+                rc = EXIT_OK
+                outcome = result
+                log(f"[AUTO] Loop berakhir setelah {ran:.0f} detik, kembali ke menu utama.")
+
+            # Run yang lama dianggap sehat; kegagalan cepat yang sama beruntun ditunda makin lama
+            if ran >= STABLE_AFTER or outcome != last_outcome:
+                streak = 1
+            else:
+                streak += 1
+            last_outcome = outcome
+
+            if max_failures and streak >= max_failures:
+                log(f"[EXIT] {outcome} terjadi {streak}x berturut-turut, supervisor berhenti.")
+                if child.proc.poll() is None:
+                    child.stop()
+                return rc if rc > 0 else 1
+
+            delay = backoff_delay(streak)
+            log(f"[AUTO] Restart dalam {delay:.0f} detik" + (f" (gagal sama {streak}x)" if streak > 1 else "") + "…\n")
+            time.sleep(delay)
+    except KeyboardInterrupt:
+        print("\n[EXIT] Dihentikan oleh pengguna.")
+        if child is not None and child.proc.poll() is None:
+            child.stop()
+        return EXIT_OK
+
+
 def main():
-    inputs = parse_inputs()
-    steps = build_steps(inputs)
+    args = parse_args()
 
-    print("[AUTO] Mode auto start + auto restart aktif. Tekan Ctrl+C untuk berhenti.")
-    print(f"[AUTO] Inputs  : {inputs}")
-    print(f"[AUTO] Delays  : {FIRST_DELAY}s sebelum pertama, lalu {NEXT_DELAY}s setiap langkah.")
+    print("[AUTO] Mode supervisor aktif. Tekan Ctrl+C untuk berhenti.")
+    print(f"[AUTO] Inputs  : {args.inputs}")
+    print(f"[AUTO] Input dikirim saat main.py siap (maks {READY_TIMEOUT:.0f} detik per prompt).")
 
-    while True:
-        try:
-            rc = run_once(steps)
-            print(f"[{datetime.now()}] main.py exit code: {rc}")
-            print(f"[AUTO] Restart dalam {RESTART_DELAY} detik…\n")
-            time.sleep(RESTART_DELAY)
-        except KeyboardInterrupt:
-            print("\n[EXIT] Dihentikan oleh pengguna.")
-            break
-        except Exception as e:
-            print(f"[FATAL] {e}. Coba restart dalam {RESTART_DELAY} detik…")
-            time.sleep(RESTART_DELAY)
+    sys.exit(supervise(args.inputs, args.max_failures))
 
 
 if __name__ == "__main__":
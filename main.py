@@ -3,9 +3,24 @@ from dotenv import load_dotenv
 load_dotenv() 
 
 import sys
-from app.menus.util import clear_screen, pause
+
+import requests
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+    # Headless mode: run a single command and print JSON, skipping the menus
+    from app.cli import main as cli_main
+    sys.exit(cli_main(sys.argv[1:]))
+
+from app.menus.util import clear_screen, pause, offline_notice
 from app.client.engsel import *
+
+# Connect to every host while the API key is verified and tokens refreshed
+prewarm_connections()
+
 from app.client.engsel2 import get_tiering_info
+from app.client import transport
+from app.client.transport import Cancelled, TransportError
+from app.exit_codes import EXIT_AUTH_EXPIRED, EXIT_NOT_LOGGED_IN
 from app.menus.payment import show_transaction_history
 from app.service.auth import AuthInstance
 from app.menus.bookmark import show_bookmark_menu
@@ -13,12 +28,47 @@ from app.menus.account import show_account_menu
 from app.menus.package import fetch_my_packages, get_packages_by_family
 from app.menus.hot import show_hot_menu, show_hot_menu2
 from app.menus.bot import show_auto_payment_bot
+from app.menus.catalogue import show_catalogue_menu
+from app.menus.family import show_category_menu
+from app.menus.overview import show_account_overview
 from app.service.sentry import enter_sentry_mode
+from app.service.profiler import run_action
+from app.service.snapshot import SnapshotInstance
+from app.util import SUPERVISED
 
-def show_main_menu(profile):
+@transport.action()
+def load_profile(active_user):
+    # Tokens are missing when the app started offline and could not refresh yet
+    tokens = active_user["tokens"]
+    balance = get_balance(AuthInstance.api_key, tokens.get("id_token"))
+    
+    profile_data = get_profile(AuthInstance.api_key, tokens.get("access_token"), tokens.get("id_token"))
+    sub_id = profile_data["profile"]["subscriber_id"]
+    sub_type = profile_data["profile"]["subscription_type"]
+    
+    point_info = "Points: N/A | Tier: N/A"
+    
+    if sub_type == "PREPAID":
+        tiering_data = get_tiering_info(AuthInstance.api_key, tokens)
+        tier = tiering_data.get("tier", 0)
+        current_point = tiering_data.get("current_point", 0)
+        point_info = f"Points: {current_point} | Tier: {tier}"
+    
+    return {
+        "number": active_user["number"],
+        "subscriber_id": sub_id,
+        "subscription_type": sub_type,
+        "balance": balance.remaining,
+        "balance_expired_at": balance.expired_at,
+        "point_info": point_info
+    }
+
+def show_main_menu(profile, saved_at=None):
     clear_screen()
     expired_at_dt = datetime.fromtimestamp(profile["balance_expired_at"]).strftime("%Y-%m-%d %H:%M:%S")
     
+    if saved_at is not None:
+        print(offline_notice(saved_at))
     print("-------------------------------------------------------")
     print("Informasi Akun")
     print(f"Nomor: {profile['number']}")
@@ -35,72 +85,73 @@ def show_main_menu(profile):
     print("5. Beli Paket Berdasarkan Family Code")
     print("6. Riwayat Transaksi")
     print("7. 100Mb Auto renewally")
+    print("8. Cari Paket di Katalog Lokal")
+    print("9. Ringkasan Semua Akun")
+    print("10. Jelajahi Paket per Kategori")
     print("00. Bookmark Paket")
     print("99. Tutup aplikasi")
     print("-------------------------------------------------------")
 
 show_menu = True
 def main():
-    
+    while True:
+        try:
+            main_menu_loop()
+        except Cancelled:
+            # Ctrl+C during a network action cancels it, not the application
+            print("\nDibatalkan.")
+        except (TransportError, requests.RequestException) as e:
+            # A failed call aborts the current screen only, back to the main menu
+            print(f"Request failed: {e}")
+            pause()
+
+def main_menu_loop():
     while True:
         active_user = AuthInstance.get_active_user()
 
         # Logged in
         if active_user is not None:
-            balance = get_balance(AuthInstance.api_key, active_user["tokens"]["id_token"])
-            balance_remaining = balance.get("remaining")
-            balance_expired_at = balance.get("expired_at")
-            
-            profile_data = get_profile(AuthInstance.api_key, active_user["tokens"]["access_token"], active_user["tokens"]["id_token"])
-            sub_id = profile_data["profile"]["subscriber_id"]
-            sub_type = profile_data["profile"]["subscription_type"]
-            
-            point_info = "Points: N/A | Tier: N/A"
-            
-            if sub_type == "PREPAID":
-                tiering_data = get_tiering_info(AuthInstance.api_key, active_user["tokens"])
-                tier = tiering_data.get("tier", 0)
-                current_point = tiering_data.get("current_point", 0)
-                point_info = f"Points: {current_point} | Tier: {tier}"
-            
-            profile = {
-                "number": active_user["number"],
-                "subscriber_id": sub_id,
-                "subscription_type": sub_type,
-                "balance": balance_remaining,
-                "balance_expired_at": balance_expired_at,
-                "point_info": point_info
-            }
+            # Rendered from the last snapshot while the API is unreachable
+            profile, saved_at = SnapshotInstance.fetch(
+                f"dashboard:{active_user['number']}",
+                lambda: load_profile(active_user),
+            )
 
-            show_main_menu(profile)
+            run_action("main-menu", show_main_menu, profile, saved_at)
 
             choice = input("Pilih menu: ")
             if choice == "1":
-                selected_user_number = show_account_menu()
+                selected_user_number = run_action("account", show_account_menu)
                 if selected_user_number:
                     AuthInstance.set_active_user(selected_user_number)
                 else:
                     print("No user selected or failed to load user.")
                 continue
             elif choice == "2":
-                fetch_my_packages()
+                run_action("my-packages", fetch_my_packages)
                 continue
             elif choice == "3":
-                show_hot_menu()
+                run_action("hot", show_hot_menu)
             elif choice == "4":
-                show_hot_menu2()
+                run_action("hot2", show_hot_menu2)
             elif choice == "5":
                 family_code = input("Enter family code (or '99' to cancel): ")
                 if family_code == "99":
                     continue
-                get_packages_by_family(family_code)
+                run_action("family", get_packages_by_family, family_code)
             elif choice == "6":
-                show_transaction_history(AuthInstance.api_key, active_user["tokens"])
+                run_action("history", show_transaction_history, AuthInstance.api_key, active_user["tokens"], active_user["number"])
             
             elif choice == "7":
-                show_auto_payment_bot()
+                run_action("bot", show_auto_payment_bot)
+            elif choice == "8":
+                run_action("catalogue", show_catalogue_menu)
+            elif choice == "9":
+                run_action("overview", show_account_overview)
+            elif choice == "10":
+                run_action("categories", show_category_menu)
             elif choice == "00":
-                show_bookmark_menu()
+                run_action("bookmark", show_bookmark_menu)
             elif choice == "99":
                 print("Exiting the application.")
                 sys.exit(0)
@@ -110,14 +161,18 @@ def main():
                     active_user["tokens"],
                     ""
                 )
-                print(json.dumps(res, indent=2))
+                print(json.dumps(res.raw if res else None, indent=2))
                 input("Press Enter to continue...")
                 pass
             elif choice == "s":
-                enter_sentry_mode()
+                run_action("sentry", enter_sentry_mode)
             else:
                 print("Invalid choice. Please try again.")
                 pause()
+        elif SUPERVISED:
+            # Logging in needs a human; tell auto.py why instead of showing the menu
+            print("Tidak ada akun aktif. Menutup aplikasi.")
+            sys.exit(EXIT_AUTH_EXPIRED if AuthInstance.refresh_tokens else EXIT_NOT_LOGGED_IN)
         else:
             # Not logged in
             selected_user_number = show_account_menu()
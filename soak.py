@@ -0,0 +1,582 @@
+#!/usr/bin/env python3
+"""
+Soak test for the long-running loops (auto-payment bot and sentry mode).
+
+The loop runs in compressed time against a local stub of the API, CIAM, the
+crypto service and the hot-list host: time.sleep and the input waits advance
+a simulated clock instead of blocking, and the stub drains the watched quota
+as simulated time passes (a purchase refills it). At every simulated hour
+the RSS, open file descriptors, thread count and requests made in that hour
+are sampled; the run fails when growth after the warm-up hour, or the
+request rate, exceeds its budget.
+
+    python soak.py bot --hours 48
+    python soak.py bot --mode timer --timer 3600
+    python soak.py sentry --hours 6 --max-requests-per-hour 12000
+
+Everything runs in a throw-away working directory, so saved accounts,
+api.key and the local databases are never touched.
+"""
+import argparse
+import builtins
+import contextlib
+import gc
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from requests.adapters import HTTPAdapter
+
+HOUR = 3600
+STUB_THREAD = "soak-stub"
+
+NUMBER = 6281234567890
+TOTAL_QUOTA = 2 * 1024 ** 3
+FAMILY_CODE = "SOAK-FAMILY"
+VARIANT_CODE = "SOAK-VARIANT"
+OPTION_CODE = "SOAK-OPTION"
+
+# Default budget of requests per simulated hour. The bot polls every 20s
+# (~7 requests per cycle plus token renewals), sentry samples every second
+# (3 requests per sample).
+DEFAULT_MAX_RPH = {"bot": 2000, "sentry": 12000}
+
+_real_time = time.time
+_real_monotonic = time.monotonic
+_real_sleep = time.sleep
+
+
+# ====== SIMULATED CLOCK ======
+
+class SimClock:
+    """
+    Replaces time.time, time.monotonic and time.sleep for the whole process.
+    Only the driver thread (the one running the loop) moves the clock: its
+    sleeps and input waits return at once with the clock advanced. Other
+    threads sleeping on it wait until the driver has moved past their wake-up
+    time. on_hour(hour) is called from the driver at each simulated hour.
+    """
+    def __init__(self, on_hour=None):
+        self.on_hour = on_hour
+        self.elapsed = 0.0
+        self._base_monotonic = _real_monotonic()
+        self._base_time = _real_time()
+        self._driver = threading.get_ident()
+        self._cond = threading.Condition()
+        self._stopped = False
+
+    def monotonic(self) -> float:
+        return self._base_monotonic + self.elapsed
+
+    def time(self) -> float:
+        return self._base_time + self.elapsed
+
+    def advance(self, seconds: float):
+        with self._cond:
+            before = self.elapsed
+            self.elapsed += max(0.0, seconds)
+            after = self.elapsed
+            self._cond.notify_all()
+        if self.on_hour is not None:
+            for hour in range(int(before // HOUR) + 1, int(after // HOUR) + 1):
+                self.on_hour(hour)
+
+    def advance_to(self, monotonic_at: float):
+        self.advance(monotonic_at - self.monotonic())
+
+    def sleep(self, seconds: float):
+        if threading.get_ident() == self._driver:
+            self.advance(seconds)
+            return
+        wake_at = self.elapsed + max(0.0, seconds)
+        with self._cond:
+            while self.elapsed < wake_at and not self._stopped:
+                self._cond.wait(1.0)
+
+    def install(self):
+        time.time = self.time
+        time.monotonic = self.monotonic
+        time.sleep = self.sleep
+
+    def uninstall(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        time.time = _real_time
+        time.monotonic = _real_monotonic
+        time.sleep = _real_sleep
+
+
+# ====== STUB SERVER ======
+
+class StubApi:
+    """
+    Answers every endpoint the bot and sentry loops call. "Encryption" is
+    plain JSON: encryptsign wraps the payload, the API unwraps it and
+    decrypt returns it as is. The watched quota drains linearly in
+    simulated time and is refilled by a successful settlement.
+    """
+    def __init__(self, clock: SimClock, drain_per_hour: int):
+        self.clock = clock
+        self.drain_per_hour = drain_per_hour
+        # Package the bot buys, set once the bot module is loaded
+        self.target_name = ""
+        self.refilled_at = clock.elapsed
+        self.purchases = 0
+        self._lock = threading.Lock()
+
+    def remaining_quota(self) -> int:
+        with self._lock:
+            used = self.drain_per_hour * (self.clock.elapsed - self.refilled_at) / HOUR
+        return max(0, int(TOTAL_QUOTA - used))
+
+    def refill(self):
+        with self._lock:
+            self.refilled_at = self.clock.elapsed
+            self.purchases += 1
+
+    def _option(self) -> dict:
+        return {
+            "package_option_code": OPTION_CODE,
+            "name": self.target_name,
+            "price": 0,
+            "order": 1,
+            "validity": "30 Hari",
+            "benefits": [],
+        }
+
+    def _family(self) -> dict:
+        return {
+            "package_family_code": FAMILY_CODE,
+            "name": "Soak Family",
+            "payment_for": "BUY_PACKAGE",
+            "plan_type": "PREPAID",
+        }
+
+    def api(self, path: str, payload: dict) -> dict:
+        now = int(self.clock.time())
+        if path == "api/v8/packages/balance-and-credit":
+            return {"status": "SUCCESS", "data": {"balance": {"remaining": 50000, "expired_at": now + 30 * 86400}}}
+        if path == "api/v8/packages/quota-details":
+            return {"status": "SUCCESS", "data": {"quotas": [{
+                "name": "Paket Soak",
+                "quota_code": "SOAK-QUOTA",
+                "group_code": "SOAK",
+                "group_name": "Soak",
+                "family_code": FAMILY_CODE,
+                "benefits": [{
+                    "name": "Kuota Utama",
+                    "data_type": "DATA",
+                    "total": TOTAL_QUOTA,
+                    "remaining": self.remaining_quota(),
+                    "item_id": "soak-benefit",
+                    "category": "DATA_MAIN",
+                }],
+            }]}}
+        if path == "api/v8/xl-stores/options/list":
+            return {"status": "SUCCESS", "data": {
+                "package_family": self._family(),
+                "package_variants": [{
+                    "name": "Soak",
+                    "package_variant_code": VARIANT_CODE,
+                    "package_options": [self._option()],
+                }],
+            }}
+        if path == "api/v8/xl-stores/options/detail":
+            return {"status": "SUCCESS", "data": {
+                "package_option": self._option(),
+                "package_family": self._family(),
+                "package_detail_variant": {"name": "Soak", "package_variant_code": VARIANT_CODE},
+                "token_confirmation": "soak-confirmation",
+                "timestamp": now,
+            }}
+        if path == "misc/api/v8/utility/intercept-page":
+            return {"status": "SUCCESS"}
+        if path == "payments/api/v8/payment-methods-option":
+            return {"status": "SUCCESS", "data": {"token_payment": "soak-payment", "timestamp": now}}
+        if path == "payments/api/v8/settlement-multipayment":
+            self.refill()
+            return {"status": "SUCCESS", "data": {"msg": "soak purchase"}}
+        return {"status": "FAILED", "error": f"unknown path {path}"}
+
+    def handle(self, method: str, path: str, body: bytes):
+        """Return (status, JSON-able body or None) for one request."""
+        path = path.split("?")[0]
+        if method == "HEAD" or path == "/generate_204":
+            return 204, None
+        if path == "/pg-hot2.json":
+            return 200, [{
+                "name": self.target_name,
+                "price": "Rp0",
+                "detail": "Soak test bundle",
+                "payment_for": "BUY_PACKAGE",
+                "ask_overwrite": False,
+                "packages": [{
+                    "family_code": FAMILY_CODE,
+                    "variant_code": VARIANT_CODE,
+                    "order": 1,
+                    "is_enterprise": False,
+                }],
+            }]
+        if path == "/api/verify":
+            return 200, {"user_id": "soak", "username": "soak"}
+        if path.endswith("/protocol/openid-connect/token"):
+            return 200, {"id_token": "soak-id", "access_token": "soak-access", "refresh_token": "soak-refresh"}
+
+        data = json.loads(body or b"{}")
+        xtime = int(self.clock.time() * 1000)
+        if path.endswith("/encryptsign"):
+            return 200, {"encrypted_body": {"xdata": json.dumps(data.get("body")), "xtime": xtime}, "x_signature": "soak"}
+        if path.endswith("/decrypt"):
+            return 200, {"plaintext": json.loads(data["xdata"])}
+        if "/sign-" in path:
+            return 200, {"x_signature": "soak", "ax_signature": "soak"}
+
+        payload = json.loads(data.get("xdata") or "{}")
+        return 200, {"xdata": json.dumps(self.api(path.lstrip("/"), payload)), "xtime": xtime}
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def process_request(self, request, client_address):
+        # Named so the sampler can leave the stub's own threads out
+        threading.Thread(
+            target=self.process_request_thread,
+            args=(request, client_address),
+            name=STUB_THREAD,
+            daemon=True,
+        ).start()
+
+
+def start_stub(stub: StubApi) -> _StubServer:
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, like the real hosts, so the client pool is exercised
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def _reply(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = self.rfile.read(length) if length else b""
+            status, data = stub.handle(self.command, self.path, body)
+            payload = b"" if data is None else json.dumps(data).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(payload)
+
+        do_GET = do_POST = do_HEAD = _reply
+
+        def log_message(self, format, *args):
+            pass
+
+    server = _StubServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, name=STUB_THREAD, daemon=True).start()
+    return server
+
+
+class StubAdapter(HTTPAdapter):
+    """Sends every request of the shared session to the stub, keeping path and query."""
+    def __init__(self, stub_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self.stub_url = stub_url
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = self.stub_url + parts.path + (f"?{parts.query}" if parts.query else "")
+        return super().send(request, **kwargs)
+
+
+# ====== SCRIPTED INPUT ======
+
+def _scripted_mux(clock: SimClock, lines):
+    """InputMux whose stdin is a list of (simulated seconds, line)."""
+    from app.menus.inputmux import InputMux
+
+    class ScriptedInput(InputMux):
+        def __init__(self):
+            super().__init__(clock=clock.monotonic)
+            self.lines = deque(sorted((clock.monotonic() + at, line) for at, line in lines))
+
+        def _select(self, timeout: float) -> bool:
+            timeout = max(0.0, timeout)
+            if self.lines and self.lines[0][0] <= clock.monotonic() + timeout:
+                clock.advance_to(self.lines[0][0])
+                return True
+            clock.advance(timeout)
+            return False
+
+        def _readline(self):
+            return self.lines.popleft()[1]
+
+    return ScriptedInput()
+
+
+@contextlib.contextmanager
+def scripted_prompts(answers):
+    """Answer input() prompts in order; Enter once the answers run out."""
+    answers = deque(answers)
+    real_input = builtins.input
+    builtins.input = lambda prompt="": answers.popleft() if answers else ""
+    try:
+        yield
+    finally:
+        builtins.input = real_input
+
+
+# ====== SAMPLING ======
+
+def _rss_mb() -> float | None:
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # Peak, not current, where /proc is unavailable (kB on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return None
+
+
+def _open_fds() -> int | None:
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+def _app_threads() -> int:
+    return sum(1 for t in threading.enumerate() if not t.name.startswith(STUB_THREAD))
+
+
+class Sampler:
+    def __init__(self, clock: SimClock):
+        self.clock = clock
+        self.requests = Counter()
+        self.samples = []
+        self._lock = threading.Lock()
+
+    def record_trace(self, trace):
+        hour = int(self.clock.elapsed // HOUR)
+        with self._lock:
+            self.requests[hour] += 1
+
+    def sample(self, hour: int):
+        gc.collect()
+        with self._lock:
+            requests = self.requests[hour - 1]
+        self.samples.append({
+            "hour": hour,
+            "rss_mb": _rss_mb(),
+            "fds": _open_fds(),
+            "threads": _app_threads(),
+            "requests": requests,
+        })
+
+
+def check_budgets(samples, args) -> list[str]:
+    """Growth is measured from the sample at the end of the warm-up."""
+    failures = []
+    if len(samples) <= args.warmup_hours:
+        return [f"run too short: {len(samples)} hour(s) sampled, warm-up is {args.warmup_hours}"]
+    baseline = samples[args.warmup_hours - 1] if args.warmup_hours > 0 else samples[0]
+    later = samples[args.warmup_hours:]
+
+    for key, budget, unit in (
+        ("rss_mb", args.max_rss_growth_mb, "MB"),
+        ("fds", args.max_fd_growth, "fds"),
+        ("threads", args.max_thread_growth, "threads"),
+    ):
+        if baseline[key] is None:
+            continue
+        growth = max(s[key] for s in later) - baseline[key]
+        if growth > budget:
+            failures.append(f"{key} grew by {growth:g} {unit} after hour {baseline['hour']} (budget {budget:g})")
+
+    busiest = max(samples, key=lambda s: s["requests"])
+    if busiest["requests"] > args.max_requests_per_hour:
+        failures.append(
+            f"{busiest['requests']} requests in hour {busiest['hour']} "
+            f"(budget {args.max_requests_per_hour} per hour)"
+        )
+    return failures
+
+
+# ====== RUN ======
+
+def _prepare_workdir(workdir: str):
+    os.chdir(workdir)
+    with open("api.key", "w", encoding="utf-8") as f:
+        f.write("soak-api-key")
+    with open("refresh-tokens.json", "w", encoding="utf-8") as f:
+        json.dump([{"number": NUMBER, "refresh_token": "soak-refresh"}], f)
+    with open("active.number", "w", encoding="utf-8") as f:
+        f.write(str(NUMBER))
+
+    os.environ.update({
+        "BASE_API_URL": "https://api.soak.test",
+        "BASE_CIAM_URL": "https://ciam.soak.test",
+        "BASE_CRYPTO_HOST": "https://crypto.soak.test",
+        "API_KEY": "soak",
+        "BASIC_AUTH": "soak",
+        "UA": "soak",
+        "AES_KEY_ASCII": "0123456789abcdef",
+        "AX_FP_KEY": "0123456789abcdef0123456789abcdef",
+        "PREWARM": "0",
+    })
+    # LOG_FILE falls back to engsel.log inside the working directory
+    for name in ("LOG_FILE", "METRICS_FILE", "METRICS_PORT", "PROFILE_DIR"):
+        os.environ.pop(name, None)
+
+
+def run(args) -> dict:
+    # The loops draw to the terminal; only the report is printed
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        return _run(args)
+
+
+def _run(args) -> dict:
+    sampler = None
+    clock = SimClock(on_hour=lambda hour: sampler.sample(hour))
+    sampler = Sampler(clock)
+    clock.install()
+
+    from app.client import transport
+    stub = StubApi(clock, args.drain_mb_per_hour * 1024 ** 2)
+    server = start_stub(stub)
+    adapter = StubAdapter(
+        f"http://127.0.0.1:{server.server_address[1]}",
+        pool_connections=transport.POOL_CONNECTIONS,
+        pool_maxsize=transport.POOL_MAXSIZE,
+    )
+    transport.session.mount("https://", adapter)
+    transport.session.mount("http://", adapter)
+    transport.add_trace_listener(sampler.record_trace)
+
+    import app.menus.util as menu_util
+    # The banner is fetched outside the shared session; skip it
+    menu_util._header_cache = ""
+
+    end = args.hours * HOUR
+    if args.loop == "bot":
+        import app.menus.bot as loop_module
+        from app.menus.bot import HOT2_TARGET_NAME, show_auto_payment_bot as loop
+        stub.target_name = HOT2_TARGET_NAME
+        if args.mode == "quota":
+            answers = ["1", "1", str(args.min_mb)]
+        else:
+            answers = ["1", "2", str(args.timer)]
+        exit_line = "99"
+    else:
+        import app.service.sentry as loop_module
+        from app.service.sentry import enter_sentry_mode as loop
+        answers = []
+        exit_line = "q"
+    loop_module.InputInstance = _scripted_mux(clock, [(end, exit_line)])
+
+    started = _real_monotonic()
+    error = None
+    try:
+        with scripted_prompts(answers):
+            loop()
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+    finally:
+        real_seconds = _real_monotonic() - started
+        simulated = clock.elapsed
+        clock.uninstall()
+        server.shutdown()
+        server.server_close()
+
+    if error is None and simulated < end:
+        error = f"loop exited after {simulated / HOUR:.2f} of {args.hours} simulated hours"
+    failures = ([error] if error else []) + check_budgets(sampler.samples, args)
+    return {
+        "loop": args.loop,
+        "mode": args.mode if args.loop == "bot" else None,
+        "simulated_hours": round(simulated / HOUR, 2),
+        "real_seconds": round(real_seconds, 1),
+        "purchases": stub.purchases,
+        "samples": sampler.samples,
+        "failures": failures,
+    }
+
+
+def print_report(report: dict):
+    print(f"[SOAK] {report['loop']}" + (f" ({report['mode']})" if report["mode"] else ""))
+    print(f"[SOAK] {report['simulated_hours']} simulated hours in {report['real_seconds']}s, {report['purchases']} purchase(s)")
+    print(f"{'hour':>5} {'rss MB':>8} {'fds':>5} {'threads':>8} {'requests':>9}")
+    for s in report["samples"]:
+        rss = "-" if s["rss_mb"] is None else f"{s['rss_mb']:.1f}"
+        fds = "-" if s["fds"] is None else s["fds"]
+        print(f"{s['hour']:>5} {rss:>8} {fds:>5} {s['threads']:>8} {s['requests']:>9}")
+    if report["failures"]:
+        for failure in report["failures"]:
+            print(f"[FAIL] {failure}")
+    else:
+        print("[OK] All budgets met.")
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Soak test for the bot and sentry loops in simulated time.")
+    p.add_argument("loop", choices=["bot", "sentry"])
+    p.add_argument("--hours", type=int, default=24, help="simulated hours to run (default 24)")
+    p.add_argument("--mode", choices=["quota", "timer"], default="quota", help="bot mode (default quota)")
+    p.add_argument("--min-mb", type=float, default=100, help="bot quota mode threshold in MB")
+    p.add_argument("--timer", type=int, default=3600, help="bot timer mode interval in seconds")
+    p.add_argument("--drain-mb-per-hour", type=int, default=256, help="simulated quota usage")
+    p.add_argument("--warmup-hours", type=int, default=1, help="hours before growth is measured")
+    p.add_argument("--max-rss-growth-mb", type=float, default=16)
+    p.add_argument("--max-fd-growth", type=int, default=4)
+    p.add_argument("--max-thread-growth", type=int, default=1)
+    p.add_argument("--max-requests-per-hour", type=int, help="default 2000 for bot, 12000 for sentry")
+    p.add_argument("--report", help="also write the report as JSON to this file")
+    p.add_argument("--keep", action="store_true", help="keep the working directory")
+    args = p.parse_args(argv)
+    if args.max_requests_per_hour is None:
+        args.max_requests_per_hour = DEFAULT_MAX_RPH[args.loop]
+    if args.report:
+        args.report = os.path.abspath(args.report)
+    return args
+
+
+def main(argv=None) -> int:
+    from app.exit_codes import EXIT_ERROR, EXIT_OK
+
+    args = parse_args(argv)
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="soak-")
+    try:
+        _prepare_workdir(workdir)
+        report = run(args)
+    finally:
+        from app.log import LogInstance
+        # Write out the buffered log before the directory goes away
+        LogInstance.close()
+        os.chdir(cwd)
+        if args.keep:
+            print(f"[SOAK] Working directory: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(report)
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return EXIT_ERROR if report["failures"] else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
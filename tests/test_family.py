@@ -0,0 +1,83 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# The client reads its configuration and opens its databases at import
+os.chdir(tempfile.mkdtemp(prefix="engsel-test-"))
+os.environ.update({
+    "BASE_API_URL": "https://api.test",
+    "BASE_CIAM_URL": "https://ciam.test",
+    "BASE_CRYPTO_HOST": "https://crypto.test",
+    "API_KEY": "test",
+    "BASIC_AUTH": "test",
+    "UA": "test",
+    "AES_KEY_ASCII": "0123456789abcdef",
+    "AX_FP_KEY": "0123456789abcdef0123456789abcdef",
+    "PREWARM": "0",
+    "LOG_FILE": "",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.client import engsel  # noqa: E402
+from app.service.cache import CacheInstance  # noqa: E402
+from app.service.catalogue import CatalogueInstance  # noqa: E402
+
+
+def _family_response(name: str) -> dict:
+    return {
+        "status": "SUCCESS",
+        "data": {
+            "package_family": {"name": name, "package_family_type": ""},
+            "package_variants": [],
+        },
+    }
+
+
+class GetFamilyTest(unittest.TestCase):
+    def setUp(self):
+        CacheInstance.clear()
+
+    def _stored_is_enterprise(self, family_code: str):
+        row = CatalogueInstance._conn.execute(
+            "SELECT is_enterprise FROM families WHERE family_code = ?", (family_code,)
+        ).fetchone()
+        return None if row is None or row["is_enterprise"] is None else bool(row["is_enterprise"])
+
+    def test_records_is_enterprise_of_first_value_tried(self):
+        def api(api_key, path, payload, id_token, method):
+            return _family_response("Xtra" if not payload["is_enterprise"] else "")
+
+        with mock.patch.object(engsel, "send_api_request", side_effect=api):
+            family = engsel.get_family("k", {"id_token": "a"}, "FAM-FIRST", None, "NONE")
+
+        self.assertIsNotNone(family)
+        self.assertIs(self._stored_is_enterprise("FAM-FIRST"), False)
+
+    def test_records_is_enterprise_of_later_value_tried(self):
+        def api(api_key, path, payload, id_token, method):
+            return _family_response("Biz" if payload["is_enterprise"] else "")
+
+        with mock.patch.object(engsel, "send_api_request", side_effect=api):
+            family = engsel.get_family("k", {"id_token": "a"}, "FAM-SECOND", None, "NONE")
+
+        self.assertIsNotNone(family)
+        self.assertIs(self._stored_is_enterprise("FAM-SECOND"), True)
+
+    def test_cache_is_per_account(self):
+        def api(api_key, path, payload, id_token, method):
+            return _family_response(f"Family of {id_token}")
+
+        with mock.patch.object(engsel, "send_api_request", side_effect=api) as send:
+            first = engsel.get_family("k", {"id_token": "a"}, "FAM-SHARED", False, "NONE")
+            again = engsel.get_family("k", {"id_token": "a"}, "FAM-SHARED", False, "NONE")
+            other = engsel.get_family("k", {"id_token": "b"}, "FAM-SHARED", False, "NONE")
+
+        self.assertIs(again, first)
+        self.assertEqual(send.call_count, 2)
+        self.assertNotEqual(other.name, first.name)
+
+
+if __name__ == "__main__":
+    unittest.main()